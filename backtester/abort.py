@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import List, Optional
+
+import numpy as np
+
+from .models import BacktestConfig, Trade
+
+
+# 同一根 bar 同時觸發多個條件時，以此順序回報原因
+ABORT_REASONS = ("max_drawdown", "min_equity", "max_consecutive_losses", "min_trades")
+
+
+def abort_enabled(config: BacktestConfig) -> bool:
+    return (
+        config.abort_max_drawdown is not None
+        or config.abort_min_equity is not None
+        or config.abort_max_consecutive_losses is not None
+        or (config.abort_min_trades is not None and config.abort_min_trades_by_bar is not None)
+    )
+
+
+@dataclass
+class AbortMonitor:
+    """engine bar loop 內的提前中止檢查（每根 bar 只做幾次比較）。"""
+
+    config: BacktestConfig
+    peak: float = float("-inf")
+    n_trades_seen: int = 0
+    consecutive_losses: int = 0
+    # 已從 trades list 移走（例：串流回測寫到磁碟）的交易筆數
+    trades_offset: int = 0
+
+    def check(self, i: int, equity: float, trades: List[Trade]) -> Optional[str]:
+        cfg = self.config
+        if equity > self.peak:
+            self.peak = equity
+        if cfg.abort_max_drawdown is not None and self.peak > 0:
+            if (self.peak - equity) / self.peak >= cfg.abort_max_drawdown:
+                return "max_drawdown"
+        if cfg.abort_min_equity is not None and equity <= cfg.abort_min_equity:
+            return "min_equity"
+        if cfg.abort_max_consecutive_losses is not None:
+            while self.n_trades_seen < self.trades_offset + len(trades):
+                # 與 basic_metrics 一致：pnl <= 0 視為虧損
+                if trades[self.n_trades_seen - self.trades_offset].pnl <= 0:
+                    self.consecutive_losses += 1
+                else:
+                    self.consecutive_losses = 0
+                self.n_trades_seen += 1
+            if self.consecutive_losses >= cfg.abort_max_consecutive_losses:
+                return "max_consecutive_losses"
+        if cfg.abort_min_trades is not None and i == cfg.abort_min_trades_by_bar:
+            if self.trades_offset + len(trades) < cfg.abort_min_trades:
+                return "min_trades"
+        return None
+
+
+def find_abort(
+    equity: np.ndarray,
+    trade_exit_bars: np.ndarray,
+    trade_pnls: np.ndarray,
+    config: BacktestConfig,
+) -> tuple[Optional[int], Optional[str]]:
+    """
+    AbortMonitor 的事後向量化版本（給不經過 bar loop 的快速路徑用）。
+    回傳 (中止的 bar index, 原因)；未觸發為 (None, None)。
+    """
+    n = len(equity)
+    hits: list[tuple[int, int, str]] = []
+
+    if config.abort_max_drawdown is not None and n:
+        peak = np.maximum.accumulate(equity)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mask = (peak > 0) & ((peak - equity) / peak >= config.abort_max_drawdown)
+        if mask.any():
+            hits.append((int(np.argmax(mask)), 0, "max_drawdown"))
+    if config.abort_min_equity is not None and n:
+        mask = equity <= config.abort_min_equity
+        if mask.any():
+            hits.append((int(np.argmax(mask)), 1, "min_equity"))
+    if config.abort_max_consecutive_losses is not None:
+        streak = 0
+        for bar, pnl in zip(trade_exit_bars, trade_pnls):
+            streak = streak + 1 if pnl <= 0 else 0
+            if streak >= config.abort_max_consecutive_losses:
+                hits.append((int(bar), 2, "max_consecutive_losses"))
+                break
+    if config.abort_min_trades is not None and config.abort_min_trades_by_bar is not None:
+        by_bar = config.abort_min_trades_by_bar
+        if 0 <= by_bar < n and int((trade_exit_bars <= by_bar).sum()) < config.abort_min_trades:
+            hits.append((by_bar, 3, "min_trades"))
+
+    if not hits:
+        return None, None
+    bar, _, reason = min(hits)
+    return bar, reason
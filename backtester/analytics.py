@@ -1,12 +1,13 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Dict
+from typing import Dict, List, Optional, Union
 
 import numpy as np
 import pandas as pd
 
-from .models import BacktestResult
+from .models import BacktestResult, Side, Trade
+from .rangeindex import PriceRangeIndex
 
 
 def max_drawdown(equity: pd.Series) -> float:
@@ -15,6 +16,32 @@ def max_drawdown(equity: pd.Series) -> float:
     return float(dd.min()) if len(dd) else 0.0
 
 
+def performance_per_day(result: BacktestResult, df: pd.DataFrame) -> float:
+    """總收益 / 交易日數（與 notebook tune_strategy_params 的績效定義相同）。"""
+    eq = result.equity_curve
+    if len(eq) == 0:
+        return 0.0
+    n_days = len(df.index.normalize().unique())
+    return float(eq.iat[-1] - eq.iat[0]) / n_days if n_days else 0.0
+
+
+def summary_metrics(result: BacktestResult, df: pd.DataFrame) -> Dict[str, float]:
+    """sweep / 結果庫用的精簡指標（全部是數值）。"""
+    m = basic_metrics(result)
+    eq = result.equity_curve
+    return {
+        "n_trades": float(len(result.trades)),
+        "perf_per_day": performance_per_day(result, df),
+        "final_equity": float(eq.iat[-1]) if len(eq) else float("nan"),
+        "win_rate": m["win_rate"],
+        "avg_pnl": m["avg_pnl"],
+        "profit_factor": m["profit_factor"],
+        "max_drawdown": m["max_drawdown"],
+        "sharpe_ratio": m.get("sharpe_ratio", 0.0),
+        "aborted": float(result.aborted),
+    }
+
+
 def basic_metrics(result: BacktestResult) -> Dict[str, float]:
     trades = result.trades
     if not trades:
@@ -50,3 +77,77 @@ def basic_metrics(result: BacktestResult) -> Dict[str, float]:
         "avg_win_held_bars": wins_held_bars,
         "avg_loss_held_bars": losses_held_bars,
     }
+
+
+def trade_excursions(
+    trades: Union[BacktestResult, List[Trade]],
+    df: Optional[pd.DataFrame] = None,
+    index: Optional[PriceRangeIndex] = None,
+) -> pd.DataFrame:
+    """
+    每筆交易的 MAE / MFE 與持倉期間路徑統計（價格單位，乘 qty 即為金額）。
+
+    持倉區間為進場 bar 之後到出場 bar（含）：進場以收盤價成交，進場 bar 的 high/low 不計；
+    出場 bar 的 high/low 全部計入（出場 bar 內出場前後的先後無法由 OHLC 判斷，採保守算法）。
+    - mfe / mae：最大有利 / 不利幅度（>= 0）
+    - bars_to_mfe / bars_to_mae：自進場起第幾根 bar 達到
+    - drawdown_from_mfe：到達 MFE 那根 bar（含）之後，價格自 MFE 最多回落多少
+    全部以 range index 一次向量化查詢；index 未給時由 df 建立（同一份資料重複使用請傳 index）。
+    """
+    if isinstance(trades, BacktestResult):
+        trades = trades.trades
+    if index is None:
+        if df is None:
+            raise ValueError("either df or index is required")
+        index = PriceRangeIndex.from_frame(df)
+
+    if not trades:
+        return pd.DataFrame(
+            {
+                "entry_bar": pd.Series(dtype="int64"),
+                "exit_bar": pd.Series(dtype="int64"),
+                "mfe": pd.Series(dtype="float64"),
+                "mae": pd.Series(dtype="float64"),
+                "bars_to_mfe": pd.Series(dtype="int64"),
+                "bars_to_mae": pd.Series(dtype="int64"),
+                "drawdown_from_mfe": pd.Series(dtype="float64"),
+            }
+        )
+
+    entry_bar = index.bar_positions(pd.DatetimeIndex([t.entry_time for t in trades]))
+    exit_bar = index.bar_positions(pd.DatetimeIndex([t.exit_time for t in trades]))
+    entry_px = np.array([t.entry_price for t in trades], dtype=float)
+    is_long = np.array([t.side == Side.LONG for t in trades])
+
+    # 同一根 bar 進出（或資料異常）時區間為空：以出場 bar 本身查詢，幅度另外歸零
+    lo = entry_bar + 1
+    hi = exit_bar
+    empty = hi < lo
+    lo_q = np.where(empty, hi, lo)
+
+    hi_pos = index.high.argquery(lo_q, hi)
+    lo_pos = index.low.argquery(lo_q, hi)
+    hi_px = index.high.values[hi_pos]
+    lo_px = index.low.values[lo_pos]
+
+    mfe_pos = np.where(is_long, hi_pos, lo_pos)
+    mae_pos = np.where(is_long, lo_pos, hi_pos)
+    mfe = np.where(is_long, hi_px - entry_px, entry_px - lo_px)
+    mae = np.where(is_long, entry_px - lo_px, hi_px - entry_px)
+
+    # MFE 之後的最差價：LONG 看之後的最低 low，SHORT 看之後的最高 high
+    after_low = index.low.query(mfe_pos, hi)
+    after_high = index.high.query(mfe_pos, hi)
+    giveback = np.where(is_long, hi_px - after_low, after_high - lo_px)
+
+    return pd.DataFrame(
+        {
+            "entry_bar": entry_bar.astype(np.int64),
+            "exit_bar": exit_bar.astype(np.int64),
+            "mfe": np.where(empty, 0.0, np.maximum(mfe, 0.0)),
+            "mae": np.where(empty, 0.0, np.maximum(mae, 0.0)),
+            "bars_to_mfe": np.where(empty, 0, mfe_pos - entry_bar).astype(np.int64),
+            "bars_to_mae": np.where(empty, 0, mae_pos - entry_bar).astype(np.int64),
+            "drawdown_from_mfe": np.where(empty, 0.0, giveback),
+        }
+    )
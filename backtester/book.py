@@ -0,0 +1,217 @@
+from __future__ import annotations
+
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .execution import EXIT_NONE, EXIT_TYPE_BY_CODE, exit_hits
+from .models import ExitType, Fill, Position, Side, Trade
+
+
+def _side_sign(side: Side) -> int:
+    return 1 if side == Side.LONG else -1
+
+
+def _sign_side(sign: int) -> Side:
+    return Side.LONG if sign > 0 else Side.SHORT
+
+
+class PositionBook:
+    """
+    多筆持倉（lot）的陣列式帳本：欄位存在預先配置的 NumPy 陣列（容量不足時倍增），
+    未平倉的 lot 依開倉順序放在前 n 格。每根 bar 的出場判斷對全部 lot 一次向量化比較，
+    lot 數增加時每根 bar 的 Python 開銷不變。tp / sl / be 為 NaN 表示未設定。
+    """
+
+    def __init__(self, capacity: int = 64) -> None:
+        self.n = 0
+        self.next_id = 0
+        self.tz = None
+        self._alloc(max(1, capacity))
+
+    def _alloc(self, capacity: int) -> None:
+        old = getattr(self, "lot_id", None)
+        arrays = {
+            "lot_id": np.int64,
+            "side": np.int8,       # +1 LONG / -1 SHORT
+            "qty": np.float64,
+            "entry_price": np.float64,
+            "entry_bar": np.int64,
+            "entry_time": np.int64,  # ns
+            "tp": np.float64,
+            "sl": np.float64,
+            "be": np.float64,
+        }
+        for name, dtype in arrays.items():
+            arr = np.empty(capacity, dtype=dtype)
+            if old is not None:
+                arr[: self.n] = getattr(self, name)[: self.n]
+            setattr(self, name, arr)
+
+    @property
+    def capacity(self) -> int:
+        return len(self.lot_id)
+
+    def __len__(self) -> int:
+        return self.n
+
+    # ---- 開倉 / 平倉 ----
+    def add(
+        self,
+        side: Side,
+        qty: float,
+        price: float,
+        bar_i: int,
+        time: pd.Timestamp,
+        tp: Optional[float] = None,
+        sl: Optional[float] = None,
+        be: Optional[float] = None,
+    ) -> int:
+        if self.n == self.capacity:
+            self._alloc(self.capacity * 2)
+        if self.tz is None and time.tz is not None:
+            self.tz = time.tz
+        k = self.n
+        lot = self.next_id
+        self.lot_id[k] = lot
+        self.side[k] = _side_sign(side)
+        self.qty[k] = qty
+        self.entry_price[k] = price
+        self.entry_bar[k] = bar_i
+        self.entry_time[k] = time.value
+        self.tp[k] = np.nan if tp is None else tp
+        self.sl[k] = np.nan if sl is None else sl
+        self.be[k] = np.nan if be is None else be
+        self.n += 1
+        self.next_id += 1
+        return lot
+
+    def remove(self, slots: np.ndarray) -> None:
+        """移除指定位置的 lot，其餘 lot 保持原順序。"""
+        if len(slots) == 0:
+            return
+        keep = np.ones(self.n, dtype=bool)
+        keep[slots] = False
+        m = int(keep.sum())
+        for name in ("lot_id", "side", "qty", "entry_price", "entry_bar", "entry_time", "tp", "sl", "be"):
+            arr = getattr(self, name)
+            arr[:m] = arr[: self.n][keep]
+        self.n = m
+
+    def slots_of(self, lot_ids) -> np.ndarray:
+        return np.flatnonzero(np.isin(self.lot_id[: self.n], lot_ids))
+
+    def entry_timestamp(self, k: int) -> pd.Timestamp:
+        return pd.Timestamp(int(self.entry_time[k]), tz=self.tz)
+
+    def lot_side(self, k: int) -> Side:
+        return _sign_side(int(self.side[k]))
+
+    def levels(self, k: int) -> tuple[Optional[float], Optional[float], Optional[float]]:
+        """第 k 個 lot 的 (tp, sl, be)，未設定為 None。"""
+        return tuple(None if np.isnan(arr[k]) else float(arr[k]) for arr in (self.tp, self.sl, self.be))  # type: ignore[return-value]
+
+    # ---- 向量化查詢 ----
+    def exit_hits(self, bar_high: float, bar_low: float) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        本根 bar 觸發 TP/SL/BE 的 lot：回傳 (slots, 出場代碼, 出場價, 是否同時碰到多條線)。
+        同時碰到多條線時依保守規則取 SL > BE > TP。
+        """
+        n = self.n
+        code, price, n_hits = exit_hits(self.side[:n], bar_high, bar_low, self.tp[:n], self.sl[:n], self.be[:n])
+        slots = np.flatnonzero(code != EXIT_NONE)
+        return slots, code[slots], price[slots], n_hits[slots] > 1
+
+    def unrealized(self, mark_price: float) -> float:
+        n = self.n
+        if n == 0:
+            return 0.0
+        return float(np.sum(self.side[:n] * (mark_price - self.entry_price[:n]) * self.qty[:n]))
+
+    def net_qty(self) -> float:
+        return float(np.sum(self.side[: self.n] * self.qty[: self.n]))
+
+    def position(self) -> Position:
+        """
+        給策略參考的彙總部位：方向為淨部位方向，qty 為淨部位絕對值，avg_price 為該方向 lot 的加權均價，
+        其餘欄位取最早一筆 lot。多空互抵為 0 但仍有 lot 時 side 取最早一筆 lot 的方向、qty=0。
+        """
+        n = self.n
+        if n == 0:
+            return Position()
+        net = self.net_qty()
+        sign = int(np.sign(net)) or int(self.side[0])
+        same = self.side[:n] == sign
+        qty_same = self.qty[:n][same]
+        avg = float(np.sum(self.entry_price[:n][same] * qty_same) / qty_same.sum()) if qty_same.sum() > 0 else 0.0
+
+        tp, sl, be = self.levels(0)
+        return Position(
+            side=_sign_side(sign),
+            qty=abs(net),
+            avg_price=avg,
+            entry_time=self.entry_timestamp(0),
+            entry_bar_i=int(self.entry_bar[0]),
+            tp_price=tp,
+            sl_price=sl,
+            be_price=be,
+        )
+
+
+class BookPortfolio:
+    """
+    以 PositionBook 持倉的 Portfolio（介面同 Portfolio：cash / trades / fills / equity / position）。
+    每個 lot 各自計算損益：進場手續費進場時由現金扣除，Trade.pnl 含出場手續費，與 Portfolio 相同。
+    """
+
+    def __init__(self, initial_cash: float, capacity: int = 64) -> None:
+        self.cash = float(initial_cash)
+        self.book = PositionBook(capacity)
+        self.trades: List[Trade] = []
+        self.fills: List[Fill] = []
+
+    @property
+    def position(self) -> Position:
+        return self.book.position()
+
+    def equity(self, mark_price: float) -> float:
+        return self.cash + self.book.unrealized(mark_price)
+
+    def apply_entry_fill(
+        self, fill: Fill, tp: Optional[float] = None, sl: Optional[float] = None, be: Optional[float] = None
+    ) -> int:
+        lot = self.book.add(fill.side, fill.qty, fill.price, fill.entry_bar_i, fill.time, tp=tp, sl=sl, be=be)
+        self.cash -= fill.fee
+        self.fills.append(fill)
+        return lot
+
+    def apply_exit_fill(self, fill: Fill, slot: int, bar_i: int) -> Trade:
+        """
+        以 fill.qty 平掉第 slot 個 lot 的全部或一部分（不會從 book 移除；全平的 lot 由呼叫端
+        收集後一次 book.remove，同一根 bar 內 slot 編號才不會變動）。
+        """
+        b = self.book
+        sign = int(b.side[slot])
+        entry_price = float(b.entry_price[slot])
+        qty = fill.qty
+        pnl = sign * (fill.price - entry_price) * qty - fill.fee
+        self.cash += pnl
+        self.fills.append(fill)
+        tp, sl, _ = b.levels(slot)
+        trade = Trade(
+            side=_sign_side(sign),
+            qty=qty,
+            entry_time=b.entry_timestamp(slot),
+            entry_price=entry_price,
+            sl_price=sl,
+            tp_price=tp,
+            exit_time=fill.time,
+            exit_price=fill.price,
+            exit_type=fill.exit_type or ExitType.MANUAL,
+            pnl=pnl,
+            bars_held=bar_i - int(b.entry_bar[slot]),
+        )
+        self.trades.append(trade)
+        b.qty[slot] -= qty
+        return trade
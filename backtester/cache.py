@@ -0,0 +1,260 @@
+from __future__ import annotations
+
+import dataclasses
+import hashlib
+import inspect
+import json
+import shutil
+import sys
+import time
+from dataclasses import dataclass, field
+from enum import Enum
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import pandas as pd
+
+from .models import BacktestConfig, BacktestResult
+from .strategy_base import Strategy
+from .tradelog import trades_to_frame, trades_from_frame, fills_to_frame, fills_from_frame
+
+
+# engine 行為由整個 backtester 套件決定（含 strategies）；任何一個原始碼檔改了，舊結果就不該再被命中
+_PACKAGE_DIR = Path(__file__).resolve().parent
+# path -> (mtime_ns, size, sha256)，避免每次算 key 都重讀全部檔案
+_FILE_HASHES: Dict[Path, tuple] = {}
+
+
+def _json_default(obj: Any) -> Any:
+    if isinstance(obj, Enum):
+        return obj.value
+    if dataclasses.is_dataclass(obj):
+        return dataclasses.asdict(obj)
+    return str(obj)
+
+
+def _stable_json(obj: Any) -> str:
+    return json.dumps(obj, sort_keys=True, default=_json_default)
+
+
+def _file_hash(path: Path) -> str:
+    st = path.stat()
+    cached = _FILE_HASHES.get(path)
+    if cached is not None and cached[:2] == (st.st_mtime_ns, st.st_size):
+        return cached[2]
+    digest = hashlib.sha256(path.read_bytes()).hexdigest()
+    _FILE_HASHES[path] = (st.st_mtime_ns, st.st_size, digest)
+    return digest
+
+
+def package_source_hash(root: Optional[Path] = None) -> str:
+    """
+    套件內全部 .py 原始碼（依路徑讀檔，不看 sys.modules）的雜湊：
+    與哪些模組已被 import、import 順序無關。
+    """
+    root = Path(root) if root is not None else _PACKAGE_DIR
+    h = hashlib.sha256()
+    for path in sorted(root.rglob("*.py")):
+        h.update(path.relative_to(root).as_posix().encode("utf-8"))
+        h.update(_file_hash(path).encode("utf-8"))
+    return h.hexdigest()
+
+
+def _module_source_hash(module_name: str, obj: Any = None) -> str:
+    """模組原始碼檔的雜湊（套件外的策略用）；沒有原始碼檔時（notebook）改用 obj 的原始碼。"""
+    module = sys.modules.get(module_name)
+    path = getattr(module, "__file__", None)
+    if path is not None and Path(path).exists():
+        return _file_hash(Path(path).resolve())
+    try:
+        src = inspect.getsource(obj if obj is not None else module)
+    except (OSError, TypeError):
+        return ""
+    return hashlib.sha256(src.encode("utf-8")).hexdigest()
+
+
+def dataset_fingerprint(df: pd.DataFrame) -> str:
+    """以 index + 全部欄位內容計算資料集指紋（同資料 -> 同指紋）。"""
+    h = hashlib.sha256()
+    h.update(_stable_json([str(c) for c in df.columns]).encode("utf-8"))
+    h.update(_stable_json([str(t) for t in df.dtypes]).encode("utf-8"))
+    h.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+def strategy_fingerprint(strategy: Strategy) -> Dict[str, Any]:
+    """策略類別、其原始碼版本與參數 dataclass。"""
+    cls = type(strategy)
+    params = getattr(strategy, "p", None)
+    if params is not None and dataclasses.is_dataclass(params):
+        params_repr: Any = dataclasses.asdict(params)
+    else:
+        params_repr = repr(params)
+    return {
+        "class": f"{cls.__module__}.{cls.__qualname__}",
+        "source": _module_source_hash(cls.__module__, cls),
+        "params": params_repr,
+    }
+
+
+def engine_fingerprint(engine) -> Dict[str, str]:
+    """config 以外會影響結果的 engine 設定（intrabar resolver 資料、成本模型、精度）；預設值不列出。"""
+    extra: Dict[str, str] = {}
+    resolver = getattr(engine, "intrabar_resolver", None)
+    if resolver is not None:
+        extra["intrabar_resolver"] = resolver.fingerprint
+    cost_model = getattr(engine, "cost_model", None)
+    if cost_model is not None:
+        extra["cost_model"] = cost_model.fingerprint
+    precision = getattr(engine, "precision", "float64")
+    if precision != "float64":
+        extra["precision"] = precision
+    return extra
+
+
+def backtest_cache_key(
+    df: pd.DataFrame, strategy: Strategy, config: BacktestConfig, extra: Optional[Dict[str, Any]] = None
+) -> str:
+    """extra：其他會影響結果的輸入（例：intrabar resolver 的資料指紋）。"""
+    payload = {
+        "data": dataset_fingerprint(df),
+        "strategy": strategy_fingerprint(strategy),
+        "config": dataclasses.asdict(config),
+        "core": package_source_hash(),
+        "extra": extra or {},
+    }
+    return hashlib.sha256(_stable_json(payload).encode("utf-8")).hexdigest()
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    writes: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+@dataclass
+class ResultCache:
+    """
+    內容定址的回測結果快取（本機磁碟）。
+
+    每個 key 一個資料夾：trades / equity / fills 存成 Parquet，另有 meta.json。
+    總大小超過 max_bytes 時，依最近使用時間（LRU）淘汰舊項目。
+    """
+
+    root: Path
+    max_bytes: int = 2 * 1024**3
+    stats: CacheStats = field(default_factory=CacheStats)
+
+    def __post_init__(self) -> None:
+        self.root = Path(self.root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def key(
+        self, df: pd.DataFrame, strategy: Strategy, config: BacktestConfig, extra: Optional[Dict[str, Any]] = None
+    ) -> str:
+        return backtest_cache_key(df, strategy, config, extra)
+
+    def _entry_dir(self, key: str) -> Path:
+        return self.root / key[:2] / key
+
+    def get(self, key: str) -> Optional[BacktestResult]:
+        d = self._entry_dir(key)
+        meta_path = d / "meta.json"
+        if not meta_path.exists():
+            self.stats.misses += 1
+            return None
+        try:
+            trades = trades_from_frame(pd.read_parquet(d / "trades.parquet"))
+            equity = pd.read_parquet(d / "equity.parquet")["equity"]
+            fills = fills_from_frame(pd.read_parquet(d / "fills.parquet"))
+        except (OSError, ValueError, KeyError):
+            # 半寫入/損毀的項目當作 miss，並清掉
+            shutil.rmtree(d, ignore_errors=True)
+            self.stats.misses += 1
+            return None
+        meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        meta_path.touch()  # 更新 LRU 時間
+        self.stats.hits += 1
+        return BacktestResult(
+            trades=trades,
+            equity_curve=equity,
+            fills=fills,
+            aborted=meta.get("aborted", False),
+            abort_reason=meta.get("abort_reason"),
+            abort_bar_i=meta.get("abort_bar_i"),
+            stats=meta.get("stats", {}),
+        )
+
+    def put(self, key: str, result: BacktestResult) -> None:
+        d = self._entry_dir(key)
+        tmp = d.with_name(d.name + ".tmp")
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir(parents=True, exist_ok=True)
+
+        trades_to_frame(result.trades).to_parquet(tmp / "trades.parquet", index=False)
+        result.equity_curve.rename("equity").to_frame().to_parquet(tmp / "equity.parquet")
+        fills_to_frame(result.fills).to_parquet(tmp / "fills.parquet", index=False)
+        meta = {
+            "key": key,
+            "created": time.time(),
+            "n_trades": len(result.trades),
+            "aborted": result.aborted,
+            "abort_reason": result.abort_reason,
+            "abort_bar_i": result.abort_bar_i,
+            "stats": result.stats,
+        }
+        (tmp / "meta.json").write_text(json.dumps(meta, default=str), encoding="utf-8")
+
+        shutil.rmtree(d, ignore_errors=True)
+        tmp.rename(d)
+        self.stats.writes += 1
+        self._evict()
+
+    def run(self, engine, df: pd.DataFrame, strategy: Strategy) -> BacktestResult:
+        """engine.run 的快取版：命中直接回傳，否則跑完寫入。engine 設了 event_sink 時一律實際執行（事件才會寫出）。"""
+        key = self.key(df, strategy, engine.config, engine_fingerprint(engine))
+        if getattr(engine, "event_sink", None) is None:
+            cached = self.get(key)
+            if cached is not None:
+                return cached
+        result = engine.run(df, strategy)
+        self.put(key, result)
+        return result
+
+    def size_bytes(self) -> int:
+        return sum(p.stat().st_size for p in self.root.rglob("*") if p.is_file())
+
+    def clear(self) -> None:
+        for child in self.root.iterdir():
+            if child.is_dir():
+                shutil.rmtree(child, ignore_errors=True)
+            else:
+                child.unlink()
+
+    def _entries(self) -> list[tuple[float, int, Path]]:
+        out = []
+        for meta in self.root.glob("*/*/meta.json"):
+            d = meta.parent
+            size = sum(p.stat().st_size for p in d.iterdir() if p.is_file())
+            out.append((meta.stat().st_mtime, size, d))
+        return out
+
+    def _evict(self) -> None:
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        if total <= self.max_bytes:
+            return
+        # 最久沒用的先淘汰
+        for _, size, d in sorted(entries, key=lambda x: x[0]):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(d, ignore_errors=True)
+            total -= size
+            self.stats.evictions += 1
@@ -0,0 +1,303 @@
+from __future__ import annotations
+
+import dataclasses
+import io
+import json
+import zipfile
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+import pandas as pd
+
+from .cache import _stable_json, strategy_fingerprint
+from .models import BacktestConfig, BacktestResult, Position, Side
+from .strategy_base import Strategy
+from .tradelog import fills_from_frame, fills_to_frame, trades_from_frame, trades_to_frame
+
+if TYPE_CHECKING:
+    from .engine import EngineState
+
+
+CHECKPOINT_VERSION = 2
+
+
+def _position_to_dict(pos: Position) -> Dict[str, Any]:
+    return {
+        "side": pos.side.value if pos.side is not None else None,
+        "qty": pos.qty,
+        "avg_price": pos.avg_price,
+        "entry_time": pos.entry_time.isoformat() if pos.entry_time is not None else None,
+        "entry_bar_i": pos.entry_bar_i,
+        "tp_price": pos.tp_price,
+        "sl_price": pos.sl_price,
+        "be_price": pos.be_price,
+    }
+
+
+def _position_from_dict(d: Dict[str, Any]) -> Position:
+    return Position(
+        side=Side(d["side"]) if d["side"] is not None else None,
+        qty=float(d["qty"]),
+        avg_price=float(d["avg_price"]),
+        entry_time=pd.Timestamp(d["entry_time"]) if d["entry_time"] is not None else None,
+        entry_bar_i=d["entry_bar_i"],
+        tp_price=d["tp_price"],
+        sl_price=d["sl_price"],
+        be_price=d["be_price"],
+    )
+
+
+def _history_part(directory: Path, name: str, n_bars: int) -> Path:
+    # 檔名帶該段結束時的 bar 數：依檔名排序即為時間順序，重複 save 同一個 checkpoint 只會覆寫同一檔
+    return directory / f"{name}-{n_bars:012d}.parquet"
+
+
+def load_history(history_dir) -> BacktestResult:
+    """讀回 history_dir 內依序 append 的 trades / fills / equity（整段回測的完整紀錄）。"""
+    directory = Path(history_dir)
+
+    def parts(name: str) -> list:
+        return [pd.read_parquet(p) for p in sorted(directory.glob(f"{name}-*.parquet"))]
+
+    trades, fills, equity = parts("trades"), parts("fills"), parts("equity")
+    return BacktestResult(
+        trades=[t for frame in trades for t in trades_from_frame(frame)],
+        fills=[f for frame in fills for f in fills_from_frame(frame)],
+        equity_curve=(
+            pd.concat(equity)["equity"]
+            if equity
+            else pd.Series(dtype=float, name="equity", index=pd.DatetimeIndex([], name="time"))
+        ),
+    )
+
+
+@dataclass
+class Checkpoint:
+    """
+    接續回測所需的精簡狀態：現金與未平倉部位（含 entry_bar_i）、中止規則計數、策略狀態、
+    engine 設定指紋，以及計算指標 warmup 用的最後 warmup_bars 根原始 bar；大小與已跑的長度無關。
+    trades / fills / equity 歷史不放在 checkpoint 內：上次 save 之後新增的部分暫存在 new_*，
+    save 時 append 到 history_dir（每次一個檔），完整紀錄用 history() / load_history 讀回。
+    save / load 為單一 zip 檔（meta.json + tail.parquet），帶版本號。
+    """
+
+    config: Dict[str, Any]
+    strategy: Dict[str, Any]
+    engine: Dict[str, str]
+    n_bars: int
+    last_time: Optional[pd.Timestamp]
+    cash: float
+    position: Dict[str, Any]
+    tail: pd.DataFrame
+    warmup_bars: int
+    n_trades: int = 0  # 至今累計的已平倉交易數
+    strategy_state: Dict[str, Any] = field(default_factory=dict)
+    abort_state: Optional[Dict[str, Any]] = None
+    abort_reason: Optional[str] = None
+    abort_bar_i: Optional[int] = None
+    exec_stats: Dict[str, float] = field(default_factory=dict)
+    new_trades: pd.DataFrame = field(default_factory=lambda: trades_to_frame([]))
+    new_fills: pd.DataFrame = field(default_factory=lambda: fills_to_frame([]))
+    new_equity: pd.Series = field(
+        default_factory=lambda: pd.Series(dtype=float, name="equity", index=pd.DatetimeIndex([], name="time"))
+    )
+    history_dir: Optional[str] = None
+    version: int = CHECKPOINT_VERSION
+
+    @classmethod
+    def from_state(
+        cls,
+        state: "EngineState",
+        df: pd.DataFrame,
+        strategy: Strategy,
+        config: BacktestConfig,
+        warmup_bars: int,
+        engine: Optional[Dict[str, str]] = None,
+        previous: Optional["Checkpoint"] = None,
+    ) -> "Checkpoint":
+        """
+        state 的 trades / fills / equity 為本段（previous 之後）新增的部分；
+        previous 尚未 save 的 new_* 會一併帶到新的 checkpoint。
+        """
+        if hasattr(state.portfolio, "book"):
+            raise ValueError("checkpoints are not supported for position_mode='book' strategies")
+        abort_state = None
+        if state.abort is not None:
+            abort_state = {
+                "peak": state.abort.peak,
+                "n_trades_seen": state.abort.n_trades_seen,
+                "consecutive_losses": state.abort.consecutive_losses,
+            }
+        trades = trades_to_frame(state.portfolio.trades)
+        fills = fills_to_frame(state.portfolio.fills)
+        equity = pd.Series(state.equity_points, index=pd.Index(state.equity_index, name="time"), name="equity")
+        last_time = state.equity_index[-1] if state.equity_index else None
+        n_trades = len(state.portfolio.trades)
+        if previous is not None:
+            trades = _concat(previous.new_trades, trades)
+            fills = _concat(previous.new_fills, fills)
+            equity = _concat(previous.new_equity, equity)
+            last_time = last_time if last_time is not None else previous.last_time
+            n_trades += previous.n_trades
+        return cls(
+            config=json.loads(_stable_json(dataclasses.asdict(config))),
+            strategy=json.loads(_stable_json(strategy_fingerprint(strategy))),
+            engine=dict(engine or {}),
+            n_bars=state.n_bars,
+            last_time=last_time,
+            cash=state.portfolio.cash,
+            position=_position_to_dict(state.portfolio.position),
+            tail=df.iloc[max(0, len(df) - warmup_bars):] if warmup_bars > 0 else df.iloc[:0],
+            warmup_bars=warmup_bars,
+            n_trades=n_trades,
+            strategy_state=strategy.get_state(),
+            abort_state=abort_state,
+            abort_reason=state.abort_reason,
+            abort_bar_i=state.abort_bar_i,
+            exec_stats={
+                "ambiguous_bars": state.exec_model.ambiguous_bars,
+                "resolved_bars": state.exec_model.resolved_bars,
+                "traded_notional": state.exec_model.traded_notional,
+            },
+            new_trades=trades,
+            new_fills=fills,
+            new_equity=equity,
+            history_dir=previous.history_dir if previous is not None else None,
+        )
+
+    def check_compatible(self, strategy: Strategy, config: BacktestConfig, engine: Optional[Dict[str, str]] = None) -> None:
+        """engine：cache.engine_fingerprint（成本模型 / 精度 / intrabar resolver），與建立時不同則拒絕接續。"""
+        if self.version != CHECKPOINT_VERSION:
+            raise ValueError(f"Unsupported checkpoint version: {self.version}")
+        if json.loads(_stable_json(dataclasses.asdict(config))) != self.config:
+            raise ValueError("checkpoint was created with a different BacktestConfig")
+        if json.loads(_stable_json(strategy_fingerprint(strategy))) != self.strategy:
+            raise ValueError("checkpoint was created with a different strategy, params or strategy source")
+        if engine is not None and dict(engine) != self.engine:
+            raise ValueError(
+                f"checkpoint was created with different engine settings ({self.engine} != {dict(engine)})"
+            )
+
+    def to_state(self, state: "EngineState", strategy: Strategy) -> "EngineState":
+        """把 checkpoint 內容寫回一個新建的 EngineState（並還原策略狀態）；trades / fills / equity 從空的開始。"""
+        state.portfolio.cash = self.cash
+        state.portfolio.position = _position_from_dict(self.position)
+        state.n_bars = self.n_bars
+        state.abort_reason = self.abort_reason
+        state.abort_bar_i = self.abort_bar_i
+        if state.abort is not None and self.abort_state is not None:
+            state.abort.peak = self.abort_state["peak"]
+            state.abort.n_trades_seen = self.abort_state["n_trades_seen"]
+            state.abort.consecutive_losses = self.abort_state["consecutive_losses"]
+            # 之前的交易不在 trades list 內（同串流回測）
+            state.abort.trades_offset = self.n_trades
+        state.exec_model.ambiguous_bars = self.exec_stats.get("ambiguous_bars", 0)
+        state.exec_model.resolved_bars = self.exec_stats.get("resolved_bars", 0)
+        state.exec_model.traded_notional = self.exec_stats.get("traded_notional", 0.0)
+        strategy.set_state(self.strategy_state)
+        return state
+
+    # ---- 歷史 ----
+    def append_history(self, history_dir=None) -> Path:
+        """把 new_* append 到 history_dir（預設沿用上次的位置）後清空。"""
+        if history_dir is None:
+            history_dir = self.history_dir
+        if history_dir is None:
+            raise ValueError("history_dir is required")
+        directory = Path(history_dir)
+        directory.mkdir(parents=True, exist_ok=True)
+        if len(self.new_trades):
+            self.new_trades.to_parquet(_history_part(directory, "trades", self.n_bars), index=False)
+        if len(self.new_fills):
+            self.new_fills.to_parquet(_history_part(directory, "fills", self.n_bars), index=False)
+        if len(self.new_equity):
+            self.new_equity.to_frame().to_parquet(_history_part(directory, "equity", self.n_bars))
+        self.new_trades = self.new_trades.iloc[:0]
+        self.new_fills = self.new_fills.iloc[:0]
+        self.new_equity = self.new_equity.iloc[:0]
+        self.history_dir = str(directory)
+        return directory
+
+    def history(self) -> BacktestResult:
+        """至今完整的 trades / fills / equity（已 append 的 history + 尚未 save 的 new_*）。"""
+        saved = load_history(self.history_dir) if self.history_dir is not None else None
+        trades = trades_from_frame(self.new_trades)
+        fills = fills_from_frame(self.new_fills)
+        if saved is None:
+            return BacktestResult(trades=trades, fills=fills, equity_curve=self.new_equity)
+        return BacktestResult(
+            trades=saved.trades + trades,
+            fills=saved.fills + fills,
+            equity_curve=_concat(saved.equity_curve, self.new_equity),
+        )
+
+    # ---- 檔案 ----
+    def save(self, path, history_dir=None) -> Path:
+        """
+        寫出精簡 checkpoint；new_* 先 append 到 history_dir
+        （預設：沿用上次的位置，第一次為 path 旁的 <檔名>.history 資料夾）。
+        """
+        path = Path(path)
+        if history_dir is None:
+            history_dir = self.history_dir or path.with_name(path.name + ".history")
+        self.append_history(history_dir)
+        meta = {
+            "version": self.version,
+            "config": self.config,
+            "strategy": self.strategy,
+            "engine": self.engine,
+            "n_bars": self.n_bars,
+            "last_time": self.last_time.isoformat() if self.last_time is not None else None,
+            "cash": self.cash,
+            "position": self.position,
+            "warmup_bars": self.warmup_bars,
+            "n_trades": self.n_trades,
+            "strategy_state": self.strategy_state,
+            "abort_state": self.abort_state,
+            "abort_reason": self.abort_reason,
+            "abort_bar_i": self.abort_bar_i,
+            "exec_stats": self.exec_stats,
+            "history_dir": self.history_dir,
+        }
+        with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+            zf.writestr("meta.json", json.dumps(meta, default=str))
+            buf = io.BytesIO()
+            self.tail.to_parquet(buf, index=True)
+            zf.writestr("tail.parquet", buf.getvalue())
+        return path
+
+    @classmethod
+    def load(cls, path) -> "Checkpoint":
+        with zipfile.ZipFile(path, "r") as zf:
+            meta = json.loads(zf.read("meta.json"))
+            if meta.get("version") != CHECKPOINT_VERSION:
+                raise ValueError(f"Unsupported checkpoint version: {meta.get('version')}")
+            tail = pd.read_parquet(io.BytesIO(zf.read("tail.parquet")))
+        return cls(
+            config=meta["config"],
+            strategy=meta["strategy"],
+            engine=meta["engine"],
+            n_bars=meta["n_bars"],
+            last_time=pd.Timestamp(meta["last_time"]) if meta["last_time"] is not None else None,
+            cash=meta["cash"],
+            position=meta["position"],
+            tail=tail,
+            warmup_bars=meta["warmup_bars"],
+            n_trades=meta["n_trades"],
+            strategy_state=meta["strategy_state"],
+            abort_state=meta["abort_state"],
+            abort_reason=meta["abort_reason"],
+            abort_bar_i=meta["abort_bar_i"],
+            exec_stats=meta["exec_stats"],
+            history_dir=meta["history_dir"],
+            version=meta["version"],
+        )
+
+
+def _concat(a, b):
+    if not len(a):
+        return b
+    if not len(b):
+        return a
+    return pd.concat([a, b])
@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from .indicators import IndicatorRegistry
+from .models import BacktestConfig, BacktestResult
+from .strategy_base import Strategy
+
+
+# 指定的精簡 dtype（其餘浮點指標一律 float32，整數 / 布林指標保持原 dtype）
+COMPACT_INDICATOR_DTYPES: Dict[str, Any] = {
+    "bar_side": np.int8,
+    "body_strictly_increasing": np.bool_,
+}
+
+
+def compact_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """float64 欄位轉成 float32（index 與其他欄位不變）；已是精簡格式時直接回傳。"""
+    cols = [c for c in df.columns if df[c].dtype == np.float64]
+    if not cols:
+        return df
+    return df.astype({c: np.float32 for c in cols})
+
+
+def compact_value(value: Any, dtype: Any = None) -> Any:
+    """指標值轉成精簡 dtype：指定 dtype 時照做，否則 float64 -> float32。"""
+    if isinstance(value, pd.Series):
+        if dtype is not None:
+            return value.astype(dtype)
+        return value.astype(np.float32) if value.dtype == np.float64 else value
+    if isinstance(value, np.ndarray):
+        if dtype is not None:
+            return value.astype(dtype)
+        return value.astype(np.float32) if value.dtype == np.float64 else value
+    return value
+
+
+class CompactRegistry:
+    """
+    包一個 IndicatorRegistry：呼叫方式相同，輸出轉成精簡 dtype（見 COMPACT_INDICATOR_DTYPES）。
+    """
+
+    def __init__(self, base: Optional[IndicatorRegistry] = None) -> None:
+        self.base = base or IndicatorRegistry()
+
+    def __getattr__(self, name: str) -> Callable[..., Any]:
+        fn = getattr(self.base, name)
+        if not callable(fn):
+            return fn
+        dtype = COMPACT_INDICATOR_DTYPES.get(name)
+
+        def wrapped(df: pd.DataFrame, *params):
+            return compact_value(fn(df, *params), dtype)
+
+        return wrapped
+
+
+def frame_nbytes(df: pd.DataFrame, indicators: Optional[Dict[str, Any]] = None) -> int:
+    """資料（含 index）與指標佔用的記憶體位元組數（比較 float32 / float64 模式用）。"""
+    total = int(df.memory_usage(index=True, deep=False).sum())
+    for value in (indicators or {}).values():
+        if isinstance(value, pd.Series):
+            total += int(value.memory_usage(index=False, deep=False))
+        elif isinstance(value, np.ndarray):
+            total += value.nbytes
+    return total
+
+
+@dataclass
+class PrecisionReport:
+    """float32 與 float64 回測結果的差異。"""
+
+    n_trades_64: int
+    n_trades_32: int
+    matched_trades: int                    # 從頭開始 side / 進出場時間 / 出場類型都相同的筆數
+    first_divergence: Optional[pd.Timestamp]  # 第一筆不同交易的進場時間（較早的一方）；完全一致為 None
+    max_price_diff: float                  # 相同交易中進出場價的最大絕對差
+    max_pnl_diff: float                    # 相同交易中 pnl 的最大絕對差
+    final_equity_diff: float
+    metrics_64: Dict[str, float] = field(default_factory=dict)
+    metrics_32: Dict[str, float] = field(default_factory=dict)
+
+    @property
+    def metric_diffs(self) -> Dict[str, float]:
+        return {k: self.metrics_32[k] - v for k, v in self.metrics_64.items() if k in self.metrics_32}
+
+    @property
+    def identical_trades(self) -> bool:
+        return self.n_trades_64 == self.n_trades_32 == self.matched_trades
+
+    def to_frame(self) -> pd.DataFrame:
+        """每個指標一列：float64、float32、差值。"""
+        return pd.DataFrame({"float64": self.metrics_64, "float32": self.metrics_32, "diff": self.metric_diffs})
+
+
+def _same_trade(a, b) -> bool:
+    return a.side == b.side and a.entry_time == b.entry_time and a.exit_time == b.exit_time and a.exit_type == b.exit_type
+
+
+def compare_precision(df: pd.DataFrame, r64: BacktestResult, r32: BacktestResult) -> PrecisionReport:
+    from .analytics import summary_metrics
+
+    matched = 0
+    price_diff = 0.0
+    pnl_diff = 0.0
+    for a, b in zip(r64.trades, r32.trades):
+        if not _same_trade(a, b):
+            break
+        matched += 1
+        price_diff = max(price_diff, abs(a.entry_price - b.entry_price), abs(a.exit_price - b.exit_price))
+        pnl_diff = max(pnl_diff, abs(a.pnl - b.pnl))
+
+    first: Optional[pd.Timestamp] = None
+    rest = [t.entry_time for t in (r64.trades[matched:matched + 1] + r32.trades[matched:matched + 1])]
+    if rest:
+        first = min(rest)
+
+    eq64 = float(r64.equity_curve.iat[-1]) if len(r64.equity_curve) else float("nan")
+    eq32 = float(r32.equity_curve.iat[-1]) if len(r32.equity_curve) else float("nan")
+    return PrecisionReport(
+        n_trades_64=len(r64.trades),
+        n_trades_32=len(r32.trades),
+        matched_trades=matched,
+        first_divergence=first,
+        max_price_diff=price_diff,
+        max_pnl_diff=pnl_diff,
+        final_equity_diff=eq32 - eq64,
+        metrics_64=summary_metrics(r64, df),
+        metrics_32=summary_metrics(r32, df),
+    )
+
+
+def validate_precision(
+    df: pd.DataFrame,
+    strategy_factory: Callable[[], Strategy],
+    config: BacktestConfig,
+    engine_kwargs: Optional[Dict[str, Any]] = None,
+) -> PrecisionReport:
+    """同一份資料各跑一次 float64 與 float32，回報交易與指標的差異（每次用新的策略實例）。"""
+    from .engine import BacktestEngine
+
+    kwargs = dict(engine_kwargs or {})
+    kwargs.pop("precision", None)
+    r64 = BacktestEngine(config, precision="float64", **kwargs).run(df, strategy_factory())
+    r32 = BacktestEngine(config, precision="float32", **kwargs).run(df, strategy_factory())
+    return compare_precision(df, r64, r32)
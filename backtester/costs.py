@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .models import BacktestConfig, ExitType
+
+
+# ---- 手續費 ----
+class FeeModel(ABC):
+    """手續費率模型：全部輸入為等長陣列，一次回傳每筆成交的費率。"""
+
+    @abstractmethod
+    def rates(self, notional: np.ndarray, maker: np.ndarray, prior_volume: np.ndarray) -> np.ndarray:
+        """notional：成交金額（絕對值）；maker：是否為掛單成交；prior_volume：本筆之前的累積成交金額。"""
+        raise NotImplementedError
+
+
+@dataclass(frozen=True)
+class FlatFee(FeeModel):
+    rate: float
+
+    def rates(self, notional, maker, prior_volume):
+        return np.full(len(notional), self.rate)
+
+
+@dataclass(frozen=True)
+class MakerTakerFee(FeeModel):
+    maker_rate: float
+    taker_rate: float
+
+    def rates(self, notional, maker, prior_volume):
+        return np.where(maker, self.maker_rate, self.taker_rate)
+
+
+@dataclass(frozen=True)
+class VolumeTieredFee(FeeModel):
+    """
+    依累積成交金額分級（回測開始起算）：tiers 為 (門檻, maker 費率, taker 費率)，門檻遞增且第一級為 0。
+    例：((0, 0.0002, 0.0005), (5e6, 0.00016, 0.0004), (2.5e7, 0.00014, 0.00035))
+    """
+
+    tiers: Tuple[Tuple[float, float, float], ...]
+
+    def __post_init__(self) -> None:
+        levels = [t[0] for t in self.tiers]
+        if not levels or levels[0] != 0 or any(b <= a for a, b in zip(levels, levels[1:])):
+            raise ValueError("tiers must start at 0 and have increasing thresholds")
+
+    def rates(self, notional, maker, prior_volume):
+        levels = np.array([t[0] for t in self.tiers], dtype=float)
+        k = np.searchsorted(levels, prior_volume, side="right") - 1
+        maker_rates = np.array([t[1] for t in self.tiers])
+        taker_rates = np.array([t[2] for t in self.tiers])
+        return np.where(maker, maker_rates[k], taker_rates[k])
+
+
+# ---- 滑價 ----
+class SlippageModel(ABC):
+    """
+    滑價模型（保守：買更貴、賣更便宜）。需要逐根資料（K 線振幅、ATR 等）的模型在 bar_values 先整段算好，
+    fill_prices 收到的 bar_value 為每筆成交所在那根的值（不需要時為 None）。
+    """
+
+    def bar_values(self, df: pd.DataFrame) -> Optional[np.ndarray]:
+        return None
+
+    @abstractmethod
+    def fill_prices(self, raw: np.ndarray, is_buy: np.ndarray, bar_value: Optional[np.ndarray]) -> np.ndarray:
+        raise NotImplementedError
+
+
+@dataclass(frozen=True)
+class FixedBpsSlippage(SlippageModel):
+    bps: float
+
+    def fill_prices(self, raw, is_buy, bar_value):
+        b = self.bps / 10_000.0
+        return np.where(is_buy, raw * (1.0 + b), raw * (1.0 - b))
+
+
+@dataclass(frozen=True)
+class RangeSlippage(SlippageModel):
+    """滑價 = fraction * 成交那根 K 線的 high - low（價格單位）。"""
+
+    fraction: float
+
+    def bar_values(self, df):
+        return (df["high"].to_numpy(dtype=float) - df["low"].to_numpy(dtype=float)) * self.fraction
+
+    def fill_prices(self, raw, is_buy, bar_value):
+        return np.where(is_buy, raw + bar_value, raw - bar_value)
+
+
+@dataclass(frozen=True)
+class ATRSlippage(SlippageModel):
+    """滑價 = fraction * ATR(length)（成交那根）；ATR 尚未就緒的 bar 改用該根 high - low。"""
+
+    fraction: float
+    length: int = 14
+
+    def bar_values(self, df):
+        from .indicators import atr
+
+        hl = df["high"].to_numpy(dtype=float) - df["low"].to_numpy(dtype=float)
+        values = atr(df, self.length).to_numpy(dtype=float)
+        return np.where(np.isnan(values), hl, values) * self.fraction
+
+    def fill_prices(self, raw, is_buy, bar_value):
+        return np.where(is_buy, raw + bar_value, raw - bar_value)
+
+
+# ---- 組合 ----
+@dataclass(frozen=True)
+class CostModel:
+    """
+    成交成本 = 滑價模型 + 手續費模型。maker_exit_types 中的出場（預設 TP，即掛在簿上的限價單）
+    以 maker 費率計費，其餘成交（收盤進場、SL / BE 停損、time-exit）為 taker。
+    預設（from_config）為 config 的固定 fee_rate + slippage_bps，與原本的計算逐位元相同。
+    """
+
+    fees: FeeModel
+    slippage: SlippageModel
+    maker_exit_types: Tuple[ExitType, ...] = (ExitType.TP,)
+
+    @classmethod
+    def from_config(cls, config: BacktestConfig) -> "CostModel":
+        return cls(fees=FlatFee(config.fee_rate), slippage=FixedBpsSlippage(config.slippage_bps))
+
+    def is_flat(self, config: BacktestConfig) -> bool:
+        """是否等同 config 的固定費率 / 固定滑價（repricing 以 raw price 重算成本時需要）。"""
+        return self.fees == FlatFee(config.fee_rate) and self.slippage == FixedBpsSlippage(config.slippage_bps)
+
+    @property
+    def fingerprint(self) -> str:
+        return repr(self)
+
+    def is_maker(self, exit_types) -> np.ndarray:
+        return np.array([t is not None and t in self.maker_exit_types for t in exit_types], dtype=bool)
+
@@ -0,0 +1,229 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Iterable, Iterator, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from .streaming import _SpillWriter
+
+
+BAR_KINDS = ("time", "volume", "dollar")
+BAR_COLUMNS = ("open", "high", "low", "close", "volume", "dollar_volume", "n_ticks")
+# 資料庫的 K 線檔：時間存在 dt_utc 欄（與 notebook 的 load_crypto_parquet_data 相同格式）
+TIME_COLUMN = "dt_utc"
+
+
+def bar_file_name(coin: str, timeframe: str, n_months: int, section: str = "UTC") -> str:
+    """資料庫檔名：{coin}_{timeframe}_{n}M_{section}.parquet（例 BTC_1m_54M_UTC.parquet）。"""
+    return f"{coin}_{timeframe}_{n_months}M_{section}.parquet"
+
+
+def _to_ns(values, time_unit: str) -> np.ndarray:
+    """datetime64 / tz-aware / 數值（time_unit 為單位）時間 -> UTC ns int64。"""
+    values = pd.Index(values)
+    if pd.api.types.is_numeric_dtype(values.dtype):
+        return pd.DatetimeIndex(pd.to_datetime(values, unit=time_unit, utc=True)).as_unit("ns").asi8
+    return pd.DatetimeIndex(pd.to_datetime(values, utc=True)).as_unit("ns").asi8
+
+
+class BarBuilder:
+    """
+    把逐筆成交（時間、價格、數量）聚合成 K 線，可分段餵入：update 回傳已完成的 bar，
+    最後呼叫 flush 取得最後一根。每段以 NumPy 分組（reduceat）一次聚合，不逐筆迴圈。
+
+    kind：
+    - "time"：freq（例 "1min"、"15s"）對齊 UTC epoch 的固定時間格，沒有成交的時段不產生 bar；index 為時間格起點。
+    - "volume" / "dollar"：累積成交量（或成交金額 price*size）每達 threshold 切一根。
+      切點固定在累積值的 threshold 整數倍，跨越切點的那筆成交算在前一根，
+      超出的部分計入下一根的額度（各根平均剛好 threshold，單筆超大成交會跳過中間的格）；
+      index 為該根第一筆成交的時間，close_time 欄為最後一筆。
+
+    分段切在哪裡都不影響結果：未完成那根的成交保留到下一段，累積值以序列 cumsum 接續。
+    成交必須依時間排序（跨段亦同），否則 ValueError。
+    """
+
+    def __init__(self, kind: str = "time", freq: Optional[str] = None, threshold: Optional[float] = None) -> None:
+        if kind not in BAR_KINDS:
+            raise ValueError(f"Unknown bar kind: {kind}")
+        if kind == "time":
+            if freq is None:
+                raise ValueError("time bars require freq")
+            self.freq_ns = int(pd.Timedelta(freq).value)
+            if self.freq_ns <= 0:
+                raise ValueError(f"Invalid freq: {freq}")
+        elif threshold is None or threshold <= 0:
+            raise ValueError(f"{kind} bars require a positive threshold")
+        self.kind = kind
+        self.threshold = threshold
+        self._ts = np.empty(0, dtype=np.int64)
+        self._price = np.empty(0)
+        self._size = np.empty(0)
+        self._base = 0.0  # 保留中成交之前的累積量（volume / dollar）
+        self.n_ticks = 0
+
+    def _keys(self, ts: np.ndarray, price: np.ndarray, size: np.ndarray) -> np.ndarray:
+        if self.kind == "time":
+            return ts // self.freq_ns
+        amount = size if self.kind == "volume" else price * size
+        cum = np.cumsum(np.r_[self._base, amount])
+        return np.floor(cum[:-1] / self.threshold).astype(np.int64)
+
+    def update(self, ts_ns: np.ndarray, price: np.ndarray, size: np.ndarray) -> pd.DataFrame:
+        ts_ns = np.asarray(ts_ns, dtype=np.int64)
+        price = np.asarray(price, dtype=float)
+        size = np.asarray(size, dtype=float)
+        if len(ts_ns) == 0:
+            return self._aggregate(ts_ns, price, size, ts_ns)
+        last = self._ts[-1] if len(self._ts) else None
+        if np.any(np.diff(ts_ns) < 0) or (last is not None and ts_ns[0] < last):
+            raise ValueError("ticks must be sorted by time")
+        self.n_ticks += len(ts_ns)
+
+        ts = np.r_[self._ts, ts_ns]
+        px = np.r_[self._price, price]
+        sz = np.r_[self._size, size]
+        keys = self._keys(ts, px, sz)
+
+        # 最後一個 key 的成交可能還沒結束，留到下一段
+        cut = int(np.searchsorted(keys, keys[-1], side="left"))
+        if self.kind != "time":
+            amount = sz[:cut] if self.kind == "volume" else px[:cut] * sz[:cut]
+            self._base = float(np.cumsum(np.r_[self._base, amount])[-1])
+        self._ts, self._price, self._size = ts[cut:], px[cut:], sz[cut:]
+        return self._aggregate(ts[:cut], px[:cut], sz[:cut], keys[:cut])
+
+    def update_frame(
+        self,
+        ticks: pd.DataFrame,
+        time_column: str = "timestamp",
+        price_column: str = "price",
+        size_column: str = "size",
+        time_unit: str = "ms",
+    ) -> pd.DataFrame:
+        """ticks 為 DataFrame（時間欄可為 datetime 或以 time_unit 為單位的數值）。"""
+        times = ticks.index if time_column is None else ticks[time_column]
+        return self.update(_to_ns(times, time_unit), ticks[price_column].to_numpy(), ticks[size_column].to_numpy())
+
+    def flush(self) -> pd.DataFrame:
+        """回傳保留中的最後一根（資料結束時呼叫）。"""
+        ts, px, sz = self._ts, self._price, self._size
+        keys = self._keys(ts, px, sz) if len(ts) else np.empty(0, dtype=np.int64)
+        self._ts, self._price, self._size = ts[:0], px[:0], sz[:0]
+        return self._aggregate(ts, px, sz, keys)
+
+    def _aggregate(self, ts: np.ndarray, px: np.ndarray, sz: np.ndarray, keys: np.ndarray) -> pd.DataFrame:
+        if len(ts) == 0:
+            return self._frame(ts, px, sz, keys=keys, starts=np.empty(0, dtype=np.int64))
+        starts = np.r_[0, np.flatnonzero(keys[1:] != keys[:-1]) + 1]
+        return self._frame(ts, px, sz, keys=keys, starts=starts)
+
+    def _frame(self, ts, px, sz, keys, starts) -> pd.DataFrame:
+        ends = np.r_[starts[1:], len(ts)] if len(starts) else starts
+        if len(starts):
+            data = {
+                "open": px[starts],
+                "high": np.maximum.reduceat(px, starts),
+                "low": np.minimum.reduceat(px, starts),
+                "close": px[ends - 1],
+                "volume": np.add.reduceat(sz, starts),
+                "dollar_volume": np.add.reduceat(px * sz, starts),
+                "n_ticks": (ends - starts).astype(np.int64),
+            }
+            label = keys[starts] * self.freq_ns if self.kind == "time" else ts[starts]
+        else:
+            data = {c: np.empty(0, dtype=np.int64 if c == "n_ticks" else float) for c in BAR_COLUMNS}
+            label = np.empty(0, dtype=np.int64)
+        index = pd.DatetimeIndex(pd.to_datetime(label, unit="ns", utc=True), name=TIME_COLUMN)
+        frame = pd.DataFrame(data, index=index)
+        if self.kind != "time":
+            close_ns = ts[ends - 1] if len(starts) else np.empty(0, dtype=np.int64)
+            frame["close_time"] = pd.to_datetime(close_ns, unit="ns", utc=True)
+        return frame
+
+
+def bar_schema(kind: str = "time"):
+    """write_bars 的固定 Parquet schema（volume / dollar bar 多一個 close_time 欄）。"""
+    import pyarrow as pa
+
+    utc = pa.timestamp("ns", tz="UTC")
+    cols = [(TIME_COLUMN, utc)] + [(c, pa.int64() if c == "n_ticks" else pa.float64()) for c in BAR_COLUMNS]
+    if kind != "time":
+        cols.append(("close_time", utc))
+    return pa.schema(cols)
+
+
+def iter_tick_chunks(source, chunk_rows: int = 1_000_000, columns: Optional[Iterable[str]] = None) -> Iterator[pd.DataFrame]:
+    """
+    逐段讀取成交資料：Parquet（pyarrow iter_batches）、CSV（read_csv chunksize）
+    或直接傳入 DataFrame / DataFrame iterator。
+    """
+    if isinstance(source, pd.DataFrame):
+        for a in range(0, len(source), chunk_rows):
+            yield source.iloc[a : a + chunk_rows]
+        return
+    if not isinstance(source, (str, Path)):
+        yield from source
+        return
+    path = Path(source)
+    cols = list(columns) if columns is not None else None
+    if path.suffix == ".csv":
+        yield from pd.read_csv(path, chunksize=chunk_rows, usecols=cols)
+        return
+    import pyarrow.parquet as pq
+
+    pf = pq.ParquetFile(path, memory_map=True)
+    for batch in pf.iter_batches(batch_size=chunk_rows, columns=cols):
+        yield batch.to_pandas()
+
+
+def iter_bars(
+    source,
+    kind: str = "time",
+    freq: Optional[str] = None,
+    threshold: Optional[float] = None,
+    chunk_rows: int = 1_000_000,
+    time_column: str = "timestamp",
+    price_column: str = "price",
+    size_column: str = "size",
+    time_unit: str = "ms",
+) -> Iterator[pd.DataFrame]:
+    """逐段產生已完成的 K 線（記憶體中只有一段成交 + 未完成的一根）。"""
+    builder = BarBuilder(kind, freq=freq, threshold=threshold)
+    columns = [time_column, price_column, size_column]
+    for ticks in iter_tick_chunks(source, chunk_rows, columns=columns):
+        bars = builder.update_frame(ticks, time_column, price_column, size_column, time_unit)
+        if len(bars):
+            yield bars
+    bars = builder.flush()
+    if len(bars):
+        yield bars
+
+
+def build_bars(source, kind: str = "time", **kwargs) -> pd.DataFrame:
+    """一次回傳全部 K 線（可直接交給 BacktestEngine）；參數同 iter_bars。"""
+    parts = list(iter_bars(source, kind, **kwargs))
+    if not parts:
+        return BarBuilder(kind, freq=kwargs.get("freq"), threshold=kwargs.get("threshold")).flush()
+    return pd.concat(parts)
+
+
+def write_bars(source, path, kind: str = "time", **kwargs) -> int:
+    """
+    串流寫成資料庫格式的 Parquet（時間在 dt_utc 欄，每段一個 row group），回傳 bar 數。
+    讀回：pd.read_parquet(path).set_index("dt_utc")，或 streaming.iter_parquet_chunks(path, time_column="dt_utc")。
+    """
+    if kind not in BAR_KINDS:
+        raise ValueError(f"Unknown bar kind: {kind}")
+    writer = _SpillWriter(Path(path), bar_schema(kind), index=False)
+    try:
+        for bars in iter_bars(source, kind, **kwargs):
+            writer.write(bars.reset_index())
+    finally:
+        writer.close()
+    return writer.rows
+
+
+def load_bars(path: Union[str, Path]) -> pd.DataFrame:
+    return pd.read_parquet(path).set_index(TIME_COLUMN)
@@ -1,135 +1,649 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Dict, Any, List
+from dataclasses import dataclass, field, replace
+from typing import Callable, Dict, Any, List, Mapping, Optional, Sequence
 
+import numpy as np
 import pandas as pd
 
 from .models import BacktestConfig, BacktestResult, Side, ActionType, OrderIntent, ExitType
-from .indicators import IndicatorRegistry
+from .indicators import IndicatorRegistry, LazyIndicators
 from .strategy_base import Strategy, StrategyContext
-from .execution import ExecutionModel
+from .execution import EXIT_TYPE_BY_CODE, ExecutionModel
+from .costs import CostModel
 from .portfolio import Portfolio
+from .book import BookPortfolio
+from .abort import AbortMonitor, abort_enabled
+from .intrabar import LowerTimeframeResolver
+from .cache import engine_fingerprint
+from .checkpoint import Checkpoint
+from .eventlog import EventLogWriter
+from .rules import RULES_KEY, RuleStrategy
+from .compact import CompactRegistry, compact_frame
+from .sessions import session_ends, tradable_mask
+
+
+@dataclass
+class EngineState:
+    """bar loop 跨段延續所需的完整狀態（checkpoint / 串流回測用）。"""
+
+    portfolio: Portfolio | BookPortfolio
+    exec_model: ExecutionModel
+    abort: Optional[AbortMonitor] = None
+    equity_points: List[float] = field(default_factory=list)
+    equity_index: List[pd.Timestamp] = field(default_factory=list)
+    n_bars: int = 0  # 已處理的 bar 總數（= 下一根 bar 的全域 index）
+    abort_reason: Optional[str] = None
+    abort_bar_i: Optional[int] = None
+
+    @property
+    def aborted(self) -> bool:
+        return self.abort_reason is not None
+
+
+@dataclass
+class _Runner:
+    """_drive 的一個 runner：一組 strategy / indicators / state 與其每根 bar 的處理函式。"""
+
+    step: Callable[..., bool]  # _bar 或 _bar_book
+    strategy: Strategy
+    indicators: Dict[str, Any]
+    state: EngineState
+    entry_ok: Optional[np.ndarray] = None  # 可進場的 bar（None = 不限制）
+    flatten_bars: Optional[np.ndarray] = None  # 強制平倉的 bar（None = 無）
 
 
 @dataclass
 class BacktestEngine:
     config: BacktestConfig
+    # 選用：同一根 bar 同時碰到多條出場線時，改查小週期 K 線判斷先後（否則用保守規則）
+    intrabar_resolver: Optional[LowerTimeframeResolver] = None
+    # 選用：把 fills / trades / intents / 出場決策寫到事件記錄檔（背景執行緒、固定大小 batch）
+    event_sink: Optional[EventLogWriter] = None
+    # 指標預設在策略第一次取用時才計算；True 則在 bar loop 前全部算完（benchmark 用）
+    eager_indicators: bool = False
+    # 選用：以 thread pool 平行計算全部指標（隱含 eager）；indicator_chunk_rows 為長資料分段長度
+    indicator_workers: Optional[int] = None
+    indicator_chunk_rows: Optional[int] = None
+    # "float32"：K 線與指標以 float32 保存（bar_side 為 int8、body_strictly_increasing 為 bool），
+    # 現金 / 損益 / equity 仍以 float64 累計；與 float64 的差異可用 compact.validate_precision 檢查
+    precision: str = "float64"
+    # 選用：成交成本模型（maker/taker、分級費率、振幅 / ATR 滑價，見 costs.py）；None = config 的固定費率與滑價
+    cost_model: Optional[CostModel] = None
+
+    def __post_init__(self) -> None:
+        if self.precision not in ("float64", "float32"):
+            raise ValueError(f"Unknown precision: {self.precision}")
+
+    def run(
+        self,
+        df: pd.DataFrame,
+        strategy: Strategy,
+        indicators: Optional[Dict[str, Any]] = None,
+        tradable=None,
+        flatten_at_session_end: bool = False,
+    ) -> BacktestResult:
+        """
+        indicators：已算好的指標（name -> Series，需與 df 對齊，例：panel.PanelIndicators.for_symbol），
+        或以同一份 df（precision="float32" 時為 compact_frame 後的 df）建立的 LazyIndicators。
+        tradable：可交易遮罩（bool 陣列 / Series 或 index 區間 list，見 sessions.tradable_mask）。
+        指標仍以完整連續的 df 計算，只有遮罩內的 bar 允許進場；已有持倉照常出場。
+        flatten_at_session_end=True 時在每段可交易時段的最後一根以 close 平倉（ExitType.SESSION），該根不再進場；
+        時段由 tradable 決定，未給 tradable 時 raise ValueError。
+        """
+        if flatten_at_session_end and tradable is None:
+            raise ValueError("flatten_at_session_end requires a tradable mask")
+        self._validate_df(df)
+        df = self._prepare_frame(df)
+
+        if indicators is None:
+            indicator_registry = self._registry()
+            indicators = self._compute_indicators(df, strategy, indicator_registry, **self._indicator_options())
+        elif isinstance(indicators, LazyIndicators):
+            # 呼叫端建立的延遲計算容器（例：workers 以跨 job 快取建立）；未取用的指標仍不計算
+            indicators = self._with_rules(df, strategy, indicators)
+        else:
+            indicators = self._with_rules(df, strategy, dict(indicators))
+
+        mask = tradable_mask(df.index, tradable) if tradable is not None else None
+        state = self._new_state(df, strategy)
+        self._run_bars(df, strategy, indicators, state, tradable=mask, flatten=flatten_at_session_end)
+        return self._result(state, indicators)
 
-    def run(self, df: pd.DataFrame, strategy: Strategy) -> BacktestResult:
+    def run_masks(
+        self,
+        df: pd.DataFrame,
+        strategy: Strategy,
+        masks: Mapping[Any, Any],
+        flatten_at_session_end: bool = False,
+    ) -> Dict[Any, BacktestResult]:
+        """
+        同一份 df / 策略、多個可交易遮罩（name -> tradable）各跑一次，指標只算一次。
+        例：engine.run_masks(df, strategy, {"weekdays": session_mask(df.index, weekdays=range(5)), "all": None})
+        遮罩為 None 代表整份 df 為同一段連續時段（flatten_at_session_end 對它沒有時段結束可平倉）。
+        """
         self._validate_df(df)
+        df = self._prepare_frame(df)
+        indicators = self._compute_indicators(df, strategy, self._registry(), **self._indicator_options())
+        results: Dict[Any, BacktestResult] = {}
+        for name, tradable in masks.items():
+            mask = tradable_mask(df.index, tradable) if tradable is not None else None
+            state = self._new_state(df, strategy)
+            self._run_bars(df, strategy, indicators, state, tradable=mask, flatten=flatten_at_session_end)
+            results[name] = self._result(state, indicators)
+        return results
+
+    def run_multi(
+        self,
+        df: pd.DataFrame,
+        strategies: Sequence[Strategy] | Mapping[Any, Strategy],
+        configs: Sequence[BacktestConfig] | Mapping[Any, BacktestConfig] | None = None,
+    ) -> List[BacktestResult] | Dict[Any, BacktestResult]:
+        """
+        多個策略（各自的 Portfolio / config）同一份 df 只走一次 bar loop。
+        全部策略共用一份指標快取（required_indicators 的聯集，相同 spec 只算一次），
+        結果與各自 BacktestEngine(config).run 相同。
+        strategies：list（回傳 list）或 name -> strategy（回傳 name -> BacktestResult）；
+        configs：與 strategies 同形狀的 BacktestConfig（None = 全部用 self.config）。
+        """
+        if self.event_sink is not None:
+            raise ValueError("run_multi does not support event_sink (events of different strategies would interleave)")
+        self._validate_df(df)
+        df = self._prepare_frame(df)
+        names = list(strategies) if isinstance(strategies, Mapping) else None
+        strats = [strategies[k] for k in names] if names is not None else list(strategies)
+        if configs is None:
+            cfgs = [self.config] * len(strats)
+        else:
+            cfgs = [configs[k] for k in names] if names is not None else list(configs)
+            if len(cfgs) != len(strats):
+                raise ValueError(f"got {len(cfgs)} configs for {len(strats)} strategies")
+
+        reg = self._registry()
+        cache: Dict[tuple, Any] = {}
+        engines = [self if cfg == self.config else replace(self, config=cfg) for cfg in cfgs]
+        indicators = [self._compute_indicators(df, s, reg, cache=cache, **self._indicator_options()) for s in strats]
+        states = [e._new_state(df, s) for e, s in zip(engines, strats)]
+        runners = [e._runner(df, s, ind, st) for e, s, ind, st in zip(engines, strats, indicators, states)]
+        self._drive(df, runners)
+
+        results = [e._result(st, ind) for e, st, ind in zip(engines, states, indicators)]
+        return dict(zip(names, results)) if names is not None else results
+
+    def run_checkpointed(
+        self, df: pd.DataFrame, strategy: Strategy, warmup_bars: int = 2000
+    ) -> tuple[BacktestResult, Checkpoint]:
+        """同 run，另外回傳可用 resume 接續新 bar 的 checkpoint。"""
+        self._validate_df(df)
+        df = self._prepare_frame(df)
+        indicators = self._compute_indicators(df, strategy, self._registry(), **self._indicator_options())
+        state = self._new_state(df, strategy)
+        self._run_bars(df, strategy, indicators, state)
+        checkpoint = Checkpoint.from_state(state, df, strategy, self.config, warmup_bars, engine=engine_fingerprint(self))
+        return self._result(state, indicators), checkpoint
+
+    def resume(
+        self, checkpoint: Checkpoint, df: pd.DataFrame, strategy: Strategy, warmup_bars: Optional[int] = None
+    ) -> tuple[BacktestResult, Checkpoint]:
+        """
+        從 checkpoint 接續跑 df 中時間晚於 checkpoint 最後一根 bar 的部分（可直接傳入完整的新資料）。
+        指標以 checkpoint 保存的 warmup 尾段 + 新 bar 計算；固定視窗指標與完整重跑逐位元相同，
+        EMA/ATR 這類遞迴指標在 warmup 夠長時（預設 2000 根）差異小於浮點誤差。
+        成本模型 / 精度 / intrabar resolver 與建立 checkpoint 時不同會 ValueError。
+        回傳本次新跑的 bar 的結果（trades / fills / equity 只含 checkpoint 之後）與新的 checkpoint；
+        完整期間的紀錄見 Checkpoint.history()。
+        """
+        self._validate_df(df)
+        df = self._prepare_frame(df)
+        fingerprint = engine_fingerprint(self)
+        checkpoint.check_compatible(strategy, self.config, fingerprint)
+        new = df.loc[df.index > checkpoint.last_time] if checkpoint.last_time is not None else df
+        frame = pd.concat([checkpoint.tail, new]) if len(checkpoint.tail) else new
+        state = checkpoint.to_state(self._new_state(frame, strategy), strategy)
+        if state.aborted:
+            return self._result(state), checkpoint
+
+        indicators = self._compute_indicators(frame, strategy, self._registry(), **self._indicator_options())
+        start = len(checkpoint.tail)
+        self._run_bars(frame, strategy, indicators, state, start=start, offset=state.n_bars - start)
+        warmup = checkpoint.warmup_bars if warmup_bars is None else warmup_bars
+        new_checkpoint = Checkpoint.from_state(
+            state, frame, strategy, self.config, warmup, engine=fingerprint, previous=checkpoint
+        )
+        return self._result(state, indicators), new_checkpoint
+
+    def run_streaming(
+        self,
+        source,
+        strategy: Strategy,
+        out_dir,
+        chunk_rows: Optional[int] = None,
+        warmup_bars: int = 2000,
+        time_column: Optional[str] = None,
+    ):
+        """逐段讀取 Parquet（或 DataFrame iterator）回測，結果直接寫到 out_dir；見 streaming.run_streaming。"""
+        from .streaming import run_streaming
+
+        return run_streaming(self, source, strategy, out_dir, chunk_rows, warmup_bars, time_column)
+
+    def _prepare_frame(self, df: pd.DataFrame) -> pd.DataFrame:
+        return compact_frame(df) if self.precision == "float32" else df
+
+    def _registry(self) -> IndicatorRegistry | CompactRegistry:
+        return CompactRegistry() if self.precision == "float32" else IndicatorRegistry()
+
+    def _indicator_options(self) -> Dict[str, Any]:
+        return {"eager": self.eager_indicators, "workers": self.indicator_workers, "chunk_rows": self.indicator_chunk_rows}
 
-        indicator_registry = IndicatorRegistry()
-        indicators = self._compute_indicators(df, strategy, indicator_registry)
+    def _new_state(self, df: pd.DataFrame, strategy: Optional[Strategy] = None) -> EngineState:
+        exec_model = ExecutionModel(config=self.config, resolver=self.intrabar_resolver, costs=self.cost_model)
+        if self.intrabar_resolver is not None:
+            self.intrabar_resolver.ensure_bar_duration(df.index)
+        return EngineState(
+            portfolio=(
+                BookPortfolio(initial_cash=self.config.initial_cash)
+                if strategy is not None and strategy.position_mode == "book"
+                else Portfolio(initial_cash=self.config.initial_cash)
+            ),
+            exec_model=exec_model,
+            abort=AbortMonitor(self.config) if abort_enabled(self.config) else None,
+        )
 
-        portfolio = Portfolio(initial_cash=self.config.initial_cash)
-        exec_model = ExecutionModel(config=self.config)
+    def _run_bars(
+        self,
+        df: pd.DataFrame,
+        strategy: Strategy,
+        indicators: Dict[str, Any],
+        state: EngineState,
+        start: int = 0,
+        offset: int = 0,
+        tradable: Optional[np.ndarray] = None,
+        flatten: bool = False,
+    ) -> None:
+        """
+        跑 df 的第 start 根之後的 bar。i 為 df 內的位置（給策略/指標用），
+        gi = offset + i 為全域 bar index（持倉 entry_bar_i、fill.bar_i、中止規則用）。
+        tradable：與 df 等長的 bool 陣列，False 的 bar 拒絕進場；flatten=True 時在時段最後一根平倉。
+        """
+        self._drive(df, [self._runner(df, strategy, indicators, state, offset, tradable, flatten)], start, offset)
 
-        equity_points: List[float] = []
-        equity_index: List[pd.Timestamp] = []
+    def _runner(
+        self,
+        df: pd.DataFrame,
+        strategy: Strategy,
+        indicators: Dict[str, Any],
+        state: EngineState,
+        offset: int = 0,
+        tradable: Optional[np.ndarray] = None,
+        flatten: bool = False,
+    ) -> _Runner:
+        """建立 _drive 的 runner（依持倉模式選 _bar / _bar_book，並由 tradable 算出可進場 / 強制平倉的 bar）。"""
+        state.exec_model.prepare(df, offset)
+        entry_ok, flatten_bars = None, None
+        if tradable is not None:
+            entry_ok = tradable
+            if flatten:
+                flatten_bars = session_ends(tradable)
+                entry_ok = tradable & ~flatten_bars
+        step = self._bar_book if isinstance(state.portfolio, BookPortfolio) else self._bar
+        return _Runner(step, strategy, indicators, state, entry_ok, flatten_bars)
 
-        # bars held 計數：用 index 差估算（MVP）
-        entry_bar_i: int | None = None
+    @staticmethod
+    def _drive(df: pd.DataFrame, runners: List[_Runner], start: int = 0, offset: int = 0) -> None:
+        """
+        單一回測與 run_multi 共用的 bar loop：每根 bar 從 OHLC 欄位的 numpy 陣列（不複製，compact 模式維持 float32）
+        取出 scalar，依序交給各 runner；觸發提前中止的 runner 退出迴圈，其餘繼續。
+        """
+        index = df.index
+        opens, highs, lows, closes = (df[col].to_numpy() for col in ("open", "high", "low", "close"))
+        active = runners
+        for i in range(start, len(df)):
+            t = index[i]
+            o, h, l, c = float(opens[i]), float(highs[i]), float(lows[i]), float(closes[i])
+            gi = offset + i
+            active = [
+                r
+                for r in active
+                if not r.step(df, r.strategy, r.indicators, r.state, i, gi, t, o, h, l, c, r.entry_ok, r.flatten_bars)
+            ]
+            if not active:
+                break
 
-        for i in range(len(df)):
-            t = df.index[i]
-            o = float(df["open"].iat[i])
-            h = float(df["high"].iat[i])
-            l = float(df["low"].iat[i])
-            c = float(df["close"].iat[i])
+    def _bar(
+        self,
+        df: pd.DataFrame,
+        strategy: Strategy,
+        indicators: Dict[str, Any],
+        state: EngineState,
+        i: int,
+        gi: int,
+        t: pd.Timestamp,
+        o: float,
+        h: float,
+        l: float,
+        c: float,
+        entry_ok: Optional[np.ndarray] = None,
+        flatten_bars: Optional[np.ndarray] = None,
+    ) -> bool:
+        """單一持倉模式處理一根 bar（_drive 呼叫）；回傳是否觸發提前中止。"""
+        portfolio = state.portfolio
+        exec_model = state.exec_model
+        abort = state.abort
+        equity_points = state.equity_points
+        equity_index = state.equity_index
+        sink = self.event_sink
 
-            # 1) 先處理持倉的 intrabar exit（TP/SL/BE + 保守規則）
-            if portfolio.position.side is not None and portfolio.position.qty > 0:
-                side = portfolio.position.side
-                exit_type, exit_price = exec_model.conservative_exit_price(
+        # 1) 先處理持倉的 intrabar exit（TP/SL/BE + 保守規則）
+        if portfolio.position.side is not None and portfolio.position.qty > 0:
+            side = portfolio.position.side
+            exit_type, exit_price = exec_model.intrabar_exit(
+                time=t,
+                side=side,
+                bar_open=o,
+                bar_high=h,
+                bar_low=l,
+                bar_close=c,
+                tp=portfolio.position.tp_price,
+                sl=portfolio.position.sl_price,
+                be=portfolio.position.be_price,
+                bar_i=gi,
+            )
+            # 如果有觸發出場
+            if exit_type is not None and exit_price is not None:
+                fill = exec_model.fill_exit(
+                    time=t,
                     side=side,
-                    bar_open=o,
-                    bar_high=h,
-                    bar_low=l,
-                    bar_close=c,
-                    tp=portfolio.position.tp_price,
-                    sl=portfolio.position.sl_price,
-                    be=portfolio.position.be_price,
-                    time_exit=False,
+                    qty=portfolio.position.qty,
+                    price=exit_price,
+                    exit_type=exit_type,
+                    bar_i=gi,
                 )
-                # 如果有觸發出場
-                if exit_type is not None and exit_price is not None:
+                bars_held = (gi - portfolio.position.entry_bar_i) if portfolio.position.entry_bar_i is not None else 0
+                portfolio.apply_exit_fill(fill, bars_held=bars_held)
+                if sink is not None:
+                    sink.exit_decision(t, gi, side, exit_type, exit_price, reason="intrabar")
+                    sink.fill(fill)
+                    sink.trade(portfolio.trades[-1], bar_i=gi)
+
+        # 2) time-exit（用 close 出場）
+        if portfolio.position.side is not None and portfolio.position.qty > 0:
+            # 這裡示範：策略若要 time-exit，透過 intent 來觸發
+            time_exit_bars = getattr(strategy.p, "time_exit_bars", None)
+            if time_exit_bars is not None and (isinstance(time_exit_bars, int)):
+                bars_held = (gi - portfolio.position.entry_bar_i) if portfolio.position.entry_bar_i is not None else 0
+                if bars_held >= time_exit_bars:
                     fill = exec_model.fill_exit(
                         time=t,
-                        side=side,
+                        side=portfolio.position.side,
                         qty=portfolio.position.qty,
-                        price=exit_price,
-                        exit_type=exit_type,
+                        price=c,
+                        exit_type=ExitType.TIME,
+                        bar_i=gi,
                     )
-                    bars_held = (i - portfolio.position.entry_bar_i) if portfolio.position.entry_bar_i is not None else 0
                     portfolio.apply_exit_fill(fill, bars_held=bars_held)
+                    if sink is not None:
+                        sink.exit_decision(t, gi, fill.side, ExitType.TIME, c, reason="time_bars")
+                        sink.fill(fill)
+                        sink.trade(portfolio.trades[-1], bar_i=gi)
+
+        # 2b) 可交易時段結束：用 close 強制平倉
+        if flatten_bars is not None and flatten_bars[i] and portfolio.position.side is not None and portfolio.position.qty > 0:
+            bars_held = (gi - portfolio.position.entry_bar_i) if portfolio.position.entry_bar_i is not None else 0
+            fill = exec_model.fill_exit(
+                time=t,
+                side=portfolio.position.side,
+                qty=portfolio.position.qty,
+                price=c,
+                exit_type=ExitType.SESSION,
+                bar_i=gi,
+            )
+            portfolio.apply_exit_fill(fill, bars_held=bars_held)
+            if sink is not None:
+                sink.exit_decision(t, gi, fill.side, ExitType.SESSION, c, reason="session_end")
+                sink.fill(fill)
+                sink.trade(portfolio.trades[-1], bar_i=gi)
 
-            # 2) time-exit（用 close 出場）
-            if portfolio.position.side is not None and portfolio.position.qty > 0:
-                # 這裡示範：策略若要 time-exit，透過 intent 來觸發
-                time_exit_bars = getattr(strategy.p, "time_exit_bars", None)
-                if time_exit_bars is not None and (isinstance(time_exit_bars, int)):
-                    bars_held = (i - portfolio.position.entry_bar_i) if portfolio.position.entry_bar_i is not None else 0
-                    if bars_held >= time_exit_bars:
+        # 3) 收盤產生 intents（entry / exit / 更新出場線）
+        ctx = StrategyContext(
+            df=df,
+            i=i,
+            time=t,
+            position=portfolio.position,
+            indicators=indicators,
+            # 只使用 initial_cash來計算 單筆最大倉位
+            init_equity= self.config.initial_cash,
+            now_equity= portfolio.equity(mark_price=c),
+        )
+        intents = strategy.generate_intents(ctx)
+
+        # 4) 套用 intents：MVP 只做
+        #    - 若無倉：允許 entry
+        #    - 若有倉：允許更新 tp/sl/be、或 time-exit（close 出）
+        intents_sorted = sorted(intents, key=lambda x: x.priority)
+        # 
+        for it in intents_sorted:
+            if it.action == ActionType.ENTRY:
+                if entry_ok is not None and not entry_ok[i]:
+                    if sink is not None:
+                        sink.intent(t, gi, it, rejected="not_tradable")
+                elif portfolio.position.side is None or portfolio.position.qty == 0:
+                    fill = exec_model.fill_entry(time=t, side=it.side, qty=it.qty, price=c, entry_bar_i=gi)
+                    portfolio.apply_entry_fill(fill)
+                    # 若 intent 有帶 tp/sl/be，直接寫入 position
+                    portfolio.position.tp_price = it.tp_price
+                    portfolio.position.sl_price = it.sl_price
+                    portfolio.position.be_price = it.be_price
+                    if sink is not None:
+                        sink.intent(t, gi, it)
+                        sink.fill(fill)
+                elif sink is not None:
+                    sink.intent(t, gi, it, rejected="position_open")
+
+            elif it.action == ActionType.EXIT:
+                if portfolio.position.side is not None and portfolio.position.qty > 0:
+                    # time-exit：用 close 出
+                    if it.exit_type == ExitType.TIME:
                         fill = exec_model.fill_exit(
                             time=t,
                             side=portfolio.position.side,
                             qty=portfolio.position.qty,
                             price=c,
                             exit_type=ExitType.TIME,
+                            bar_i=gi,
                         )
+                        bars_held = (gi - portfolio.position.entry_bar_i) if portfolio.position.entry_bar_i is not None else 0
                         portfolio.apply_exit_fill(fill, bars_held=bars_held)
+                        if sink is not None:
+                            sink.intent(t, gi, it)
+                            sink.exit_decision(t, gi, fill.side, ExitType.TIME, c, reason="strategy")
+                            sink.fill(fill)
+                            sink.trade(portfolio.trades[-1], bar_i=gi)
+                    elif sink is not None:
+                        sink.intent(t, gi, it, rejected="unsupported_exit_type")
+                elif sink is not None:
+                    sink.intent(t, gi, it, rejected="no_position")
 
-            # 3) 收盤產生 intents（entry / exit / 更新出場線）
-            ctx = StrategyContext(
-                df=df,
-                i=i,
-                time=t,
-                position=portfolio.position,
-                indicators=indicators,
-                # 只使用 initial_cash來計算 單筆最大倉位
-                init_equity= self.config.initial_cash,
-                now_equity= portfolio.equity(mark_price=c),
-            )
-            intents = strategy.generate_intents(ctx)
-
-            # 4) 套用 intents：MVP 只做
-            #    - 若無倉：允許 entry
-            #    - 若有倉：允許更新 tp/sl/be、或 time-exit（close 出）
-            intents_sorted = sorted(intents, key=lambda x: x.priority)
-            # 
-            for it in intents_sorted:
-                if it.action == ActionType.ENTRY:
-                    if portfolio.position.side is None or portfolio.position.qty == 0:
-                        fill = exec_model.fill_entry(time=t, side=it.side, qty=it.qty, price=c, entry_bar_i=i)
-                        portfolio.apply_entry_fill(fill)
-                        # 若 intent 有帶 tp/sl/be，直接寫入 position
-                        portfolio.position.tp_price = it.tp_price
-                        portfolio.position.sl_price = it.sl_price
-                        portfolio.position.be_price = it.be_price
-
-                elif it.action == ActionType.EXIT:
-                    if portfolio.position.side is not None and portfolio.position.qty > 0:
-                        # time-exit：用 close 出
-                        if it.exit_type == ExitType.TIME:
-                            fill = exec_model.fill_exit(
-                                time=t,
-                                side=portfolio.position.side,
-                                qty=portfolio.position.qty,
-                                price=c,
-                                exit_type=ExitType.TIME,
-                            )
-                            bars_held = (i - portfolio.position.entry_bar_i) if portfolio.position.entry_bar_i is not None else 0
-                            portfolio.apply_exit_fill(fill, bars_held=bars_held)
-
-                # ADD 暫不實作（你後續要加倉時再擴充）
-
-            # 5) 記錄 equity（用 close mark）
-            equity_points.append(portfolio.equity(mark_price=c))
-            equity_index.append(t)
-
-        equity = pd.Series(equity_points, index=pd.Index(equity_index, name="time"), name="equity")
-        return BacktestResult(trades=portfolio.trades, equity_curve=equity)
+            # ADD 暫不實作（你後續要加倉時再擴充）
+            elif sink is not None:
+                sink.intent(t, gi, it, rejected="not_supported")
+
+        # 5) 記錄 equity（用 close mark）
+        equity_points.append(portfolio.equity(mark_price=c))
+        equity_index.append(t)
+        state.n_bars = gi + 1
+
+        # 6) 提前中止檢查
+        if abort is not None:
+            reason = abort.check(gi, equity_points[-1], portfolio.trades)
+            if reason is not None:
+                state.abort_reason = reason
+                state.abort_bar_i = gi
+                if sink is not None:
+                    sink.abort(t, gi, reason)
+                return True
+        return False
+
+    def _close_lot(self, state: EngineState, k: int, qty: float, price: float, exit_type: ExitType, t, gi: int) -> None:
+        portfolio = state.portfolio
+        fill = state.exec_model.fill_exit(
+            time=t, side=portfolio.book.lot_side(k), qty=qty, price=price, exit_type=exit_type, bar_i=gi
+        )
+        trade = portfolio.apply_exit_fill(fill, slot=k, bar_i=gi)
+        if self.event_sink is not None:
+            self.event_sink.fill(fill)
+            self.event_sink.trade(trade, bar_i=gi)
+
+    def _bar_book(
+        self,
+        df: pd.DataFrame,
+        strategy: Strategy,
+        indicators: Dict[str, Any],
+        state: EngineState,
+        i: int,
+        gi: int,
+        t: pd.Timestamp,
+        o: float,
+        h: float,
+        l: float,
+        c: float,
+        entry_ok: Optional[np.ndarray] = None,
+        flatten_bars: Optional[np.ndarray] = None,
+    ) -> bool:
+        """
+        position_mode="book" 處理一根 bar：順序與 _bar 相同（intrabar exit -> time-exit -> intents -> equity -> 中止），
+        但持倉為多筆 lot：出場線對全部 lot 向量化判斷，ENTRY（無倉時）/ ADD 各開一個新 lot，
+        EXIT 以收盤價平倉（指定 lot_id，或依 side 先進先出平掉 qty；qty <= 0 表示全部）。
+        回傳是否觸發提前中止。
+        """
+        portfolio = state.portfolio
+        book = portfolio.book
+        exec_model = state.exec_model
+        abort = state.abort
+        sink = self.event_sink
+        time_exit_bars = getattr(strategy.p, "time_exit_bars", None) if hasattr(strategy, "p") else None
+        if not isinstance(time_exit_bars, int):
+            time_exit_bars = None
+
+        # 1) 全部 lot 的 intrabar exit（向量化；同時碰到多條線的 lot 有 resolver 時一次查小週期）
+        if book.n:
+            slots, codes, prices, ambiguous = book.exit_hits(h, l)
+            if exec_model.resolver is not None and ambiguous.any():
+                codes, prices = exec_model.resolve_exits(
+                    t, gi, book.side[slots], h, l, book.tp[slots], book.sl[slots], book.be[slots], codes, prices
+                )
+            for k, code, price in zip(slots.tolist(), codes.tolist(), prices.tolist()):
+                exit_type = EXIT_TYPE_BY_CODE[code]
+                if sink is not None:
+                    sink.exit_decision(t, gi, book.lot_side(k), exit_type, price, reason="intrabar")
+                self._close_lot(state, k, float(book.qty[k]), price, exit_type, t, gi)
+            book.remove(slots)
+
+        # 2) time-exit（持有滿 time_exit_bars 的 lot 以 close 出場）
+        if book.n and time_exit_bars is not None:
+            slots = np.flatnonzero(gi - book.entry_bar[: book.n] >= time_exit_bars)
+            for k in slots.tolist():
+                if sink is not None:
+                    sink.exit_decision(t, gi, book.lot_side(k), ExitType.TIME, c, reason="time_bars")
+                self._close_lot(state, k, float(book.qty[k]), c, ExitType.TIME, t, gi)
+            book.remove(slots)
+
+        # 2b) 可交易時段結束：全部 lot 以 close 平倉
+        if book.n and flatten_bars is not None and flatten_bars[i]:
+            slots = np.arange(book.n)
+            for k in slots.tolist():
+                if sink is not None:
+                    sink.exit_decision(t, gi, book.lot_side(k), ExitType.SESSION, c, reason="session_end")
+                self._close_lot(state, k, float(book.qty[k]), c, ExitType.SESSION, t, gi)
+            book.remove(slots)
+
+        # 3) 收盤產生 intents
+        ctx = StrategyContext(
+            df=df,
+            i=i,
+            time=t,
+            position=portfolio.position,
+            indicators=indicators,
+            init_equity=self.config.initial_cash,
+            now_equity=portfolio.equity(mark_price=c),
+            book=book,
+        )
+        intents = strategy.generate_intents(ctx)
+
+        # 4) 套用 intents
+        for it in sorted(intents, key=lambda x: x.priority):
+            if it.action in (ActionType.ENTRY, ActionType.ADD) and entry_ok is not None and not entry_ok[i]:
+                if sink is not None:
+                    sink.intent(t, gi, it, rejected="not_tradable")
+                continue
+            if it.action == ActionType.ENTRY and book.n > 0:
+                if sink is not None:
+                    sink.intent(t, gi, it, rejected="position_open")
+                continue
+            if it.action in (ActionType.ENTRY, ActionType.ADD):
+                fill = exec_model.fill_entry(time=t, side=it.side, qty=it.qty, price=c, entry_bar_i=gi)
+                portfolio.apply_entry_fill(fill, tp=it.tp_price, sl=it.sl_price, be=it.be_price)
+                if sink is not None:
+                    sink.intent(t, gi, it)
+                    sink.fill(fill)
+            elif it.action == ActionType.EXIT:
+                if it.lot_id is not None:
+                    targets = book.slots_of([it.lot_id])
+                else:
+                    targets = np.flatnonzero(book.side[: book.n] == (1 if it.side == Side.LONG else -1))
+                if len(targets) == 0:
+                    if sink is not None:
+                        sink.intent(t, gi, it, rejected="no_position")
+                    continue
+                if sink is not None:
+                    sink.intent(t, gi, it)
+                exit_type = it.exit_type or ExitType.MANUAL
+                remaining = it.qty if it.qty > 0 else float("inf")
+                closed = []
+                for k in targets.tolist():
+                    if remaining <= 0:
+                        break
+                    qty = min(float(book.qty[k]), remaining)
+                    remaining -= qty
+                    self._close_lot(state, k, qty, c, exit_type, t, gi)
+                    if book.qty[k] <= 1e-12 * max(qty, 1.0):
+                        closed.append(k)
+                book.remove(np.asarray(closed, dtype=np.int64))
+
+        # 5) 記錄 equity（用 close mark）
+        state.equity_points.append(portfolio.equity(mark_price=c))
+        state.equity_index.append(t)
+        state.n_bars = gi + 1
+
+        # 6) 提前中止檢查
+        if abort is not None:
+            reason = abort.check(gi, state.equity_points[-1], portfolio.trades)
+            if reason is not None:
+                state.abort_reason = reason
+                state.abort_bar_i = gi
+                if sink is not None:
+                    sink.abort(t, gi, reason)
+                return True
+        return False
+
+    def _result(self, state: EngineState, indicators: Optional[Dict[str, Any]] = None) -> BacktestResult:
+        equity = pd.Series(state.equity_points, index=pd.Index(state.equity_index, name="time"), name="equity")
+        stats: Dict[str, Any] = {}
+        if self.intrabar_resolver is not None:
+            stats["intrabar_ambiguous_bars"] = state.exec_model.ambiguous_bars
+            stats["intrabar_resolved_bars"] = state.exec_model.resolved_bars
+        if isinstance(indicators, LazyIndicators):
+            # 宣告了但整段都沒被取用的指標（可從 required_indicators 移除）
+            stats["untouched_indicators"] = indicators.untouched()
+            stats["indicator_seconds"] = dict(indicators.timings)
+        return BacktestResult(
+            trades=list(state.portfolio.trades),
+            equity_curve=equity,
+            fills=list(state.portfolio.fills),
+            aborted=state.aborted,
+            abort_reason=state.abort_reason,
+            abort_bar_i=state.abort_bar_i,
+            stats=stats,
+        )
 
     @staticmethod
     def _validate_df(df: pd.DataFrame) -> None:
@@ -141,18 +655,30 @@ class BacktestEngine:
             raise ValueError("df.index must be a pandas.DatetimeIndex")
 
     @staticmethod
-    def _compute_indicators(df: pd.DataFrame, strategy: Strategy, reg: IndicatorRegistry) -> Dict[str, Any]:
-        req = strategy.required_indicators()
-        indicators: Dict[str, Any] = {}
-
-        for name, spec in req.items():
-            fn_name = spec[0]
-            params = spec[1:]
-
-            fn = getattr(reg, fn_name, None)
-            if fn is None or not callable(fn):
-                raise ValueError(f"Unknown indicator function: {fn_name}")
-
-            indicators[name] = fn(df, *params)
+    def _compute_indicators(
+        df: pd.DataFrame,
+        strategy: Strategy,
+        reg: IndicatorRegistry,
+        cache: Dict[tuple, Any] | None = None,
+        eager: bool = False,
+        workers: Optional[int] = None,
+        chunk_rows: Optional[int] = None,
+    ) -> LazyIndicators:
+        """
+        回傳 LazyIndicators：各指標在第一次取用時才計算（eager=True 則立即全算）。
+        cache：以 spec tuple 為 key 的共用快取（同一份 df 跑多組參數時避免重算相同指標）。
+        workers：不為 None 時在規則編譯前以 thread pool 平行算完全部指標（chunk_rows 見 LazyIndicators.compute_all）。
+        """
+        indicators = LazyIndicators(df, strategy.required_indicators(), reg, cache=cache, eager=eager and workers is None)
+        if workers is not None:
+            indicators.compute_all(workers=workers, chunk_rows=chunk_rows)
+        return BacktestEngine._with_rules(df, strategy, indicators, cache)
 
+    @staticmethod
+    def _with_rules(
+        df: pd.DataFrame, strategy: Strategy, indicators: Dict[str, Any], cache: Dict[tuple, Any] | None = None
+    ) -> Dict[str, Any]:
+        # 規則式策略：進出場條件以整段陣列求值（各規則第一次取用時才算；共用 cache 時相同子運算式跨參數組合重用）
+        if isinstance(strategy, RuleStrategy) and RULES_KEY not in indicators:
+            indicators[RULES_KEY] = strategy.compile(df, indicators, cache)
         return indicators
\ No newline at end of file
@@ -0,0 +1,279 @@
+from __future__ import annotations
+
+import queue
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+import pandas as pd
+
+from .models import Fill, OrderIntent, Trade
+
+
+# 事件種類
+EVENT_FILL = "fill"
+EVENT_TRADE = "trade"
+EVENT_INTENT = "intent"        # 被套用的 intent
+EVENT_REJECTED = "rejected"    # 被 engine 忽略的 intent（reason 說明原因）
+EVENT_EXIT = "exit"            # 出場決策（reason：intrabar / time_bars / strategy）
+EVENT_ABORT = "abort"
+EVENT_TYPES = (EVENT_FILL, EVENT_TRADE, EVENT_INTENT, EVENT_REJECTED, EVENT_EXIT, EVENT_ABORT)
+
+# 所有事件共用一個寬表 schema，不適用的欄位為 null
+_STR_COLUMNS = ("event", "action", "side", "exit_type", "reason")
+_FLOAT_COLUMNS = ("qty", "price", "raw_price", "fee", "pnl", "entry_price", "tp_price", "sl_price", "be_price")
+_INT_COLUMNS = ("bar_i", "entry_bar_i", "bars_held")
+_TIME_COLUMNS = ("time", "entry_time")
+EVENT_COLUMNS = ("event", "time", "bar_i") + tuple(
+    c for c in _STR_COLUMNS + _FLOAT_COLUMNS + _INT_COLUMNS + _TIME_COLUMNS if c not in ("event", "time", "bar_i")
+)
+
+
+def _value(x):
+    return x.value if hasattr(x, "value") and not isinstance(x, pd.Timestamp) else x
+
+
+def _schema(tz: Optional[str]):
+    import pyarrow as pa
+
+    types = {}
+    types.update({c: pa.string() for c in _STR_COLUMNS})
+    types.update({c: pa.float64() for c in _FLOAT_COLUMNS})
+    types.update({c: pa.int64() for c in _INT_COLUMNS})
+    types.update({c: pa.timestamp("ns", tz=tz) for c in _TIME_COLUMNS})
+    return pa.schema([(c, types[c]) for c in EVENT_COLUMNS])
+
+
+class EventLogWriter:
+    """
+    回測事件稽核記錄（fills / trades / intents / 被拒絕的 intent / 出場決策 / 中止）。
+
+    事件先以欄位式 list 暫存，每 batch_rows 筆轉成一個 Arrow RecordBatch 交給背景執行緒寫檔，
+    bar loop 不會卡在 I/O 上；待寫的 batch 最多 max_pending_batches 個（滿了才會阻塞），
+    記憶體用量與回測長度無關。
+    檔案格式依副檔名：.parquet 為 Parquet（每個 batch 一個 row group），其餘為 Arrow IPC file。
+    用法：BacktestEngine(config, event_sink=writer)，結束後 close()（或用 with）。
+    """
+
+    def __init__(self, path, batch_rows: int = 65_536, max_pending_batches: int = 4) -> None:
+        self.path = Path(path)
+        self.batch_rows = batch_rows
+        self.rows_written = 0
+        self._buf: Dict[str, List[Any]] = {c: [] for c in EVENT_COLUMNS}
+        self._n = 0
+        self._tz: Optional[str] = None
+        self._tz_known = False
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_pending_batches)
+        self._thread: Optional[threading.Thread] = None
+        self._error: Optional[BaseException] = None
+        self._closed = False
+
+    # ---- 事件 ----
+    def emit(self, event: str, time: Optional[pd.Timestamp] = None, bar_i: Optional[int] = None, **values) -> None:
+        if self._closed:
+            raise ValueError("event log is closed")
+        if not self._tz_known and time is not None:
+            self._tz = str(time.tz) if getattr(time, "tz", None) is not None else None
+            self._tz_known = True
+        buf = self._buf
+        buf["event"].append(event)
+        buf["time"].append(time)
+        buf["bar_i"].append(bar_i)
+        for c in EVENT_COLUMNS[3:]:
+            buf[c].append(_value(values.get(c)))
+        self._n += 1
+        if self._n >= self.batch_rows:
+            self._flush_buffer()
+
+    def fill(self, fill: Fill) -> None:
+        self.emit(
+            EVENT_FILL, fill.time, fill.bar_i,
+            action=fill.action, side=fill.side, exit_type=fill.exit_type, qty=fill.qty,
+            price=fill.price, raw_price=fill.raw_price, fee=fill.fee, entry_bar_i=fill.entry_bar_i,
+        )
+
+    def trade(self, trade: Trade, bar_i: Optional[int] = None) -> None:
+        self.emit(
+            EVENT_TRADE, trade.exit_time, bar_i,
+            side=trade.side, exit_type=trade.exit_type, qty=trade.qty, price=trade.exit_price,
+            pnl=trade.pnl, entry_time=trade.entry_time, entry_price=trade.entry_price,
+            tp_price=trade.tp_price, sl_price=trade.sl_price, bars_held=trade.bars_held,
+        )
+
+    def intent(self, time: pd.Timestamp, bar_i: int, intent: OrderIntent, rejected: Optional[str] = None) -> None:
+        self.emit(
+            EVENT_REJECTED if rejected is not None else EVENT_INTENT, time, bar_i,
+            action=intent.action, side=intent.side, exit_type=intent.exit_type, qty=intent.qty,
+            tp_price=intent.tp_price, sl_price=intent.sl_price, be_price=intent.be_price, reason=rejected,
+        )
+
+    def exit_decision(self, time: pd.Timestamp, bar_i: int, side, exit_type, price: float, reason: str) -> None:
+        self.emit(EVENT_EXIT, time, bar_i, side=side, exit_type=exit_type, price=price, reason=reason)
+
+    def abort(self, time: pd.Timestamp, bar_i: int, reason: str) -> None:
+        self.emit(EVENT_ABORT, time, bar_i, reason=reason)
+
+    # ---- 寫檔 ----
+    def _flush_buffer(self) -> None:
+        import pyarrow as pa
+
+        if self._n == 0:
+            return
+        self._raise_if_failed()
+        schema = _schema(self._tz)
+        batch = pa.RecordBatch.from_pydict(self._buf, schema=schema)
+        self._buf = {c: [] for c in EVENT_COLUMNS}
+        self._n = 0
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._write_loop, args=(schema,), name="event-log-writer", daemon=True)
+            self._thread.start()
+        self._queue.put(batch)
+
+    def _write_loop(self, schema) -> None:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        writer = None
+        try:
+            if self.path.suffix == ".parquet":
+                writer = pq.ParquetWriter(self.path, schema)
+            else:
+                writer = pa.ipc.new_file(pa.OSFile(str(self.path), "wb"), schema)
+            while True:
+                batch = self._queue.get()
+                if batch is None:
+                    break
+                if isinstance(writer, pq.ParquetWriter):
+                    writer.write_table(pa.Table.from_batches([batch]))
+                else:
+                    writer.write_batch(batch)
+                self.rows_written += batch.num_rows
+        except BaseException as exc:  # 交給主執行緒在下次 flush / close 時拋出
+            self._error = exc
+            # 把佇列清空，避免主執行緒卡在 put
+            while True:
+                try:
+                    if self._queue.get_nowait() is None:
+                        break
+                except queue.Empty:
+                    break
+        finally:
+            if writer is not None:
+                writer.close()
+
+    def _raise_if_failed(self) -> None:
+        if self._error is not None:
+            raise RuntimeError(f"event log writer failed: {self._error!r}") from self._error
+
+    def flush(self) -> None:
+        """把暫存中的事件交給背景執行緒（不等寫完）。"""
+        self._flush_buffer()
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._flush_buffer()
+        self._closed = True
+        if self._thread is None:
+            # 完全沒有事件：仍寫一個空檔，讀取端不必特判
+            self._thread = threading.Thread(target=self._write_loop, args=(_schema(self._tz),), daemon=True)
+            self._thread.start()
+        self._queue.put(None)
+        self._thread.join()
+        self._raise_if_failed()
+
+    def __enter__(self) -> "EventLogWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class EventLogReader:
+    """
+    EventLogWriter 檔案的懶讀取：以 memory map 逐 batch（IPC）/ row group（Parquet）讀，
+    依 event 種類與時間區間 [start, end) 過濾；時間範圍完全不重疊的 batch 直接略過。
+    """
+
+    def __init__(self, path) -> None:
+        self.path = Path(path)
+
+    def _batches(self, columns: Optional[Sequence[str]]) -> Iterator[Any]:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if self.path.suffix == ".parquet":
+            pf = pq.ParquetFile(self.path, memory_map=True)
+            for r in range(pf.num_row_groups):
+                yield pf.read_row_group(r, columns=columns)
+        else:
+            reader = pa.ipc.open_file(pa.memory_map(str(self.path), "r"))
+            for b in range(reader.num_record_batches):
+                batch = reader.get_batch(b)
+                yield batch.select(columns) if columns is not None else batch
+
+    @property
+    def schema(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if self.path.suffix == ".parquet":
+            return pq.ParquetFile(self.path).schema_arrow
+        return pa.ipc.open_file(pa.memory_map(str(self.path), "r")).schema
+
+    def iter_batches(
+        self,
+        events: Optional[Sequence[str]] = None,
+        start=None,
+        end=None,
+        columns: Optional[Sequence[str]] = None,
+    ) -> Iterator[pd.DataFrame]:
+        """逐 batch 產生過濾後的 DataFrame（空的 batch 不產生）。"""
+        import pyarrow as pa
+        import pyarrow.compute as pc
+
+        need = None
+        if columns is not None:
+            need = list(dict.fromkeys(list(columns) + ["event", "time"]))
+        time_type = self.schema.field("time").type
+        lo = pa.scalar(pd.Timestamp(start), type=time_type) if start is not None else None
+        hi = pa.scalar(pd.Timestamp(end), type=time_type) if end is not None else None
+
+        for batch in self._batches(need):
+            if batch.num_rows == 0:
+                continue
+            times = batch.column("time")
+            if lo is not None or hi is not None:
+                mm = pc.min_max(times)
+                if mm["max"].is_valid and lo is not None and pc.less(mm["max"], lo).as_py():
+                    continue
+                if mm["min"].is_valid and hi is not None and pc.greater_equal(mm["min"], hi).as_py():
+                    continue
+            mask = None
+            if events is not None:
+                mask = pc.is_in(batch.column("event"), value_set=pa.array(list(events), type=pa.string()))
+            if lo is not None:
+                m = pc.greater_equal(times, lo)
+                mask = m if mask is None else pc.and_(mask, m)
+            if hi is not None:
+                m = pc.less(times, hi)
+                mask = m if mask is None else pc.and_(mask, m)
+            if mask is not None:
+                batch = batch.filter(mask)
+                if batch.num_rows == 0:
+                    continue
+            frame = batch.to_pandas()
+            yield frame[list(columns)] if columns is not None else frame
+
+    def read(
+        self,
+        events: Optional[Sequence[str]] = None,
+        start=None,
+        end=None,
+        columns: Optional[Sequence[str]] = None,
+    ) -> pd.DataFrame:
+        parts = list(self.iter_batches(events, start, end, columns))
+        if parts:
+            return pd.concat(parts, ignore_index=True)
+        empty = self.schema.empty_table().to_pandas()
+        return empty[list(columns)] if columns is not None else empty
@@ -1,8 +1,9 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Optional
+from dataclasses import dataclass, field
+from typing import Optional, Sequence, TYPE_CHECKING
 
+import numpy as np
 import pandas as pd
 
 from .models import (
@@ -13,43 +14,175 @@ from .models import (
     ActionType,
     ExitType,
 )
+from .costs import CostModel
 
+if TYPE_CHECKING:
+    from .intrabar import LowerTimeframeResolver
 
-def _apply_slippage(price: float, side: Side, slippage_bps: float, is_entry_or_buy: bool) -> float:
+
+# 出場代碼：數字越小優先度越高（保守規則 SL > BE > TP），-1 表示沒有觸發
+EXIT_NONE, EXIT_SL, EXIT_BE, EXIT_TP = -1, 0, 1, 2
+EXIT_TYPE_BY_CODE = {EXIT_SL: ExitType.SL, EXIT_BE: ExitType.BE, EXIT_TP: ExitType.TP}
+
+
+def exit_hits(
+    sign: np.ndarray,
+    high: np.ndarray,
+    low: np.ndarray,
+    tp: np.ndarray,
+    sl: np.ndarray,
+    be: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
     """
-    保守滑價：買更貴、賣更便宜。
-    - entry long = buy
-    - exit long  = sell
-    - entry short = sell
-    - exit short  = buy
+    向量化的出場判斷（多根 bar 或多個部位一次算）：參數可為等長陣列或純量（broadcast），
+    sign 為 +1 LONG / -1 SHORT，tp / sl / be 為 NaN 表示未設定。
+    回傳 (代碼, 出場價, 觸發的線數)；同時碰到多條線時與 conservative_exit_price 相同取 SL > BE > TP。
     """
-    bps = slippage_bps / 10_000.0
-    if is_entry_or_buy:
-        return price * (1.0 + bps)
-    return price * (1.0 - bps)
+    # NaN 的比較結果為 False，未設定的線自然不會觸發
+    if np.ndim(sign) == 0:
+        if sign > 0:
+            sl_hit, be_hit, tp_hit = low <= sl, low <= be, high >= tp
+        else:
+            sl_hit, be_hit, tp_hit = high >= sl, high >= be, low <= tp
+    else:
+        long = np.asarray(sign) > 0
+        sl_hit = np.where(long, low <= sl, high >= sl)
+        be_hit = np.where(long, low <= be, high >= be)
+        tp_hit = np.where(long, high >= tp, low <= tp)
+    shape = np.broadcast(sl_hit, be_hit, tp_hit).shape
+    # 依 TP、BE、SL 的順序寫入，優先度高的覆蓋低的
+    code = np.full(shape, EXIT_NONE, dtype=np.int8)
+    price = np.full(shape, np.nan)
+    for c, hit, level in ((EXIT_TP, tp_hit, tp), (EXIT_BE, be_hit, be), (EXIT_SL, sl_hit, sl)):
+        if np.any(hit):
+            code = np.where(hit, c, code)
+            price = np.where(hit, level, price)
+    n_hits = np.add(np.add(sl_hit, be_hit, dtype=np.int8), tp_hit, dtype=np.int8)
+    return code, price, n_hits
 
 
-def _fee(notional: float, fee_rate: float) -> float:
-    return abs(notional) * fee_rate
+def first_exit_hit(
+    sign: int,
+    high: np.ndarray,
+    low: np.ndarray,
+    tp: Optional[float],
+    sl: Optional[float],
+    be: Optional[float],
+) -> tuple[int, int]:
+    """
+    單一部位在一段 bar（high / low 陣列）中第一根觸發出場的位置與代碼，沒有則為 (-1, EXIT_NONE)。
+    優先順序同 exit_hits；未設定（None）的線不比較。
+    """
+    lines = []
+    if sl is not None:
+        lines.append((EXIT_SL, low <= sl if sign > 0 else high >= sl))
+    if be is not None:
+        lines.append((EXIT_BE, low <= be if sign > 0 else high >= be))
+    if tp is not None:
+        lines.append((EXIT_TP, high >= tp if sign > 0 else low <= tp))
+    if not lines:
+        return -1, EXIT_NONE
+    any_hit = lines[0][1]
+    for _, hit in lines[1:]:
+        any_hit = any_hit | hit
+    if not any_hit.any():
+        return -1, EXIT_NONE
+    j = int(np.argmax(any_hit))
+    for code, hit in lines:
+        if hit[j]:
+            return j, code
+    return -1, EXIT_NONE
 
 
 @dataclass
 class ExecutionModel:
     config: BacktestConfig
+    # 有給 resolver 時，多條出場線同時被碰到的 bar 改用小週期 K 線判斷先後
+    resolver: Optional["LowerTimeframeResolver"] = None
+    ambiguous_bars: int = 0
+    resolved_bars: int = 0
+    # 成交成本模型（None = config 的固定 fee_rate + slippage_bps）
+    costs: Optional[CostModel] = None
+    # 分級費率用：目前為止的累積成交金額
+    traded_notional: float = 0.0
+    _bar_values: Optional[np.ndarray] = field(default=None, repr=False)
+    _bar_offset: int = field(default=0, repr=False)
+
+    def __post_init__(self) -> None:
+        if self.costs is None:
+            self.costs = CostModel.from_config(self.config)
+        # 固定費率 / 固定滑價時單筆成交直接以純量計算（與批次版結果相同）
+        self._flat = self.costs.is_flat(self.config)
+
+    def prepare(self, df: pd.DataFrame, offset: int = 0) -> None:
+        """逐根成本資料（振幅 / ATR 滑價）與小週期列範圍以 df 預先算好；df 的第 i 根為全域 bar offset + i。"""
+        self._bar_values = self.costs.slippage.bar_values(df)
+        self._bar_offset = offset
+        if self.resolver is not None:
+            self.resolver.prepare(df.index, offset)
+
+    # ---- 批次成本 ----
+    def fill_prices(self, raw: np.ndarray, is_buy: np.ndarray, bar_i: Optional[np.ndarray] = None) -> np.ndarray:
+        raw = np.asarray(raw, dtype=float)
+        bar_value = None
+        if self._bar_values is not None:
+            if bar_i is None:
+                raise ValueError("this slippage model needs the bar index of each fill")
+            bar_value = self._bar_values[np.asarray(bar_i, dtype=np.int64) - self._bar_offset]
+        return self.costs.slippage.fill_prices(raw, np.asarray(is_buy, dtype=bool), bar_value)
+
+    def fees(self, fill_price: np.ndarray, qty: np.ndarray, maker: np.ndarray) -> np.ndarray:
+        """依成交順序計費（累積成交金額隨之增加）。"""
+        notional = np.abs(np.asarray(fill_price, dtype=float) * np.asarray(qty, dtype=float))
+        prior = self.traded_notional + np.cumsum(notional) - notional
+        fee = notional * self.costs.fees.rates(notional, np.asarray(maker, dtype=bool), prior)
+        self.traded_notional += float(notional.sum())
+        return fee
+
+    def fill_costs(
+        self,
+        raw: np.ndarray,
+        is_buy: np.ndarray,
+        qty: np.ndarray,
+        exit_types: Sequence[Optional[ExitType]],
+        bar_i: Optional[np.ndarray] = None,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """多筆成交一次算 (成交價, 手續費)；exit_types 為 None 的是進場。"""
+        px = self.fill_prices(raw, is_buy, bar_i)
+        return px, self.fees(px, qty, self.costs.is_maker(exit_types))
+
+    def _single(self, price: float, is_buy: bool, qty: float, exit_type: Optional[ExitType], bar_i) -> tuple[float, float]:
+        if self._flat:
+            bps = self.config.slippage_bps / 10_000.0
+            fill_price = price * (1.0 + bps) if is_buy else price * (1.0 - bps)
+            notional = abs(fill_price * qty)
+            self.traded_notional += notional
+            return fill_price, notional * self.config.fee_rate
+        px, fee = self.fill_costs(
+            np.array([price], dtype=float), np.array([is_buy]), np.array([qty], dtype=float), [exit_type],
+            None if bar_i is None else np.array([bar_i]),
+        )
+        return float(px[0]), float(fee[0])
 
     def fill_entry(self, time: pd.Timestamp, side: Side, qty: float, price: float, entry_bar_i: int) -> Fill:
         # entry long=buy, entry short=sell
         is_buy = (side == Side.LONG)
-        fill_price = _apply_slippage(price, side, self.config.slippage_bps, is_entry_or_buy=is_buy)
-        fee = _fee(notional=fill_price * qty, fee_rate=self.config.fee_rate)
-        return Fill(time=time, action=ActionType.ENTRY, side=side, qty=qty, price=fill_price, fee=fee, entry_bar_i=entry_bar_i)
+        fill_price, fee = self._single(price, is_buy, qty, None, entry_bar_i)
+        return Fill(
+            time=time, action=ActionType.ENTRY, side=side, qty=qty, price=fill_price, fee=fee,
+            entry_bar_i=entry_bar_i, raw_price=price, bar_i=entry_bar_i,
+        )
 
-    def fill_exit(self, time: pd.Timestamp, side: Side, qty: float, price: float, exit_type: ExitType) -> Fill:
+    def fill_exit(
+        self, time: pd.Timestamp, side: Side, qty: float, price: float, exit_type: ExitType, bar_i: Optional[int] = None
+    ) -> Fill:
         # exit long=sell, exit short=buy
         is_buy = (side == Side.SHORT)
-        fill_price = _apply_slippage(price, side, self.config.slippage_bps, is_entry_or_buy=is_buy)
-        fee = _fee(notional=fill_price * qty, fee_rate=self.config.fee_rate)
-        return Fill(time=time, action=ActionType.EXIT, side=side, qty=qty, price=fill_price, fee=fee, exit_type=exit_type)
+        fill_price, fee = self._single(price, is_buy, qty, exit_type, bar_i)
+        return Fill(
+            time=time, action=ActionType.EXIT, side=side, qty=qty, price=fill_price, fee=fee,
+            exit_type=exit_type, raw_price=price, bar_i=bar_i,
+        )
 
     def conservative_exit_price(
         self,
@@ -67,6 +200,114 @@ class ExecutionModel:
         回傳 (exit_type, exit_price)。
         保守規則：同一根 bar 同時觸發多條件，優先對你最不利。
         """
+        # 保守：永遠先 SL（最不利），其次 BE，最後 TP（非保守模式目前同樣採此優先順序）
+        if side == Side.LONG:
+            if sl is not None and bar_low <= sl:
+                return (ExitType.SL, sl)
+            if be is not None and bar_low <= be:
+                return (ExitType.BE, be)
+            if tp is not None and bar_high >= tp:
+                return (ExitType.TP, tp)
+        else:
+            if sl is not None and bar_high >= sl:
+                return (ExitType.SL, sl)
+            if be is not None and bar_high >= be:
+                return (ExitType.BE, be)
+            if tp is not None and bar_low <= tp:
+                return (ExitType.TP, tp)
+
+        if time_exit and self.config.time_exit_on_close:
+            return (ExitType.TIME, bar_close)
+
+        return (None, None)
+
+    def intrabar_exit(
+        self,
+        time: pd.Timestamp,
+        side: Side,
+        bar_open: float,
+        bar_high: float,
+        bar_low: float,
+        bar_close: float,
+        tp: Optional[float],
+        sl: Optional[float],
+        be: Optional[float],
+        bar_i: Optional[int] = None,
+    ) -> tuple[Optional[ExitType], Optional[float]]:
+        """
+        engine 用的 intrabar 出場判斷：只碰到一條線、或沒有 resolver 時同 conservative_exit_price；
+        同時碰到多條線且有 resolver 時，查小週期 K 線決定實際先碰到哪條（bar_i 為全域 bar index）。
+        """
+        if self.resolver is not None:
+            hits = self._exit_hits(side, bar_high, bar_low, tp, sl, be)
+            if len(hits) > 1:
+                self.ambiguous_bars += 1
+                resolved = self.resolver.resolve(time, side, hits, bar_i=bar_i)
+                if resolved is not None:
+                    self.resolved_bars += 1
+                    return resolved
+        return self.conservative_exit_price(
+            side=side,
+            bar_open=bar_open,
+            bar_high=bar_high,
+            bar_low=bar_low,
+            bar_close=bar_close,
+            tp=tp,
+            sl=sl,
+            be=be,
+            time_exit=False,
+        )
+
+    def resolve_exits(
+        self,
+        time: pd.Timestamp,
+        bar_i: int,
+        sign: np.ndarray,
+        bar_high: float,
+        bar_low: float,
+        tp: np.ndarray,
+        sl: np.ndarray,
+        be: np.ndarray,
+        code: np.ndarray,
+        price: np.ndarray,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        同一根 bar 多個部位的 intrabar 出場（book 模式）：code / price 為 exit_hits 的保守結果，
+        同時碰到多條線的部位一次交給 resolver.resolve_many；無法判斷的保留保守結果。
+        """
+        long = np.asarray(sign) > 0
+        hit = np.stack(
+            [
+                np.where(long, bar_low <= sl, bar_high >= sl),
+                np.where(long, bar_low <= be, bar_high >= be),
+                np.where(long, bar_high >= tp, bar_low <= tp),
+            ],
+            axis=1,
+        )
+        amb = hit.sum(axis=1) > 1
+        n_amb = int(amb.sum())
+        if self.resolver is None or n_amb == 0:
+            return code, price
+        self.ambiguous_bars += n_amb
+        levels = np.where(hit, np.stack([sl, be, tp], axis=1), np.nan)[amb]
+        rc, rp = self.resolver.resolve_many([time] * n_amb, np.asarray(sign)[amb], levels, np.full(n_amb, bar_i))
+        ok = rc != EXIT_NONE
+        self.resolved_bars += int(ok.sum())
+        code, price = code.copy(), price.copy()
+        idx = np.flatnonzero(amb)[ok]
+        code[idx] = rc[ok]
+        price[idx] = rp[ok]
+        return code, price
+
+    @staticmethod
+    def _exit_hits(
+        side: Side,
+        bar_high: float,
+        bar_low: float,
+        tp: Optional[float],
+        sl: Optional[float],
+        be: Optional[float],
+    ) -> list[tuple[ExitType, float]]:
         hits = []
 
         if side == Side.LONG:
@@ -84,19 +325,4 @@ class ExecutionModel:
                 hits.append((ExitType.BE, be))
             if tp is not None and bar_low <= tp:
                 hits.append((ExitType.TP, tp))
-
-        if hits:
-            if not self.config.conservative_intrabar:
-                # 非保守：用 priority（這裡簡化成 SL > BE > TP 仍然符合常識）
-                priority = {ExitType.SL: 0, ExitType.BE: 1, ExitType.TP: 2}
-                hits.sort(key=lambda x: priority[x[0]])
-                return hits[0]
-            # 保守：永遠先 SL（最不利），其次 BE，最後 TP
-            priority = {ExitType.SL: 0, ExitType.BE: 1, ExitType.TP: 2}
-            hits.sort(key=lambda x: priority[x[0]])
-            return hits[0]
-
-        if time_exit and self.config.time_exit_on_close:
-            return (ExitType.TIME, bar_close)
-
-        return (None, None)
+        return hits
@@ -1,3 +1,7 @@
+import time
+from collections.abc import MutableMapping
+from typing import Any, Dict, Iterator, List, Optional
+
 import pandas as pd
 import numpy as np
 import talib
@@ -85,3 +89,113 @@ class IndicatorRegistry:
         return body_strictly_increasing(df, n)
 # 你可以在這裡繼續添加其他指標函數
 
+
+class LazyIndicators(MutableMapping):
+    """
+    StrategyContext.indicators 用的延遲計算容器：required_indicators() 宣告的指標在第一次
+    取用時才計算並記住（有共用 cache 時同 spec 只算一次）。eager=True 時建立後立即全部算完（benchmark 用）。
+    touched 記錄被取用過的名稱，untouched() 回傳宣告了但整段回測都沒用到的指標；
+    timings 為實際計算過的指標耗時（秒，來自 cache 的不列）。
+    """
+
+    def __init__(
+        self,
+        df: pd.DataFrame,
+        specs: Dict[str, tuple],
+        reg: Optional[IndicatorRegistry] = None,
+        cache: Optional[Dict[tuple, Any]] = None,
+        eager: bool = False,
+    ) -> None:
+        self.df = df
+        self.specs = dict(specs)
+        self.reg = reg or IndicatorRegistry()
+        self.cache = cache
+        self._values: Dict[str, Any] = {}
+        self.touched: set = set()
+        self.timings: Dict[str, float] = {}
+        # 名稱錯誤在建立時就報錯（與一次全算時相同）
+        for spec in self.specs.values():
+            fn = getattr(self.reg, spec[0], None)
+            if fn is None or not callable(fn):
+                raise ValueError(f"Unknown indicator function: {spec[0]}")
+        if eager:
+            self.compute_all()
+
+    def _compute(self, name: str) -> Any:
+        spec = self.specs[name]
+        if self.cache is not None and spec in self.cache:
+            value = self.cache[spec]
+        else:
+            t0 = time.perf_counter()
+            value = getattr(self.reg, spec[0])(self.df, *spec[1:])
+            self.timings[name] = time.perf_counter() - t0
+            if self.cache is not None:
+                self.cache[spec] = value
+        self._values[name] = value
+        return value
+
+    def compute_all(self, workers: Optional[int] = None, chunk_rows: Optional[int] = None) -> "LazyIndicators":
+        """
+        算完全部尚未計算的指標。workers 不為 None 時以 thread pool 平行計算
+        （chunk_rows：長資料分段，見 parallel_indicators.compute_indicators_parallel）。
+        """
+        missing = [k for k in self.specs if k not in self._values]
+        if workers is None:
+            for name in missing:
+                self._compute(name)
+            return self
+
+        from .parallel_indicators import compute_indicators_parallel
+
+        todo = []
+        for name in missing:
+            spec = self.specs[name]
+            if self.cache is not None and spec in self.cache:
+                self._values[name] = self.cache[spec]
+            elif spec not in todo:
+                todo.append(spec)
+        values, timings = compute_indicators_parallel(self.df, todo, self.reg, workers=workers, chunk_rows=chunk_rows)
+        if self.cache is not None:
+            self.cache.update(values)
+        for name in missing:
+            spec = self.specs[name]
+            if spec in values:
+                self._values[name] = values[spec]
+                self.timings[name] = timings[spec]
+        return self
+
+    def __getitem__(self, name: str) -> Any:
+        self.touched.add(name)
+        try:
+            return self._values[name]
+        except KeyError:
+            if name not in self.specs:
+                raise
+        return self._compute(name)
+
+    def __setitem__(self, name: str, value: Any) -> None:
+        self._values[name] = value
+
+    def __delitem__(self, name: str) -> None:
+        if name not in self._values and name not in self.specs:
+            raise KeyError(name)
+        self._values.pop(name, None)
+        self.specs.pop(name, None)
+
+    def __contains__(self, name: object) -> bool:
+        # 不觸發計算
+        return name in self._values or name in self.specs
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self.specs
+        yield from (k for k in self._values if k not in self.specs)
+
+    def __len__(self) -> int:
+        return len(self.specs) + sum(1 for k in self._values if k not in self.specs)
+
+    def computed(self) -> List[str]:
+        return [k for k in self.specs if k in self._values]
+
+    def untouched(self) -> List[str]:
+        return [k for k in self.specs if k not in self.touched]
+
@@ -0,0 +1,256 @@
+from __future__ import annotations
+
+import hashlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .models import ExitType, Side
+
+
+def to_ns(index) -> np.ndarray:
+    """DatetimeIndex / datetime array -> int64 nanoseconds（UTC；與 index 的時間單位無關）。"""
+    return pd.DatetimeIndex(index).as_unit("ns").asi8
+
+
+def infer_bar_duration(index: pd.DatetimeIndex) -> pd.Timedelta:
+    """以相鄰 bar 時間差的眾數推估 bar 長度（跨週末/缺資料的 gap 不影響眾數）。"""
+    if len(index) < 2:
+        raise ValueError("need at least 2 bars to infer bar duration")
+    diffs = np.diff(to_ns(index))
+    values, counts = np.unique(diffs[diffs > 0], return_counts=True)
+    return pd.Timedelta(int(values[np.argmax(counts)]), unit="ns")
+
+
+# resolve_many 的 levels 欄位順序（= execution 的 EXIT_SL / EXIT_BE / EXIT_TP）
+_CODE_BY_TYPE = {ExitType.SL: 0, ExitType.BE: 1, ExitType.TP: 2}
+
+
+class LowerTimeframeResolver:
+    """
+    對「同一根 bar 同時碰到多條出場線」的情況，用較小週期的 K 線判斷哪條線先被碰到。
+
+    - 時間索引（int64 ns）常駐記憶體；OHLC 依 block（Parquet row group 或固定列數）
+      在第一次需要時才載入，並以 LRU 保留 max_cached_blocks 個 block。
+    - prepare 以一次 searchsorted 算好整段回測每根 bar 對應的小週期列範圍（不逐筆記憶查詢結果）。
+    - resolve_many 一次判斷多筆查詢：依 block 分組載入，向量化找出各自最先被碰到的線。
+    - 小週期 K 線本身仍同時碰到方向相反的兩條線、或查無資料時視為無法判斷，
+      由呼叫端退回保守規則。
+    """
+
+    def __init__(
+        self,
+        times_ns: np.ndarray,
+        block_starts: np.ndarray,
+        load_block,
+        bar_duration: Optional[pd.Timedelta] = None,
+        max_cached_blocks: int = 64,
+        fingerprint: str = "",
+    ) -> None:
+        self.times_ns = np.asarray(times_ns, dtype=np.int64)
+        self.block_starts = np.asarray(block_starts, dtype=np.int64)  # 每個 block 的起始列
+        self._load_block = load_block  # block_id -> (open, high, low) ndarrays
+        self.bar_duration = bar_duration
+        self.max_cached_blocks = max_cached_blocks
+        self.fingerprint = fingerprint
+        self._blocks: "OrderedDict[int, Tuple[np.ndarray, np.ndarray, np.ndarray]]" = OrderedDict()
+        # prepare 算好的 (offset, 各 bar 的起始列, 結束列)
+        self._prepared: Optional[Tuple[int, np.ndarray, np.ndarray]] = None
+        self.stats: Dict[str, int] = {"lookups": 0, "batches": 0, "blocks_loaded": 0, "no_data": 0}
+
+    # ---- 建構 ----
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, bar_duration: Optional[pd.Timedelta] = None, block_rows: int = 1 << 16):
+        """由已在記憶體中的小週期 DataFrame 建立（block 只是 view，不複製）。"""
+        o = df["open"].to_numpy(dtype=float)
+        h = df["high"].to_numpy(dtype=float)
+        l = df["low"].to_numpy(dtype=float)
+        starts = np.arange(0, max(len(df), 1), block_rows, dtype=np.int64)
+
+        def load(b: int):
+            s = int(starts[b])
+            e = int(starts[b + 1]) if b + 1 < len(starts) else len(df)
+            return o[s:e], h[s:e], l[s:e]
+
+        fp = hashlib.sha256(pd.util.hash_pandas_object(df[["open", "high", "low"]], index=True).to_numpy().tobytes())
+        return cls(to_ns(df.index), starts, load, bar_duration=bar_duration, fingerprint=fp.hexdigest())
+
+    @classmethod
+    def from_parquet(
+        cls,
+        path,
+        time_column: Optional[str] = None,
+        bar_duration: Optional[pd.Timedelta] = None,
+        max_cached_blocks: int = 64,
+    ):
+        """
+        由 Parquet 檔建立：只先讀時間欄建立索引，OHLC 依 row group 以 memory map 懶載入。
+        time_column 省略時使用 pandas 寫入時記錄的 index 欄位。
+        """
+        import pyarrow.parquet as pq
+
+        path = Path(path)
+        pf = pq.ParquetFile(path, memory_map=True)
+        if time_column is None:
+            pandas_meta = pf.schema_arrow.pandas_metadata or {}
+            index_cols = [c for c in pandas_meta.get("index_columns", []) if isinstance(c, str)]
+            if not index_cols:
+                raise ValueError("time_column is required when the parquet file has no pandas index column")
+            time_column = index_cols[0]
+
+        times = pf.read(columns=[time_column]).column(time_column).to_pandas()
+        rg_rows = [pf.metadata.row_group(r).num_rows for r in range(pf.num_row_groups)]
+        starts = np.concatenate([[0], np.cumsum(rg_rows)[:-1]]).astype(np.int64)
+
+        def load(b: int):
+            t = pf.read_row_group(b, columns=["open", "high", "low"])
+            return (
+                t.column("open").to_numpy().astype(float, copy=False),
+                t.column("high").to_numpy().astype(float, copy=False),
+                t.column("low").to_numpy().astype(float, copy=False),
+            )
+
+        stat = path.stat()
+        fp = f"{path.resolve()}:{stat.st_size}:{stat.st_mtime_ns}"
+        return cls(
+            to_ns(times), starts, load,
+            bar_duration=bar_duration, max_cached_blocks=max_cached_blocks, fingerprint=fp,
+        )
+
+    # ---- 查詢 ----
+    def ensure_bar_duration(self, index: pd.DatetimeIndex) -> None:
+        if self.bar_duration is None:
+            self.bar_duration = infer_bar_duration(index)
+
+    def _block(self, b: int):
+        blk = self._blocks.get(b)
+        if blk is not None:
+            self._blocks.move_to_end(b)
+            return blk
+        blk = self._load_block(b)
+        self.stats["blocks_loaded"] += 1
+        self._blocks[b] = blk
+        if len(self._blocks) > self.max_cached_blocks:
+            self._blocks.popitem(last=False)
+        return blk
+
+    def prepare(self, index: pd.DatetimeIndex, offset: int = 0) -> None:
+        """整段回測的 bar（第 i 根為全域 bar offset + i）一次對應到小週期列範圍 [start, stop)。"""
+        self.ensure_bar_duration(index)
+        start, stop = self._row_ranges(to_ns(index))
+        self._prepared = (offset, start, stop)
+
+    def _row_ranges(self, t0: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        if self.bar_duration is None:
+            raise ValueError("bar_duration is not set (call ensure_bar_duration first)")
+        t1 = t0 + int(self.bar_duration.value)
+        return (
+            np.searchsorted(self.times_ns, t0, side="left").astype(np.int64),
+            np.searchsorted(self.times_ns, t1, side="left").astype(np.int64),
+        )
+
+    def _ranges_for(self, bar_times, bar_i: Optional[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        if bar_i is not None and self._prepared is not None:
+            offset, start, stop = self._prepared
+            k = np.asarray(bar_i, dtype=np.int64) - offset
+            if len(k) and k.min() >= 0 and k.max() < len(start):
+                return start[k], stop[k]
+        return self._row_ranges(to_ns(pd.DatetimeIndex(np.atleast_1d(bar_times))))
+
+    def _gather(self, rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """取任意列的 (open, high, low)：依 block 分組，每個 block 只載入一次。"""
+        o, h, l = np.empty(len(rows)), np.empty(len(rows)), np.empty(len(rows))
+        blocks = np.searchsorted(self.block_starts, rows, side="right") - 1
+        for b in np.unique(blocks).tolist():
+            m = blocks == b
+            bo, bh, bl = self._block(b)
+            local = rows[m] - int(self.block_starts[b])
+            o[m], h[m], l[m] = bo[local], bh[local], bl[local]
+        return o, h, l
+
+    def resolve_many(
+        self,
+        bar_times,
+        sign: np.ndarray,
+        levels: np.ndarray,
+        bar_i: Optional[np.ndarray] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        批次判斷多筆查詢各自在 [bar_time, bar_time + bar_duration) 內最先被碰到的出場線。
+        sign：+1 LONG / -1 SHORT；levels：shape (n, 3)，欄位依出場代碼 SL / BE / TP，NaN 表示不列入。
+        bar_i（全域 bar index）有給且在 prepare 範圍內時直接查預先算好的列範圍。
+        回傳 (出場代碼, 出場價)；無法判斷的為 EXIT_NONE / NaN。
+        """
+        from .execution import EXIT_NONE
+
+        sign = np.asarray(sign, dtype=float)
+        levels = np.asarray(levels, dtype=float).reshape(len(sign), 3)
+        n = len(sign)
+        code = np.full(n, EXIT_NONE, dtype=np.int8)
+        price = np.full(n, np.nan)
+        self.stats["lookups"] += n
+        self.stats["batches"] += 1
+        if n == 0:
+            return code, price
+        start, stop = self._ranges_for(bar_times, bar_i)
+        lengths = stop - start
+        self.stats["no_data"] += int((lengths <= 0).sum())
+        q = np.flatnonzero(lengths > 0)
+        if not len(q):
+            return code, price
+
+        # 全部查詢的小週期列攤平成一個陣列（row_q：每列屬於第幾筆查詢）
+        seg = lengths[q]
+        offsets = np.concatenate([[0], np.cumsum(seg)[:-1]])
+        row_q = np.repeat(np.arange(len(q)), seg)
+        rows = start[q][row_q] + (np.arange(int(seg.sum())) - offsets[row_q])
+        o, h, l = self._gather(rows)
+
+        lv = levels[q][row_q]
+        # 向下觸發（low <= level）：LONG 的 SL / BE、SHORT 的 TP
+        long_down = np.array([True, True, False])
+        down = np.where(sign[q][row_q, None] > 0, long_down, ~long_down)
+        touched = np.where(down, l[:, None] <= lv, h[:, None] >= lv)
+        total = len(rows)
+        first = np.minimum.reduceat(np.where(touched.any(axis=1), np.arange(total), total), offsets)
+        found = first < total
+        if not found.any():
+            return code, price
+
+        f = first[found]
+        tf, df_ = touched[f], down[f]
+        n_touch = tf.sum(axis=1)
+        n_down = (tf & df_).sum(axis=1)
+        # 同方向的多條線：價格連續移動，離開盤價最近的先被碰到；方向相反 -> 無法判斷
+        same_dir = (n_down == 0) | (n_down == n_touch)
+        dist = np.where(tf, np.abs(lv[f] - o[f][:, None]), np.inf)
+        k = np.argmin(dist, axis=1)
+        ok = same_dir
+        idx = q[found][ok]
+        code[idx] = k[ok]
+        price[idx] = lv[f[ok], k[ok]]
+        return code, price
+
+    def resolve(
+        self,
+        bar_time: pd.Timestamp,
+        side: Side,
+        hits: Sequence[Tuple[ExitType, float]],
+        bar_i: Optional[int] = None,
+    ) -> Optional[Tuple[ExitType, float]]:
+        """單筆版 resolve_many：回傳最先被碰到的 (出場類型, 價格)；無法判斷則 None。"""
+        from .execution import EXIT_NONE, EXIT_TYPE_BY_CODE
+
+        levels = np.full((1, 3), np.nan)
+        for et, px in hits:
+            levels[0, _CODE_BY_TYPE[et]] = px
+        code, price = self.resolve_many(
+            [pd.Timestamp(bar_time)], np.array([1.0 if side == Side.LONG else -1.0]), levels,
+            bar_i=None if bar_i is None else np.array([bar_i]),
+        )
+        if code[0] == EXIT_NONE:
+            return None
+        return EXIT_TYPE_BY_CODE[int(code[0])], float(price[0])
@@ -1,8 +1,8 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from enum import Enum
-from typing import Optional, List
+from typing import Optional, List, Dict, Any
 
 import pandas as pd
 
@@ -24,6 +24,7 @@ class ExitType(str, Enum):
     BE = "be"
     TIME = "time"
     MANUAL = "manual"
+    SESSION = "session"  # 可交易時段結束強制平倉（BacktestEngine.run 的 flatten_at_session_end）
     
 class SizingEquityBase(str, Enum):
     INITIAL = "initial"   # 用 initial equity/cash
@@ -41,6 +42,13 @@ class BacktestConfig:
     # LONG: 先SL；SHORT: 先SL（價格先往不利方向）
     time_exit_on_close: bool = True     # time-exit 用 close 出場
 
+    # 提前中止條件（None = 不檢查）；任一條件在 bar 收盤時成立即結束回測並標記 aborted
+    abort_max_drawdown: Optional[float] = None            # 例：0.5 = equity 自高點回落 50%
+    abort_min_equity: Optional[float] = None              # equity <= 此值
+    abort_max_consecutive_losses: Optional[int] = None    # 連續虧損（pnl <= 0）筆數
+    abort_min_trades: Optional[int] = None                # 到第 abort_min_trades_by_bar 根 bar 時
+    abort_min_trades_by_bar: Optional[int] = None         # 已平倉交易數仍少於 abort_min_trades
+
 
 @dataclass(frozen=True)
 class OrderIntent:
@@ -54,6 +62,8 @@ class OrderIntent:
     sl_price: Optional[float] = None
     be_price: Optional[float] = None
     priority: int = 100  # 數字越小越先處理
+    # 多筆持倉（position_mode="book"）時，EXIT 可指定要平的 lot；None 代表依 side 先進先出
+    lot_id: Optional[int] = None
 
 
 @dataclass
@@ -80,6 +90,9 @@ class Fill:
     # 若為 exit，標記原因
     entry_bar_i: Optional[int] = None
     exit_type: Optional[ExitType] = None
+    # 未含滑價的原始成交價與成交 bar（供事後重新計算成本用）
+    raw_price: Optional[float] = None
+    bar_i: Optional[int] = None
 
 
 @dataclass(frozen=True)
@@ -101,3 +114,10 @@ class Trade:
 class BacktestResult:
     trades: List[Trade]
     equity_curve: pd.Series  # index = time
+    fills: List[Fill] = field(default_factory=list)  # 依時間順序的全部成交
+    # 提前中止資訊（equity_curve 只到 abort_bar_i 為止）
+    aborted: bool = False
+    abort_reason: Optional[str] = None
+    abort_bar_i: Optional[int] = None
+    # 執行報告（例：intrabar 需要小週期判斷的 bar 數）
+    stats: Dict[str, Any] = field(default_factory=dict)
@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from .models import ActionType, BacktestResult
+
+
+def _lot_key(side, time, price: float) -> tuple:
+    return (side, pd.Timestamp(time).value, float(price))
+
+
+def trade_net_pnls(result: BacktestResult) -> np.ndarray:
+    """
+    每筆已平倉交易的淨損益。Trade.pnl 只扣出場手續費（進場手續費直接由現金扣除），
+    有 fills 時這裡把進場手續費也算進該筆交易，讓重抽後的 equity 與實際一致。
+    進場手續費依 (side, 進場時間, 進場價) 對應到 lot，按平倉數量比例分攤
+    （position_mode="book" 的 ADD lot / 部分平倉也適用；單一持倉時即該筆交易的進場手續費）。
+    """
+    pnls = np.array([t.pnl for t in result.trades], dtype=float)
+    if result.fills:
+        fee: Dict[tuple, float] = {}
+        qty: Dict[tuple, float] = {}
+        for f in result.fills:
+            if f.action != ActionType.EXIT:
+                key = _lot_key(f.side, f.time, f.price)
+                fee[key] = fee.get(key, 0.0) + f.fee
+                qty[key] = qty.get(key, 0.0) + f.qty
+        entry_fees = np.empty(len(pnls))
+        for j, t in enumerate(result.trades):
+            key = _lot_key(t.side, t.entry_time, t.entry_price)
+            if key not in fee:
+                raise ValueError("fills do not match trades")
+            entry_fees[j] = fee[key] * (t.qty / qty[key])
+        pnls = pnls - entry_fees
+    return pnls
+
+
+def _simulate_chunk(
+    pnls: np.ndarray,
+    n_paths: int,
+    method: str,
+    initial_cash: float,
+    ruin_equity: float,
+    seed: np.random.SeedSequence,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    n = len(pnls)
+    if n == 0:
+        return np.full(n_paths, initial_cash), np.zeros(n_paths), np.zeros(n_paths, dtype=bool)
+    if method == "bootstrap":
+        paths = pnls[rng.integers(0, n, size=(n_paths, n))]
+    elif method == "shuffle":
+        paths = rng.permuted(np.broadcast_to(pnls, (n_paths, n)), axis=1)
+    else:
+        raise ValueError(f"Unknown method: {method}")
+
+    equity = initial_cash + np.cumsum(paths, axis=1)
+    peak = np.maximum(np.maximum.accumulate(equity, axis=1), initial_cash)
+    max_dd = ((equity - peak) / peak).min(axis=1)
+    return equity[:, -1], max_dd, (equity <= ruin_equity).any(axis=1)
+
+
+@dataclass
+class MonteCarloResult:
+    """每條模擬路徑的最終 equity、最大回撤（負值，同 analytics.max_drawdown）與是否觸及破產線。"""
+
+    final_equity: np.ndarray
+    max_drawdown: np.ndarray
+    ruined: np.ndarray
+    initial_cash: float
+
+    @property
+    def n_paths(self) -> int:
+        return len(self.final_equity)
+
+    @property
+    def risk_of_ruin(self) -> float:
+        return float(self.ruined.mean()) if self.n_paths else 0.0
+
+    def summary(self, quantiles: Sequence[float] = (0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99)) -> pd.DataFrame:
+        return pd.DataFrame(
+            {
+                "final_equity": np.quantile(self.final_equity, quantiles),
+                "max_drawdown": np.quantile(self.max_drawdown, quantiles),
+            },
+            index=pd.Index(quantiles, name="quantile"),
+        )
+
+
+def monte_carlo(
+    result: BacktestResult,
+    initial_cash: float,
+    n_paths: int = 10_000,
+    method: str = "bootstrap",
+    ruin_drawdown: float = 0.5,
+    seed: Optional[int] = None,
+    chunk_size: int = 10_000,
+    n_jobs: int = 1,
+    pnls: Optional[np.ndarray] = None,
+) -> MonteCarloResult:
+    """
+    以交易序列重抽樣產生 n_paths 條 equity 路徑（paths × trades 的 2D 陣列，依 chunk_size 分批以限制記憶體）。
+
+    method：
+    - "bootstrap"：有放回抽樣（交易數不變）
+    - "shuffle"：同一批交易隨機重排（最終 equity 不變，只看路徑/回撤分佈）
+    ruin_drawdown：equity 跌到 initial_cash * (1 - ruin_drawdown) 以下視為破產。
+    每個 chunk 使用由 seed 衍生的獨立亂數流，結果與 n_jobs 無關、可重現。
+    """
+    if pnls is None:
+        pnls = trade_net_pnls(result)
+    pnls = np.asarray(pnls, dtype=float)
+    ruin_equity = initial_cash * (1.0 - ruin_drawdown)
+
+    sizes = [min(chunk_size, n_paths - s) for s in range(0, n_paths, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    args = [(pnls, size, method, initial_cash, ruin_equity, ss) for size, ss in zip(sizes, seeds)]
+
+    if n_jobs > 1 and len(args) > 1:
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            parts = list(pool.map(_simulate_chunk, *zip(*args)))
+    else:
+        parts = [_simulate_chunk(*a) for a in args]
+
+    return MonteCarloResult(
+        final_equity=np.concatenate([p[0] for p in parts]) if parts else np.empty(0),
+        max_drawdown=np.concatenate([p[1] for p in parts]) if parts else np.empty(0),
+        ruined=np.concatenate([p[2] for p in parts]) if parts else np.empty(0, dtype=bool),
+        initial_cash=initial_cash,
+    )
@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import math
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from itertools import product
+from typing import Any, Dict, List, Optional, Sequence
+
+import pandas as pd
+
+from .analytics import performance_per_day
+from .models import BacktestConfig
+from .sweep import StrategyFactory, _params_key, run_sweep
+
+
+def build_param_combinations(grid: Dict[str, Sequence[Any]]) -> List[Dict[str, Any]]:
+    """將 param_grid 展開成所有組合，每個組合是一個 dict。"""
+    keys = list(grid.keys())
+    return [dict(zip(keys, vals)) for vals in product(*(grid[k] for k in keys))]
+
+
+def sample_param_combinations(grid: Dict[str, Sequence[Any]], n: int, seed: Optional[int] = None) -> List[Dict[str, Any]]:
+    """由 grid 隨機抽 n 組（不重複；n 大於總組合數時回傳全部）。"""
+    combos = build_param_combinations(grid)
+    if n >= len(combos):
+        return combos
+    return random.Random(seed).sample(combos, n)
+
+
+# ---- process pool worker：每個 worker 只收一次訓練資料 ----
+_WORKER_DF: Optional[pd.DataFrame] = None
+
+
+def _init_worker(df: pd.DataFrame) -> None:
+    global _WORKER_DF
+    _WORKER_DF = df
+
+
+@dataclass(frozen=True)
+class _Score:
+    perf_per_day: float
+    n_trades: int
+    aborted: bool
+    bars: int  # 實際模擬的 bar 數（提前中止者較少）
+
+
+def _evaluate_chunk(
+    n_bars: int,
+    factory: StrategyFactory,
+    combos: List[Dict[str, Any]],
+    config: BacktestConfig,
+    df: Optional[pd.DataFrame] = None,
+) -> List[_Score]:
+    data = (df if df is not None else _WORKER_DF).iloc[:n_bars]
+    runs = run_sweep(data, factory, combos, config)
+    return [
+        _Score(
+            # 提前中止的組合視為淘汰：分數設為 -inf，不會晉級
+            perf_per_day=float("-inf") if r.pruned else performance_per_day(r.result, data),
+            n_trades=len(r.result.trades),
+            aborted=r.pruned,
+            bars=len(r.result.equity_curve),
+        )
+        for r in runs
+    ]
+
+
+@dataclass
+class OptimizerResult:
+    """
+    table：最後一階存活者依 train 績效排序（欄位同 notebook 的 tune_strategy_params，
+    有給 test_df 時另含 test_perf_per_day / perf_diff）。觸發提前中止者不列入。
+    rungs：每一階的完整評分表（含 aborted 欄）。
+    bar_evals：實際模擬的 bar 數（提前中止的組合只計到中止為止）。
+    """
+
+    table: pd.DataFrame
+    rungs: List[pd.DataFrame] = field(default_factory=list)
+    bar_evals: int = 0
+    full_grid_bar_evals: int = 0
+
+    @property
+    def saved_bar_evals(self) -> int:
+        return self.full_grid_bar_evals - self.bar_evals
+
+
+def _rung_sizes(n_bars: int, n_rungs: int, eta: float, min_bars: int) -> List[int]:
+    sizes = [max(min_bars, int(n_bars * eta ** (r - (n_rungs - 1)))) for r in range(n_rungs)]
+    return [min(n_bars, s) for s in sizes[:-1]] + [n_bars]
+
+
+def successive_halving(
+    train_df: pd.DataFrame,
+    strategy_factory: StrategyFactory,
+    candidates: Sequence[Dict[str, Any]],
+    config: BacktestConfig,
+    eta: float = 3.0,
+    n_rungs: int = 3,
+    min_bars: int = 500,
+    best_n_params: int = 1,
+    test_df: Optional[pd.DataFrame] = None,
+    max_workers: Optional[int] = None,
+) -> OptimizerResult:
+    """
+    Successive halving：所有候選先跑訓練區間最前面的一小段，每一階保留前 1/eta，
+    下一階資料長度乘 eta，最後一階跑完整訓練區間。每階在 process pool 平行執行
+    （max_workers=None 為 CPU 數；為 1 時在本行程執行）。strategy_factory 需可 pickle（見 sweep.ParamsFactory）。
+    """
+    candidates = [dict(c) for c in candidates]
+    n_bars = len(train_df)
+    sizes = _rung_sizes(n_bars, n_rungs, eta, min_bars)
+
+    alive = list(range(len(candidates)))
+    rungs: List[pd.DataFrame] = []
+    bar_evals = 0
+
+    n_workers = max_workers or os.cpu_count() or 1
+    pool = None
+    if n_workers != 1:
+        pool = ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker, initargs=(train_df,))
+    try:
+        for r, size in enumerate(sizes):
+            scores = _evaluate_rung(
+                pool, n_workers, train_df, size, strategy_factory, [candidates[j] for j in alive], config
+            )
+            bar_evals += sum(s.bars for s in scores)
+            rung = pd.DataFrame(
+                {
+                    "candidate": alive,
+                    "params": [candidates[j] for j in alive],
+                    "train_perf_per_day": [s.perf_per_day for s in scores],
+                    "n_trades": [s.n_trades for s in scores],
+                    "aborted": [s.aborted for s in scores],
+                    "rung": r,
+                    "n_bars": size,
+                }
+            ).sort_values("train_perf_per_day", ascending=False, kind="stable")
+            rungs.append(rung.reset_index(drop=True))
+            if r < len(sizes) - 1:
+                keep = max(best_n_params, math.ceil(len(alive) / eta))
+                alive = rung.loc[~rung["aborted"], "candidate"].tolist()[:keep]
+                if not alive:
+                    break
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    last = rungs[-1].loc[~rungs[-1]["aborted"]]
+    table = last[["params", "train_perf_per_day", "n_trades"]].head(best_n_params).reset_index(drop=True)
+    if test_df is not None:
+        test_scores = _evaluate_chunk(len(test_df), strategy_factory, table["params"].tolist(), config, df=test_df)
+        table["test_perf_per_day"] = [s.perf_per_day for s in test_scores]
+        table["perf_diff"] = table["test_perf_per_day"] - table["train_perf_per_day"]
+
+    return OptimizerResult(
+        table=table,
+        rungs=rungs,
+        bar_evals=bar_evals,
+        full_grid_bar_evals=n_bars * len(candidates),
+    )
+
+
+def _evaluate_rung(
+    pool: Optional[ProcessPoolExecutor],
+    n_workers: int,
+    train_df: pd.DataFrame,
+    n_bars: int,
+    factory: StrategyFactory,
+    combos: List[Dict[str, Any]],
+    config: BacktestConfig,
+) -> List[_Score]:
+    if pool is None:
+        return _evaluate_chunk(n_bars, factory, combos, config, df=train_df)
+    # 依進場參數排序後切塊：相同進場參數盡量落在同一塊，讓 run_sweep 的出場快速路徑生效
+    def entry_key(params: Dict[str, Any]) -> str:
+        strategy = factory(params)
+        return repr(_params_key(strategy, strategy.exit_param_names))
+
+    order = sorted(range(len(combos)), key=lambda j: entry_key(combos[j]))
+    n_chunks = max(1, min(len(combos), n_workers * 4))
+    size = math.ceil(len(order) / n_chunks) if order else 1
+    chunks = [order[s:s + size] for s in range(0, len(order), size)]
+    futures = [pool.submit(_evaluate_chunk, n_bars, factory, [combos[j] for j in c], config) for c in chunks]
+    scores: List[Optional[_Score]] = [None] * len(combos)
+    for c, fut in zip(chunks, futures):
+        for j, s in zip(c, fut.result()):
+            scores[j] = s
+    return scores  # type: ignore[return-value]
@@ -0,0 +1,221 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from .indicators import IndicatorRegistry
+from .models import BacktestResult
+from .strategy_base import Strategy
+
+
+PANEL_FIELDS = ("open", "high", "low", "close")
+
+
+class SymbolPanel:
+    """
+    多個標的對齊到同一條時間軸（各 DataFrame index 的聯集）的 OHLC 資料。
+
+    資料存成 (symbol, time, field) 的單一 float64 陣列：
+    - field(name) 回傳 time × symbol 的 2D view，給指標一次算完全部標的；
+    - frame(symbol) 回傳該標的上市期間的 DataFrame view（不複製），可直接交給 BacktestEngine。
+    上市前 / 下市後的 bar 為 NaN。上市期間內缺 bar 時：gaps="raise" 直接報錯，
+    gaps="ffill" 以前一根收盤價補成平盤 bar（open=high=low=close）。
+    """
+
+    def __init__(self, index: pd.DatetimeIndex, symbols: Sequence[str], data: np.ndarray) -> None:
+        self.index = index
+        self.symbols = list(symbols)
+        self.data = data  # shape = (n_symbols, n_bars, len(PANEL_FIELDS))
+        self._pos = {s: k for k, s in enumerate(self.symbols)}
+        valid = ~np.isnan(data[:, :, PANEL_FIELDS.index("close")])
+        has = valid.any(axis=1)
+        self.first = np.where(has, valid.argmax(axis=1), 0)
+        self.last = np.where(has, len(index) - valid[:, ::-1].argmax(axis=1), 0)  # 不含
+
+    @classmethod
+    def from_frames(cls, frames: Mapping[str, pd.DataFrame], gaps: str = "raise") -> "SymbolPanel":
+        if gaps not in ("raise", "ffill"):
+            raise ValueError(f"Unknown gaps mode: {gaps}")
+        symbols = list(frames)
+        index = pd.DatetimeIndex(sorted(set().union(*(f.index for f in frames.values())))) if frames else pd.DatetimeIndex([])
+        data = np.full((len(symbols), len(index), len(PANEL_FIELDS)), np.nan)
+        for k, sym in enumerate(symbols):
+            df = frames[sym]
+            missing = set(PANEL_FIELDS) - set(df.columns)
+            if missing:
+                raise ValueError(f"{sym}: df missing columns: {sorted(missing)}")
+            if not df.index.is_unique:
+                raise ValueError(f"{sym}: duplicate timestamps")
+            rows = index.get_indexer(df.index)
+            data[k, rows, :] = df[list(PANEL_FIELDS)].to_numpy(dtype=float)
+            # 上市期間內的缺 bar
+            a, b = rows.min(), rows.max() + 1
+            hole = np.isnan(data[k, a:b, PANEL_FIELDS.index("close")])
+            if hole.any():
+                if gaps == "raise":
+                    raise ValueError(f"{sym}: {int(hole.sum())} missing bars inside its listing period (use gaps='ffill')")
+                close = pd.Series(data[k, a:b, PANEL_FIELDS.index("close")]).ffill().to_numpy()
+                for f in range(len(PANEL_FIELDS)):
+                    data[k, a:b, f] = np.where(hole, close, data[k, a:b, f])
+        return cls(index, symbols, data)
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def field(self, name: str) -> np.ndarray:
+        """time × symbol 的 2D view。"""
+        return self.data[:, :, PANEL_FIELDS.index(name)].T
+
+    def bounds(self, symbol: str) -> tuple[int, int]:
+        k = self._pos[symbol]
+        return int(self.first[k]), int(self.last[k])
+
+    def frame(self, symbol: str) -> pd.DataFrame:
+        """該標的上市期間的 OHLC（共用 panel 的記憶體）。"""
+        k = self._pos[symbol]
+        a, b = self.bounds(symbol)
+        return pd.DataFrame(self.data[k, a:b, :], index=self.index[a:b], columns=list(PANEL_FIELDS), copy=False)
+
+
+# ---- time × symbol 的 2D 指標（與 indicators.py 的單標的版本逐位元相同）----
+def _frame2d(panel: SymbolPanel, column: str) -> pd.DataFrame:
+    return pd.DataFrame(panel.field(column), copy=False)
+
+
+def _rolling_high(panel, length: int, column: str = "high"):
+    return _frame2d(panel, column).rolling(length, min_periods=length).max().to_numpy()
+
+
+def _rolling_low(panel, length: int, column: str = "low"):
+    return _frame2d(panel, column).rolling(length, min_periods=length).min().to_numpy()
+
+
+def _bar_side(panel):
+    # 單標的版本回傳 int；這裡保留 NaN（上市前），數值相同
+    return np.sign(panel.field("close") - panel.field("open"))
+
+
+def _bar_side_sum(panel, length: int):
+    return pd.DataFrame(_bar_side(panel)).rolling(length, min_periods=length).sum().to_numpy()
+
+
+def _body_strictly_increasing(panel, n: int):
+    body = (_frame2d(panel, "close") - _frame2d(panel, "open")).abs()
+    cond = pd.DataFrame(True, index=body.index, columns=body.columns)
+    for j in range(n - 1):
+        cond &= body.shift(j) > body.shift(j + 1)
+    return cond.to_numpy(dtype=bool)
+
+
+def _rocp(panel, length: int, column: str = "close"):
+    # 同 TA-Lib ROCP：(x - x[-n]) / x[-n]，x[-n] 為 0 時輸出 0
+    x = panel.field(column)
+    prev = np.full_like(x, np.nan)
+    prev[length:] = x[:-length] if length > 0 else x
+    with np.errstate(all="ignore"):
+        return np.where(prev != 0, (x - prev) / prev, np.where(np.isnan(prev), np.nan, 0.0))
+
+
+def _bar_range(panel):
+    return panel.field("high") - panel.field("low")
+
+
+def _bar_range_pct(panel):
+    return (panel.field("high") - panel.field("low")) / panel.field("close")
+
+
+def _bar_body_range(panel):
+    return np.abs(panel.field("close") - panel.field("open"))
+
+
+def _bar_body_range_pct(panel):
+    return np.abs(panel.field("close") - panel.field("open")) / panel.field("close")
+
+
+_PANEL_INDICATORS: Dict[str, Callable[..., np.ndarray]] = {
+    "rolling_high": _rolling_high,
+    "rolling_low": _rolling_low,
+    "bar_side": _bar_side,
+    "bar_side_sum": _bar_side_sum,
+    "body_strictly_increasing": _body_strictly_increasing,
+    "rocp": _rocp,
+    "bar_range": _bar_range,
+    "bar_range_pct": _bar_range_pct,
+    "bar_body_range": _bar_body_range,
+    "bar_body_range_pct": _bar_body_range_pct,
+}
+
+
+@dataclass
+class PanelIndicators:
+    """spec tuple -> time × symbol 陣列；for_symbol 取出單一標的的 Series view（不複製）。"""
+
+    panel: SymbolPanel
+    values: Dict[tuple, np.ndarray] = field(default_factory=dict)
+
+    def for_symbol(self, symbol: str, specs: Mapping[str, tuple]) -> Dict[str, Any]:
+        k = self.panel._pos[symbol]
+        a, b = self.panel.bounds(symbol)
+        index = self.panel.index[a:b]
+        return {name: pd.Series(self.values[spec][a:b, k], index=index, copy=False) for name, spec in specs.items()}
+
+
+def compute_panel_indicators(
+    panel: SymbolPanel,
+    specs: Sequence[tuple],
+    reg: Optional[IndicatorRegistry] = None,
+    out: Optional[PanelIndicators] = None,
+) -> PanelIndicators:
+    """
+    每個 spec 對全部標的只算一次。逐元素 / 滾動視窗類指標以 2D 陣列一次算完；
+    遞迴型（ATR、MA 等 TA-Lib 指標）與自訂指標逐標的呼叫 registry，
+    寫回同一個 2D 陣列（結果與單標的計算相同）。
+    """
+    reg = reg or IndicatorRegistry()
+    out = out or PanelIndicators(panel)
+    for spec in specs:
+        if spec in out.values:
+            continue
+        fn_name, params = spec[0], spec[1:]
+        fn2d = _PANEL_INDICATORS.get(fn_name)
+        if fn2d is not None:
+            # 存成 column-major：每個標的的欄位是連續記憶體
+            out.values[spec] = np.asfortranarray(fn2d(panel, *params))
+            continue
+        fn = getattr(reg, fn_name, None)
+        if fn is None or not callable(fn):
+            raise ValueError(f"Unknown indicator function: {fn_name}")
+        arr = np.full((len(panel.symbols), len(panel)), np.nan)
+        for sym in panel.symbols:
+            a, b = panel.bounds(sym)
+            if b > a:
+                arr[panel._pos[sym], a:b] = np.asarray(fn(panel.frame(sym), *params), dtype=float)
+        out.values[spec] = arr.T
+    return out
+
+
+def run_panel(
+    engine,
+    panel: SymbolPanel,
+    strategy_factory: Callable[[str], Strategy],
+    symbols: Optional[Sequence[str]] = None,
+) -> Dict[str, BacktestResult]:
+    """同一組策略跑多個標的：指標先以 panel 批次算好，再逐標的交給 engine（資料與指標都不複製）。"""
+    symbols = list(symbols) if symbols is not None else panel.symbols
+    strategies = {sym: strategy_factory(sym) for sym in symbols}
+    specs: List[tuple] = []
+    for strategy in strategies.values():
+        specs.extend(s for s in strategy.required_indicators().values() if s not in specs)
+    batch = compute_panel_indicators(panel, specs)
+
+    results: Dict[str, BacktestResult] = {}
+    for sym, strategy in strategies.items():
+        a, b = panel.bounds(sym)
+        if b <= a:
+            continue
+        indicators = batch.for_symbol(sym, strategy.required_indicators())
+        results[sym] = engine.run(panel.frame(sym), strategy, indicators=indicators)
+    return results
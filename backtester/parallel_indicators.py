@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+
+# 可分段計算的指標：fn 名稱 -> 由參數算出需要的前置 bar 數（warmup）。
+# 只收錄每個輸出只依賴固定視窗、且逐元素運算與起點無關的指標，分段接回後與整段計算逐位元相同；
+# ATR / EMA 等遞迴指標與 TA-Lib SMA（累加和與起點有關）一律整段計算。
+CHUNKABLE: Dict[str, Callable[..., int]] = {
+    "rolling_high": lambda length, column="high": length - 1,
+    "rolling_low": lambda length, column="low": length - 1,
+    "bar_side": lambda: 0,
+    "bar_side_sum": lambda length: length - 1,
+    "body_strictly_increasing": lambda n: max(n - 1, 0),
+    "rocp": lambda length, column="close": length,
+    "bar_range": lambda: 0,
+    "bar_range_pct": lambda: 0,
+    "bar_body_range": lambda: 0,
+    "bar_body_range_pct": lambda: 0,
+}
+
+
+def indicator_warmup(spec: tuple) -> Optional[int]:
+    """spec 分段計算需要的前置 bar 數；不能分段的指標回傳 None。"""
+    fn = CHUNKABLE.get(spec[0])
+    return None if fn is None else int(fn(*spec[1:]))
+
+
+def _timed(fn: Callable[..., Any], *args) -> Tuple[Any, float]:
+    t0 = time.perf_counter()
+    out = fn(*args)
+    return out, time.perf_counter() - t0
+
+
+def _chunk_job(fn: Callable[..., Any], df: pd.DataFrame, params: tuple, a: int, b: int, warmup: int) -> Any:
+    lo = max(0, a - warmup)
+    out = fn(df.iloc[lo:b], *params)
+    return out.iloc[a - lo :]
+
+
+def compute_indicators_parallel(
+    df: pd.DataFrame,
+    specs: Sequence[tuple],
+    reg,
+    workers: Optional[int] = None,
+    chunk_rows: Optional[int] = None,
+) -> Tuple[Dict[tuple, Any], Dict[tuple, float]]:
+    """
+    以 thread pool 計算多個指標 spec（TA-Lib / pandas rolling 的核心計算會釋放 GIL）。
+    相同 spec 只算一次；指標彼此獨立（規則編譯等依賴全部指標的步驟由呼叫端在之後執行）。
+    chunk_rows：資料超過此長度時，可分段的指標（見 CHUNKABLE）切成每段 chunk_rows 根，
+    各段往前多取 warmup 根一起算、再截掉前置部分接回，結果與整段計算相同。
+    回傳 (spec -> 指標值, spec -> 計算耗時秒數；分段時為各段耗時總和)。
+    """
+    unique: List[tuple] = []
+    for spec in specs:
+        if spec not in unique:
+            unique.append(spec)
+
+    jobs: Dict[tuple, List[Future]] = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for spec in unique:
+            fn = getattr(reg, spec[0], None)
+            if fn is None or not callable(fn):
+                raise ValueError(f"Unknown indicator function: {spec[0]}")
+            params = spec[1:]
+            warmup = indicator_warmup(spec)
+            n = len(df)
+            if chunk_rows is not None and warmup is not None and n > chunk_rows:
+                jobs[spec] = [
+                    pool.submit(_timed, _chunk_job, fn, df, params, a, min(a + chunk_rows, n), warmup)
+                    for a in range(0, n, chunk_rows)
+                ]
+            else:
+                jobs[spec] = [pool.submit(_timed, fn, df, *params)]
+
+        values: Dict[tuple, Any] = {}
+        timings: Dict[tuple, float] = {}
+        for spec, futures in jobs.items():
+            parts = [f.result() for f in futures]
+            values[spec] = parts[0][0] if len(parts) == 1 else pd.concat([p[0] for p in parts])
+            timings[spec] = sum(p[1] for p in parts)
+    return values, timings
@@ -13,11 +13,13 @@ class Portfolio:
     cash: float
     position: Position
     trades: List[Trade]
+    fills: List[Fill]
 
     def __init__(self, initial_cash: float) -> None:
         self.cash = float(initial_cash)
         self.position = Position()
         self.trades = []
+        self.fills = []
 
     def equity(self, mark_price: float) -> float:
         if self.position.side is None or self.position.qty == 0:
@@ -38,6 +40,7 @@ class Portfolio:
         self.position.entry_time = fill.time
         self.position.entry_bar_i = fill.entry_bar_i
         self.cash -= fill.fee  # 扣單次手續費（不做保證金計算）
+        self.fills.append(fill)
 
     def apply_exit_fill(self, fill: Fill, bars_held: int) -> None:
         assert fill.action.value == "exit"
@@ -51,6 +54,7 @@ class Portfolio:
             pnl = (entry_price - fill.price) * qty - fill.fee
 
         self.cash += pnl  # 將已實現損益回到現金（已扣 fee）
+        self.fills.append(fill)
         self.trades.append(
             Trade(
                 side=self.position.side,
@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from .intrabar import to_ns
+
+
+class SparseTable:
+    """
+    靜態陣列的 range argmax / argmin 索引：建表 O(n log n)，每次查詢 O(1)，
+    查詢接受整批 (lo, hi) 陣列（閉區間），一次以 numpy 回傳。同值時回傳較早的位置。
+    """
+
+    def __init__(self, values: np.ndarray, op: str = "max", table: Optional[np.ndarray] = None) -> None:
+        if op not in ("max", "min"):
+            raise ValueError(f"Unknown op: {op}")
+        self.values = np.asarray(values, dtype=float)
+        self.op = op
+        self.table = table if table is not None else self._build()
+
+    def _better(self, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+        """a、b 為位置；回傳 a 是否不劣於 b（同值取較早位置）。"""
+        va, vb = self.values[a], self.values[b]
+        win = va > vb if self.op == "max" else va < vb
+        return win | ((va == vb) & (a <= b))
+
+    def _build(self) -> np.ndarray:
+        n = len(self.values)
+        dtype = np.int32 if n < 2**31 else np.int64
+        levels = max(1, int(n).bit_length())
+        table = np.empty((levels, n), dtype=dtype)
+        table[0] = np.arange(n, dtype=dtype)
+        # 第 k 層：table[k, i] = [i, i + 2^k) 內的最佳位置（超出尾端的部分沿用上一層）
+        for k in range(1, levels):
+            half = 1 << (k - 1)
+            prev = table[k - 1]
+            cur = prev.copy()
+            a, b = prev[: n - half], prev[half:]
+            cur[: n - half] = np.where(self._better(a, b), a, b)
+            table[k] = cur
+        return table
+
+    def argquery(self, lo: np.ndarray, hi: np.ndarray) -> np.ndarray:
+        """[lo, hi] 閉區間內最大（或最小）值的位置；需 lo <= hi。"""
+        lo = np.asarray(lo, dtype=np.int64)
+        hi = np.asarray(hi, dtype=np.int64)
+        length = hi - lo + 1
+        if np.any(length <= 0):
+            raise ValueError("empty range (lo > hi)")
+        k = np.frexp(length.astype(float))[1] - 1  # floor(log2(length))，對整數長度是精確的
+        a = self.table[k, lo].astype(np.int64)
+        b = self.table[k, hi - (np.int64(1) << k) + 1].astype(np.int64)
+        return np.where(self._better(a, b), a, b)
+
+    def query(self, lo: np.ndarray, hi: np.ndarray) -> np.ndarray:
+        return self.values[self.argquery(lo, hi)]
+
+
+class PriceRangeIndex:
+    """
+    一份 OHLC 資料的 high 區間最大 / low 區間最小索引（MAE / MFE 用）。
+    每份資料只需建一次；save / load 為單一 .npz，可用 load_or_build 以資料指紋快取在資料旁邊。
+    """
+
+    def __init__(self, times_ns: np.ndarray, high: SparseTable, low: SparseTable, fingerprint: str = "") -> None:
+        self.times_ns = np.asarray(times_ns, dtype=np.int64)
+        self.high = high
+        self.low = low
+        self.fingerprint = fingerprint
+
+    def __len__(self) -> int:
+        return len(self.times_ns)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, fingerprint: Optional[str] = None) -> "PriceRangeIndex":
+        if fingerprint is None:
+            from .cache import dataset_fingerprint
+
+            fingerprint = dataset_fingerprint(df[["high", "low"]])
+        return cls(
+            to_ns(df.index),
+            SparseTable(df["high"].to_numpy(dtype=float), "max"),
+            SparseTable(df["low"].to_numpy(dtype=float), "min"),
+            fingerprint=fingerprint,
+        )
+
+    def bar_positions(self, times) -> np.ndarray:
+        """時間 -> bar 位置（時間必須是 index 中的 bar 時間）。"""
+        ns = to_ns(times)
+        pos = np.searchsorted(self.times_ns, ns)
+        if len(ns) and (np.any(pos >= len(self.times_ns)) or np.any(self.times_ns[np.minimum(pos, len(self) - 1)] != ns)):
+            raise KeyError("some times are not bars of the indexed dataset")
+        return pos
+
+    # ---- 檔案 ----
+    def save(self, path) -> Path:
+        path = Path(path)
+        with open(path, "wb") as fh:
+            np.savez(
+                fh,
+                times_ns=self.times_ns,
+                high=self.high.values,
+                low=self.low.values,
+                high_table=self.high.table,
+                low_table=self.low.table,
+                fingerprint=np.array(self.fingerprint),
+            )
+        return path
+
+    @classmethod
+    def load(cls, path) -> "PriceRangeIndex":
+        with np.load(path) as z:
+            return cls(
+                z["times_ns"],
+                SparseTable(z["high"], "max", table=z["high_table"]),
+                SparseTable(z["low"], "min", table=z["low_table"]),
+                fingerprint=str(z["fingerprint"]),
+            )
+
+    @classmethod
+    def load_or_build(cls, df: pd.DataFrame, cache_dir) -> "PriceRangeIndex":
+        """以資料指紋為檔名快取在 cache_dir；資料內容不同就會重建。"""
+        from .cache import dataset_fingerprint
+
+        fp = dataset_fingerprint(df[["high", "low"]])
+        cache_dir = Path(cache_dir)
+        path = cache_dir / f"rangeindex-{fp[:32]}.npz"
+        if path.exists():
+            index = cls.load(path)
+            if index.fingerprint == fp:
+                return index
+        index = cls.from_frame(df, fingerprint=fp)
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        index.save(path)
+        return index
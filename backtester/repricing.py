@@ -0,0 +1,375 @@
+from __future__ import annotations
+
+import dataclasses
+from dataclasses import dataclass
+from itertools import product
+from typing import TYPE_CHECKING, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from .abort import abort_enabled
+from .analytics import basic_metrics
+from .compact import compact_frame
+from .models import BacktestConfig, BacktestResult, Fill, ActionType, Side, SizingEquityBase
+from .strategy_base import Strategy
+
+if TYPE_CHECKING:
+    from .costs import CostModel
+    from .engine import BacktestEngine
+
+
+def sizing_depends_on_equity(strategy: Strategy) -> bool:
+    """策略下單量是否跟著當下 equity 變（是的話成本一變，進出場就可能不同，必須重跑）。"""
+    base = getattr(getattr(strategy, "p", None), "sizing_equity_base", SizingEquityBase.INITIAL)
+    return base != SizingEquityBase.INITIAL
+
+
+_BOOK_FILLS_MESSAGE = (
+    "fills are not single-position round trips (position_mode='book' results with ADD lots or "
+    "partial exits are not supported; rerun the engine instead)"
+)
+
+
+def check_single_position(strategy: Strategy) -> None:
+    if getattr(strategy, "position_mode", "single") == "book":
+        raise ValueError("position_mode='book' results cannot be repriced; rerun the engine instead")
+
+
+@dataclass(frozen=True)
+class FillArrays:
+    """把 fills 配對成一筆筆 round-trip，以 array 表示（未平倉的最後一筆 exit_bar = n_bars）。"""
+
+    sign: np.ndarray         # +1 LONG / -1 SHORT
+    qty: np.ndarray
+    entry_raw: np.ndarray    # 未含滑價的進場價
+    exit_raw: np.ndarray     # 未含滑價的出場價（未平倉為 nan）
+    entry_bar: np.ndarray
+    exit_bar: np.ndarray
+    closed: np.ndarray       # bool
+
+    @property
+    def n(self) -> int:
+        return len(self.sign)
+
+
+def fill_arrays(fills: List[Fill], n_bars: int) -> FillArrays:
+    """
+    依序把 ENTRY / EXIT 配成 round-trip（單一持倉模式）。
+    position_mode="book" 的成交（ADD lot、部分平倉）無法這樣配對，會直接 ValueError。
+    """
+    sign, qty, entry_raw, exit_raw, entry_bar, exit_bar = [], [], [], [], [], []
+    open_entry: Optional[Fill] = None
+    for f in fills:
+        if f.raw_price is None or f.bar_i is None:
+            raise ValueError("fills must carry raw_price and bar_i (rerun with the current engine)")
+        if f.action != ActionType.EXIT:
+            if open_entry is not None:
+                raise ValueError(_BOOK_FILLS_MESSAGE)
+            open_entry = f
+            continue
+        if open_entry is None:
+            raise ValueError("exit fill without a matching entry fill")
+        if f.qty != open_entry.qty:
+            raise ValueError(_BOOK_FILLS_MESSAGE)
+        sign.append(1.0 if open_entry.side == Side.LONG else -1.0)
+        qty.append(open_entry.qty)
+        entry_raw.append(open_entry.raw_price)
+        exit_raw.append(f.raw_price)
+        entry_bar.append(open_entry.bar_i)
+        exit_bar.append(f.bar_i)
+        open_entry = None
+    if open_entry is not None:
+        sign.append(1.0 if open_entry.side == Side.LONG else -1.0)
+        qty.append(open_entry.qty)
+        entry_raw.append(open_entry.raw_price)
+        exit_raw.append(np.nan)
+        entry_bar.append(open_entry.bar_i)
+        exit_bar.append(n_bars)
+    closed = np.ones(len(sign), dtype=bool)
+    if open_entry is not None:
+        closed[-1] = False
+    return FillArrays(
+        sign=np.asarray(sign, dtype=float),
+        qty=np.asarray(qty, dtype=float),
+        entry_raw=np.asarray(entry_raw, dtype=float),
+        exit_raw=np.asarray(exit_raw, dtype=float),
+        entry_bar=np.asarray(entry_bar, dtype=np.int64),
+        exit_bar=np.asarray(exit_bar, dtype=np.int64),
+        closed=closed,
+    )
+
+
+def _price_and_pnl(fa: FillArrays, fee: np.ndarray, bps: np.ndarray):
+    """
+    fee, bps: shape (K, 1)。回傳 (entry_px, entry_fee, trade_pnl)，皆為 (K, n_trades)。
+    運算順序與 ExecutionModel / Portfolio 一致，單一組合時結果逐位元相同。
+    """
+    # 保守滑價：進場 long=買（+）、short=賣（-）；出場相反
+    entry_px = fa.entry_raw * (1.0 + fa.sign * bps)
+    exit_px = fa.exit_raw * (1.0 - fa.sign * bps)
+    entry_fee = np.abs(entry_px * fa.qty) * fee
+    exit_fee = np.abs(exit_px * fa.qty) * fee
+    pnl = (fa.sign * (exit_px - entry_px)) * fa.qty - exit_fee
+    return entry_px, entry_fee, pnl
+
+
+def equity_matrix(
+    fa: FillArrays,
+    close: np.ndarray,
+    initial_cash: float,
+    entry_px: np.ndarray,
+    entry_fee: np.ndarray,
+    pnl: np.ndarray,
+) -> np.ndarray:
+    """由 round-trip 重建每根 bar 收盤的 equity，shape (K, n_bars)。"""
+    k = entry_px.shape[0]
+    n_bars = len(close)
+    n = fa.n
+
+    # 現金事件：同一根 bar 先出場（+pnl）再進場（-fee），與 engine 的處理順序相同
+    ev_bar = np.concatenate([fa.entry_bar, fa.exit_bar[fa.closed]])
+    ev_order = np.concatenate([np.ones(n, dtype=np.int64), np.zeros(int(fa.closed.sum()), dtype=np.int64)])
+    ev_delta = np.concatenate([-entry_fee, pnl[:, fa.closed]], axis=1)
+    order = np.lexsort((ev_order, ev_bar))
+    ev_bar = ev_bar[order]
+    ev_delta = ev_delta[:, order]
+
+    cash_after = np.empty((k, len(ev_bar) + 1))
+    cash_after[:, 0] = initial_cash
+    # 逐筆累加（而非 cumsum 的 pairwise），讓浮點誤差與 engine 逐步加減一致
+    for j in range(len(ev_bar)):
+        cash_after[:, j + 1] = cash_after[:, j] + ev_delta[:, j]
+    last_ev = np.searchsorted(ev_bar, np.arange(n_bars), side="right")
+    equity = cash_after[:, last_ev]
+
+    # 持倉期間（entry_bar <= t < exit_bar）加上未實現損益
+    trade_at = np.full(n_bars, -1, dtype=np.int64)
+    for j in range(n):
+        trade_at[fa.entry_bar[j]:fa.exit_bar[j]] = j
+    held = trade_at >= 0
+    tid = trade_at[held]
+    unreal = (fa.sign[tid] * (close[held] - entry_px[:, tid])) * fa.qty[tid]
+    equity[:, held] = equity[:, held] + unreal
+    return equity
+
+
+def _recorded_price_and_pnl(fills: List[Fill], fa: FillArrays):
+    """直接用 fills 記錄的成交價與手續費（非固定費率的成本模型），形狀同 _price_and_pnl（K=1）。"""
+    entries = [f for f in fills if f.action == ActionType.ENTRY]
+    exits = [f for f in fills if f.action == ActionType.EXIT]
+    entry_px = np.asarray([f.price for f in entries], dtype=float)
+    entry_fee = np.asarray([f.fee for f in entries], dtype=float)
+    exit_px = np.full(fa.n, np.nan)
+    exit_fee = np.zeros(fa.n)
+    exit_px[: len(exits)] = [f.price for f in exits]
+    exit_fee[: len(exits)] = [f.fee for f in exits]
+    pnl = (fa.sign * (exit_px - entry_px)) * fa.qty - exit_fee
+    return entry_px[None, :], entry_fee[None, :], pnl[None, :]
+
+
+def equity_from_fills(
+    fills: List[Fill], close: np.ndarray, config: BacktestConfig, costs: Optional["CostModel"] = None
+) -> np.ndarray:
+    """
+    由 fills 重建單一 equity curve（與 engine 逐位元相同）。成本為 config 的固定費率 / 滑價時由 raw price 重算，
+    其他成本模型（costs.py）直接使用 fills 記錄的成交價與手續費。
+    """
+    fa = fill_arrays(fills, len(close))
+    if costs is None or costs.is_flat(config):
+        fee = np.array([[config.fee_rate]])
+        bps = np.array([[config.slippage_bps / 10_000.0]])
+        entry_px, entry_fee, pnl = _price_and_pnl(fa, fee, bps)
+    else:
+        entry_px, entry_fee, pnl = _recorded_price_and_pnl(fills, fa)
+    return equity_matrix(fa, close, config.initial_cash, entry_px, entry_fee, pnl)[0]
+
+
+def _max_drawdown(equity: np.ndarray) -> np.ndarray:
+    if equity.shape[1] == 0:
+        return np.zeros(equity.shape[0])
+    peak = np.maximum.accumulate(equity, axis=1)
+    return ((equity - peak) / peak).min(axis=1)
+
+
+def _metrics_frame(pnl: np.ndarray, bars_held: np.ndarray, equity: np.ndarray) -> pd.DataFrame:
+    """與 analytics.basic_metrics 相同定義的向量化版本，一列一個成本組合。"""
+    k, n = pnl.shape
+    win = pnl > 0
+    n_win = win.sum(axis=1)
+    n_loss = n - n_win
+    wins = np.where(win, pnl, 0.0).sum(axis=1)
+    losses = -np.where(pnl < 0, pnl, 0.0).sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pf = np.where(losses > 0, wins / losses, np.inf)
+        std = pnl.std(axis=1, ddof=1) if n > 1 else np.zeros(k)
+        mean = pnl.mean(axis=1) if n else np.zeros(k)
+        sharpe = np.where(std > 0, mean / std * np.sqrt(252), 0.0)
+        avg_win_held = np.where(n_win > 0, (bars_held * win).sum(axis=1) / n_win, 0.0)
+        avg_loss_held = np.where(n_loss > 0, (bars_held * ~win).sum(axis=1) / n_loss, 0.0)
+    out = pd.DataFrame(
+        {
+            "trades": float(n),
+            "win_rate": win.mean(axis=1) if n else 0.0,
+            "avg_pnl": mean,
+            "profit_factor": pf if n else 0.0,
+            "max_drawdown": _max_drawdown(equity),
+            "sharpe_ratio": sharpe if n else 0.0,
+            "avg_win_held_bars": avg_win_held,
+            "avg_loss_held_bars": avg_loss_held,
+        },
+        index=range(k),
+    )
+    out["final_equity"] = equity[:, -1] if equity.shape[1] else np.nan
+    return out
+
+
+@dataclass
+class RepricedResults:
+    """
+    一組 (fee_rate, slippage_bps) 成本情境的重新定價結果。
+
+    metrics：一列一個情境（欄位同 basic_metrics，另加 fee_rate / slippage_bps / final_equity）。
+    pnl：shape (K, n_closed_trades)；equity：shape (K, n_bars)（keep_equity=False 時為 None）。
+    """
+
+    metrics: pd.DataFrame
+    pnl: np.ndarray
+    equity: Optional[np.ndarray]
+    index: pd.Index
+    base: BacktestResult
+    fills: Optional[FillArrays] = None
+    rerun_results: Optional[List[BacktestResult]] = None
+
+    @property
+    def rerun(self) -> bool:
+        return self.rerun_results is not None
+
+    def equity_curve(self, k: int) -> pd.Series:
+        if self.equity is None:
+            raise ValueError("equity was not kept (keep_equity=False)")
+        return pd.Series(self.equity[k], index=self.index, name="equity")
+
+    def result(self, k: int) -> BacktestResult:
+        """第 k 個情境的 BacktestResult（trade 價格/pnl 已換成該情境）。"""
+        if self.rerun_results is not None:
+            return self.rerun_results[k]
+        fa = self.fills
+        bps = float(self.metrics["slippage_bps"].iat[k]) / 10_000.0
+        entry_px = fa.entry_raw * (1.0 + fa.sign * bps)
+        exit_px = fa.exit_raw * (1.0 - fa.sign * bps)
+        trades = [
+            dataclasses.replace(t, entry_price=float(ep), exit_price=float(xp), pnl=float(pnl))
+            for t, ep, xp, pnl in zip(self.base.trades, entry_px[fa.closed], exit_px[fa.closed], self.pnl[k])
+        ]
+        return BacktestResult(trades=trades, equity_curve=self.equity_curve(k))
+
+
+def reprice_costs(
+    result: BacktestResult,
+    df: pd.DataFrame,
+    config: BacktestConfig,
+    fee_rates: Sequence[float],
+    slippage_bps: Sequence[float] = (0.0,),
+    *,
+    strategy: Strategy,
+    engine: Optional["BacktestEngine"] = None,
+    keep_equity: bool = True,
+    chunk_size: int = 64,
+) -> RepricedResults:
+    """
+    不重跑 engine，直接用 result 的原始（未含成本）成交重新計算多組手續費/滑價下的
+    PnL、equity curve 與 metrics（向量化，一次算完整個 fee × slippage 網格）。
+
+    strategy 必填（產生 result 的策略）：其 sizing 依賴當下 equity（SizingEquityBase.CURRENT/PEAK）時
+    成本會改變下單量，無法只改價格，此時自動退回逐組完整重跑。
+    config 設有提前中止規則時（中止時點隨成本改變）同樣需要重跑。
+    position_mode="book" 的結果不支援（ValueError）。
+    engine：產生 result 的 engine（精度 / intrabar resolver / 成本模型；None = BacktestEngine(config)），
+    重跑時沿用其設定、只換 fee_rate / slippage_bps。成本模型不是固定費率 + 固定滑價時無法套用此網格（ValueError）。
+    """
+    from .engine import BacktestEngine
+
+    if strategy is None:
+        raise ValueError("strategy is required to check whether sizing depends on equity")
+    check_single_position(strategy)
+    if engine is None:
+        engine = BacktestEngine(config)
+    if engine.cost_model is not None and not engine.cost_model.is_flat(config):
+        raise ValueError("reprice_costs varies a flat fee_rate / slippage_bps; the engine uses a custom cost_model")
+    combos = list(product([float(f) for f in fee_rates], [float(b) for b in slippage_bps]))
+    if abort_enabled(config) or sizing_depends_on_equity(strategy):
+        if "intrabar_ambiguous_bars" in result.stats and engine.intrabar_resolver is None:
+            raise ValueError("result was produced with an intrabar resolver; pass the same engine to rerun it")
+        return _rerun_costs(df, config, strategy, combos, keep_equity, engine)
+
+    n_bars = len(result.equity_curve)
+    # 與 engine 相同精度的收盤價（float32 模式的 equity 以 float32 K 線計算）
+    close = (compact_frame(df) if engine.precision == "float32" else df)["close"].to_numpy(dtype=float)
+    if len(close) != n_bars:
+        raise ValueError("df does not match result.equity_curve length")
+    if result.trades and not result.fills:
+        raise ValueError("result has no raw fills; cannot reprice")
+
+    fa = fill_arrays(result.fills, n_bars)
+    bars_held = (fa.exit_bar - fa.entry_bar)[fa.closed]
+
+    metrics_parts, pnl_parts, equity_parts = [], [], []
+    for start in range(0, len(combos), chunk_size):
+        chunk = np.asarray(combos[start:start + chunk_size], dtype=float)
+        fee = chunk[:, :1]
+        bps = chunk[:, 1:] / 10_000.0
+        entry_px, entry_fee, pnl = _price_and_pnl(fa, fee, bps)
+        eq = equity_matrix(fa, close, config.initial_cash, entry_px, entry_fee, pnl)
+        closed_pnl = pnl[:, fa.closed]
+        metrics_parts.append(_metrics_frame(closed_pnl, bars_held, eq))
+        pnl_parts.append(closed_pnl)
+        if keep_equity:
+            equity_parts.append(eq)
+
+    metrics = pd.concat(metrics_parts, ignore_index=True)
+    metrics.insert(0, "slippage_bps", [b for _, b in combos])
+    metrics.insert(0, "fee_rate", [f for f, _ in combos])
+    return RepricedResults(
+        metrics=metrics,
+        pnl=np.concatenate(pnl_parts, axis=0),
+        equity=np.concatenate(equity_parts, axis=0) if keep_equity else None,
+        index=result.equity_curve.index,
+        base=result,
+        fills=fa,
+    )
+
+
+def _rerun_costs(
+    df: pd.DataFrame,
+    config: BacktestConfig,
+    strategy: Strategy,
+    combos: list[tuple[float, float]],
+    keep_equity: bool,
+    engine: "BacktestEngine",
+) -> RepricedResults:
+    rows, pnls, equities, results = [], [], [], []
+    for fee_rate, bps in combos:
+        cfg = dataclasses.replace(config, fee_rate=fee_rate, slippage_bps=bps)
+        # 只換成本：精度 / intrabar resolver 沿用；固定成本模型改由新 config 決定，事件不重複寫出
+        res = dataclasses.replace(engine, config=cfg, cost_model=None, event_sink=None).run(df, strategy)
+        results.append(res)
+        m = basic_metrics(res)
+        m["final_equity"] = float(res.equity_curve.iloc[-1]) if len(res.equity_curve) else np.nan
+        rows.append({"fee_rate": fee_rate, "slippage_bps": bps, **m})
+        pnls.append([t.pnl for t in res.trades])
+        equities.append(res.equity_curve.to_numpy(dtype=float))
+
+    # 各組交易數可能不同，pnl 以 nan 補齊
+    width = max((len(p) for p in pnls), default=0)
+    pnl = np.full((len(combos), width), np.nan)
+    for j, p in enumerate(pnls):
+        pnl[j, :len(p)] = p
+    return RepricedResults(
+        metrics=pd.DataFrame(rows),
+        pnl=pnl,
+        equity=np.vstack(equities) if keep_equity and equities else None,
+        index=df.index,
+        base=results[0] if results else BacktestResult(trades=[], equity_curve=pd.Series(dtype=float)),
+        rerun_results=results,
+    )
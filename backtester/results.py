@@ -0,0 +1,222 @@
+from __future__ import annotations
+
+import json
+import shutil
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from .cache import _stable_json
+from .models import BacktestResult
+from .tradelog import fills_from_frame, fills_to_frame, trades_from_frame, trades_to_frame
+
+
+# 固定欄位；指標欄位（REAL）第一次出現時自動新增
+_BASE_COLUMNS = {
+    "run_id": "INTEGER PRIMARY KEY AUTOINCREMENT",
+    "strategy": "TEXT NOT NULL",
+    "params": "TEXT NOT NULL",      # canonical JSON（排序後的 key）
+    "window": "TEXT",
+    "symbol": "TEXT",
+    "artifact": "TEXT",             # trades / fills / equity 的目錄（相對於 store），沒存則為 NULL
+    "created": "REAL NOT NULL",
+}
+_OPS = {">": ">", ">=": ">=", "<": "<", "<=": "<=", "==": "=", "=": "=", "!=": "!="}
+
+
+def params_json(params: Mapping[str, Any]) -> str:
+    return _stable_json(dict(params))
+
+
+class ResultsStore:
+    """
+    本機回測結果庫：每筆 run 只存 metrics、params 與（選用）磁碟上完整結果的位置。
+    資料在 root/results.sqlite（以 strategy / window / symbol / params 建索引），
+    完整結果在 root/artifacts/<run_id>/（Parquet，只有 load_result 或 query(with_results=True) 才讀）。
+    """
+
+    def __init__(self, root) -> None:
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(self.root / "results.sqlite")
+        cols = ", ".join(f'"{k}" {v}' for k, v in _BASE_COLUMNS.items())
+        with self.conn:
+            self.conn.execute(f"CREATE TABLE IF NOT EXISTS runs ({cols})")
+            self.conn.execute('CREATE INDEX IF NOT EXISTS runs_key ON runs (strategy, "window", symbol)')
+            self.conn.execute("CREATE INDEX IF NOT EXISTS runs_params ON runs (strategy, params)")
+        self._columns = self._table_columns()
+
+    def _table_columns(self) -> List[str]:
+        return [row[1] for row in self.conn.execute("PRAGMA table_info(runs)")]
+
+    def _ensure_metric_columns(self, names: Iterable[str]) -> None:
+        new = [n for n in names if n not in self._columns]
+        if not new:
+            return
+        with self.conn:
+            for name in new:
+                if not name.replace("_", "").isalnum():
+                    raise ValueError(f"Invalid metric name: {name!r}")
+                self.conn.execute(f'ALTER TABLE runs ADD COLUMN "{name}" REAL')
+        self._columns = self._table_columns()
+
+    # ---- 寫入 ----
+    def add_many(self, rows: Sequence[Dict[str, Any]]) -> List[int]:
+        """
+        rows：{"strategy", "params", "metrics", 選用 "window" / "symbol" / "result"}。
+        有 result 時把 trades / fills / equity 寫到 artifacts。一次 transaction，回傳 run_id。
+        """
+        metric_names: List[str] = []
+        for row in rows:
+            metric_names.extend(k for k in row["metrics"] if k not in metric_names)
+        self._ensure_metric_columns(metric_names)
+
+        ids: List[int] = []
+        written: List[Path] = []  # 本次寫出的 artifact 目錄；transaction rollback 時一併刪除，避免留下孤兒檔案
+        now = time.time()
+        try:
+            with self.conn:
+                for row in rows:
+                    values = {
+                        "strategy": row["strategy"],
+                        "params": params_json(row["params"]),
+                        "window": None if row.get("window") is None else str(row["window"]),
+                        "symbol": row.get("symbol"),
+                        "created": now,
+                        **{k: None if v is None else float(v) for k, v in row["metrics"].items()},
+                    }
+                    names = ", ".join(f'"{k}"' for k in values)
+                    marks = ", ".join("?" for _ in values)
+                    cur = self.conn.execute(f"INSERT INTO runs ({names}) VALUES ({marks})", list(values.values()))
+                    run_id = int(cur.lastrowid)
+                    ids.append(run_id)
+                    if row.get("result") is not None:
+                        written.append(self.root / self._artifact_rel(run_id))
+                        rel = self._save_artifact(run_id, row["result"])
+                        self.conn.execute("UPDATE runs SET artifact = ? WHERE run_id = ?", (rel, run_id))
+        except BaseException:
+            for d in written:
+                shutil.rmtree(d, ignore_errors=True)
+            raise
+        return ids
+
+    def add(self, strategy: str, params: Mapping[str, Any], metrics: Mapping[str, Any], **kwargs) -> int:
+        return self.add_many([{"strategy": strategy, "params": params, "metrics": metrics, **kwargs}])[0]
+
+    @staticmethod
+    def _artifact_rel(run_id: int) -> str:
+        return f"artifacts/{run_id}"
+
+    def _save_artifact(self, run_id: int, result: BacktestResult) -> str:
+        rel = self._artifact_rel(run_id)
+        d = self.root / rel
+        d.mkdir(parents=True, exist_ok=True)
+        trades_to_frame(result.trades).to_parquet(d / "trades.parquet", index=False)
+        fills_to_frame(result.fills).to_parquet(d / "fills.parquet", index=False)
+        result.equity_curve.to_frame("equity").to_parquet(d / "equity.parquet")
+        meta = {"aborted": result.aborted, "abort_reason": result.abort_reason, "abort_bar_i": result.abort_bar_i, "stats": result.stats}
+        (d / "meta.json").write_text(json.dumps(meta, default=str), encoding="utf-8")
+        return rel
+
+    # ---- 查詢 ----
+    def query(
+        self,
+        strategy: Optional[str] = None,
+        window=None,
+        symbol: Optional[str] = None,
+        params: Optional[Mapping[str, Any]] = None,
+        filters: Optional[Mapping[str, Tuple[str, Any]]] = None,
+        order_by: Optional[str] = None,
+        ascending: bool = False,
+        limit: Optional[int] = None,
+        with_results: bool = False,
+    ) -> pd.DataFrame:
+        """
+        依條件排序回傳 DataFrame（params 展開成 param_<name> 欄）。
+        filters：{"n_trades": (">", 100)}；例：
+        store.query(window=3, filters={"n_trades": (">", 100)}, order_by="perf_per_day", limit=20)
+        with_results=True 時另加 result 欄（由 artifacts 載入的 BacktestResult，未存者為 None）。
+        """
+        where: List[str] = []
+        args: List[Any] = []
+        for col, value in (("strategy", strategy), ("window", window), ("symbol", symbol)):
+            if value is not None:
+                where.append(f'"{col}" = ?')
+                args.append(str(value) if col == "window" else value)
+        if params is not None:
+            where.append('"params" = ?')
+            args.append(params_json(params))
+        for col, (op, value) in (filters or {}).items():
+            self._check_column(col)
+            if op not in _OPS:
+                raise ValueError(f"Unsupported filter operator: {op}")
+            where.append(f'"{col}" {_OPS[op]} ?')
+            args.append(value)
+
+        sql = "SELECT * FROM runs"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        if order_by is not None:
+            self._check_column(order_by)
+            sql += f' ORDER BY "{order_by}" {"ASC" if ascending else "DESC"}, run_id'
+        else:
+            sql += " ORDER BY run_id"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+
+        frame = pd.read_sql_query(sql, self.conn, params=args)
+        decoded = [json.loads(p) for p in frame["params"]]
+        param_cols = pd.DataFrame(decoded, index=frame.index).add_prefix("param_")
+        frame = pd.concat([frame, param_cols], axis=1)
+        frame["params"] = decoded
+        if with_results:
+            frame["result"] = [self._load_artifact(a) if a is not None else None for a in frame["artifact"]]
+        return frame
+
+    def _check_column(self, col: str) -> None:
+        if col not in self._columns:
+            self._columns = self._table_columns()
+            if col not in self._columns:
+                raise KeyError(f"Unknown column: {col}")
+
+    def load_result(self, run_id: int) -> BacktestResult:
+        row = self.conn.execute("SELECT artifact FROM runs WHERE run_id = ?", (int(run_id),)).fetchone()
+        if row is None:
+            raise KeyError(f"Unknown run_id: {run_id}")
+        if row[0] is None:
+            raise KeyError(f"run {run_id} was stored without artifacts")
+        return self._load_artifact(row[0])
+
+    def _load_artifact(self, rel: str) -> BacktestResult:
+        d = self.root / rel
+        meta = json.loads((d / "meta.json").read_text(encoding="utf-8"))
+        return BacktestResult(
+            trades=trades_from_frame(pd.read_parquet(d / "trades.parquet")),
+            equity_curve=pd.read_parquet(d / "equity.parquet")["equity"],
+            fills=fills_from_frame(pd.read_parquet(d / "fills.parquet")),
+            aborted=meta["aborted"],
+            abort_reason=meta["abort_reason"],
+            abort_bar_i=meta["abort_bar_i"],
+            stats=meta["stats"],
+        )
+
+    def __len__(self) -> int:
+        return int(self.conn.execute("SELECT COUNT(*) FROM runs").fetchone()[0])
+
+    def delete(self, run_ids: Sequence[int]) -> None:
+        artifacts: List[str] = []
+        with self.conn:
+            for run_id in run_ids:
+                row = self.conn.execute("SELECT artifact FROM runs WHERE run_id = ?", (int(run_id),)).fetchone()
+                if row is not None and row[0] is not None:
+                    artifacts.append(row[0])
+                self.conn.execute("DELETE FROM runs WHERE run_id = ?", (int(run_id),))
+        # commit 之後才刪檔，rollback 時 artifacts 仍完整
+        for rel in artifacts:
+            shutil.rmtree(self.root / rel, ignore_errors=True)
+
+    def close(self) -> None:
+        self.conn.close()
@@ -0,0 +1,436 @@
+from __future__ import annotations
+
+from abc import abstractmethod
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .models import ActionType, ExitType, OrderIntent, Side
+from .strategy_base import Strategy, StrategyContext
+
+
+# ---- 運算式 ----
+class Expr:
+    """
+    規則運算式節點。以運算子組合（close > ind.hh.shift(1)、ind.bar_series == n ...），
+    求值時一次算整個陣列；結構相同的子運算式只算一次（見 ExprEvaluator）。
+    注意：== / != 也回傳 Expr，節點不可當 dict key，請用 key()。
+    """
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def key(self) -> tuple:
+        raise NotImplementedError
+
+    def _eval(self, ev: "ExprEvaluator") -> np.ndarray:
+        raise NotImplementedError
+
+    # 算術
+    def __add__(self, other): return _Op("add", self, other)
+    def __radd__(self, other): return _Op("add", other, self)
+    def __sub__(self, other): return _Op("sub", self, other)
+    def __rsub__(self, other): return _Op("sub", other, self)
+    def __mul__(self, other): return _Op("mul", self, other)
+    def __rmul__(self, other): return _Op("mul", other, self)
+    def __truediv__(self, other): return _Op("div", self, other)
+    def __rtruediv__(self, other): return _Op("div", other, self)
+    def __neg__(self): return _Op("neg", self)
+    def __abs__(self): return _Op("abs", self)
+
+    # 比較（NaN 一律為 False，與逐根 bar 的純量比較相同）
+    def __gt__(self, other): return _Op("gt", self, other)
+    def __ge__(self, other): return _Op("ge", self, other)
+    def __lt__(self, other): return _Op("lt", self, other)
+    def __le__(self, other): return _Op("le", self, other)
+    def __eq__(self, other): return _Op("eq", self, other)  # type: ignore[override]
+    def __ne__(self, other): return _Op("ne", self, other)  # type: ignore[override]
+
+    # 邏輯
+    def __and__(self, other): return _Op("and", self, other)
+    def __rand__(self, other): return _Op("and", other, self)
+    def __or__(self, other): return _Op("or", self, other)
+    def __ror__(self, other): return _Op("or", other, self)
+    def __invert__(self): return _Op("not", self)
+
+    def shift(self, n: int = 1) -> "Expr":
+        """前 n 根的值（開頭補 NaN；布林補 False）。"""
+        return _Op("shift", self, _Const(int(n)))
+
+    def abs(self) -> "Expr":
+        return _Op("abs", self)
+
+    def isna(self) -> "Expr":
+        return _Op("isna", self)
+
+    def notna(self) -> "Expr":
+        return _Op("notna", self)
+
+    def __bool__(self):
+        raise TypeError("rule expressions have no truth value; combine them with & / | / ~ instead of and / or / not")
+
+    def __repr__(self) -> str:
+        return f"Expr{self.key()!r}"
+
+
+class _Col(Expr):
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    def key(self) -> tuple:
+        return ("col", self.name)
+
+    def _eval(self, ev: "ExprEvaluator") -> np.ndarray:
+        return ev.df[self.name].to_numpy()
+
+
+class _Ind(Expr):
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    def key(self) -> tuple:
+        return ("ind", self.name)
+
+    def _eval(self, ev: "ExprEvaluator") -> np.ndarray:
+        value = ev.indicators[self.name]
+        return value.to_numpy() if isinstance(value, pd.Series) else np.asarray(value)
+
+
+class _Const(Expr):
+    def __init__(self, value: Any) -> None:
+        self.value = value
+
+    def key(self) -> tuple:
+        return ("const", type(self.value).__name__, repr(self.value))
+
+    def _eval(self, ev: "ExprEvaluator") -> Any:
+        return self.value
+
+
+def _wrap(x: Any) -> Expr:
+    if isinstance(x, Expr):
+        return x
+    if isinstance(x, (bool, int, float, np.number, np.bool_)):
+        return _Const(x)
+    raise TypeError(f"Unsupported operand in rule expression: {x!r}")
+
+
+def _as_bool(a) -> np.ndarray:
+    a = np.asarray(a)
+    if a.dtype == bool:
+        return a
+    if a.dtype.kind == "f":
+        return (a != 0) & ~np.isnan(a)
+    return a.astype(bool)
+
+
+def _shift(a: np.ndarray, n: int) -> np.ndarray:
+    a = np.asarray(a)
+    if a.dtype == bool:
+        out = np.zeros(len(a), dtype=bool)
+    else:
+        a = a.astype(float, copy=False)
+        out = np.full(len(a), np.nan)
+    if n >= 0:
+        if n < len(a):
+            out[n:] = a[: len(a) - n]
+    elif -n < len(a):
+        out[:n] = a[-n:]
+    return out
+
+
+_BINARY = {
+    "add": np.add,
+    "sub": np.subtract,
+    "mul": np.multiply,
+    "div": np.divide,
+    "gt": np.greater,
+    "ge": np.greater_equal,
+    "lt": np.less,
+    "le": np.less_equal,
+    "eq": np.equal,
+    "ne": np.not_equal,
+}
+
+
+class _Op(Expr):
+    def __init__(self, op: str, *args: Any) -> None:
+        self.op = op
+        self.args = tuple(_wrap(a) for a in args)
+
+    def key(self) -> tuple:
+        return (self.op,) + tuple(a.key() for a in self.args)
+
+    def _eval(self, ev: "ExprEvaluator") -> Any:
+        op = self.op
+        if op == "shift":
+            return _shift(ev.eval(self.args[0]), self.args[1].value)
+        vals = [ev.eval(a) for a in self.args]
+        with np.errstate(all="ignore"):
+            if op in _BINARY:
+                return _BINARY[op](vals[0], vals[1])
+            if op == "neg":
+                return np.negative(vals[0])
+            if op == "abs":
+                return np.abs(vals[0])
+        if op == "and":
+            return _as_bool(vals[0]) & _as_bool(vals[1])
+        if op == "or":
+            return _as_bool(vals[0]) | _as_bool(vals[1])
+        if op == "not":
+            return ~_as_bool(vals[0])
+        if op == "isna":
+            return pd.isna(vals[0])
+        if op == "notna":
+            return ~pd.isna(vals[0])
+        raise ValueError(f"Unknown rule operator: {op}")
+
+
+class _Namespace:
+    def __init__(self, factory) -> None:
+        self._factory = factory
+
+    def __getattr__(self, name: str) -> Expr:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self._factory(name)
+
+    def __getitem__(self, name: str) -> Expr:
+        return self._factory(name)
+
+
+# bar.open / bar.close ...：df 欄位；ind.hh / ind["rocp_3"]：required_indicators 的指標名稱
+bar = _Namespace(_Col)
+ind = _Namespace(_Ind)
+
+
+def const(value: Any) -> Expr:
+    return _Const(value)
+
+
+# ---- 求值（共同子運算式只算一次）----
+class ExprEvaluator:
+    """
+    對同一份 df 求值。子運算式以「解析後的 key」記憶：指標節點換成它的 spec tuple
+    （例 ("rolling_high", 10, "high")），因此不同參數組合的策略共用同一個 cache 時，
+    只有受參數影響的子運算式會重算，其餘直接命中（run_sweep 即如此共用）。
+    """
+
+    def __init__(
+        self,
+        df: pd.DataFrame,
+        indicators: Dict[str, Any],
+        specs: Optional[Dict[str, Any]] = None,
+        cache: Optional[Dict[tuple, Any]] = None,
+    ) -> None:
+        self.df = df
+        self.indicators = indicators
+        self.specs = specs or {}
+        self.cache = cache if cache is not None else {}
+        self.hits = 0
+        self.misses = 0
+
+    def resolved_key(self, expr: Expr) -> tuple:
+        if isinstance(expr, _Ind):
+            spec = self.specs.get(expr.name)
+            return ("ind", spec) if spec is not None else expr.key()
+        if isinstance(expr, _Op):
+            return (expr.op,) + tuple(self.resolved_key(a) for a in expr.args)
+        return expr.key()
+
+    def eval(self, expr: Expr) -> Any:
+        key = ("__expr__", self.resolved_key(expr))
+        if key in self.cache:
+            self.hits += 1
+            return self.cache[key]
+        self.misses += 1
+        out = expr._eval(self)
+        self.cache[key] = out
+        return out
+
+    def evaluate(self, expr: Expr) -> np.ndarray:
+        """整條 df 長度的陣列（純常數運算式會被展開）。"""
+        out = np.asarray(self.eval(_wrap(expr)))
+        return np.broadcast_to(out, (len(self.df),)) if out.ndim == 0 else out
+
+    def mask(self, expr: Expr) -> np.ndarray:
+        """
+        bool 陣列。a & b & ... 由左到右逐項求值，累積結果已全為 False 時其餘項不再求值
+        （其中的指標也就不會被計算）。
+        """
+        expr = _wrap(expr)
+        if not (isinstance(expr, _Op) and expr.op == "and"):
+            return _as_bool(self.evaluate(expr))
+        key = ("__expr__", self.resolved_key(expr))
+        if key in self.cache:
+            self.hits += 1
+            return _as_bool(self.cache[key])
+        self.misses += 1
+        out = None
+        for term in _conjuncts(expr):
+            m = self.mask(term)
+            out = m if out is None else out & m
+            if not out.any():
+                break
+        self.cache[key] = out
+        return out
+
+
+def _conjuncts(expr: Expr) -> List[Expr]:
+    if isinstance(expr, _Op) and expr.op == "and":
+        return [t for a in expr.args for t in _conjuncts(a)]
+    return [expr]
+
+
+# ---- 規則 ----
+@dataclass(frozen=True, eq=False)
+class EntryRule:
+    """when 成立的 bar 收盤進場；sl / tp / be 為出場價運算式（任一為 NaN 的 bar 不進場）。"""
+
+    side: Side
+    when: Expr
+    sl: Optional[Expr] = None
+    tp: Optional[Expr] = None
+    be: Optional[Expr] = None
+    priority: int = 10
+
+
+@dataclass(frozen=True, eq=False)
+class ExitRule:
+    """持倉中 when 成立的 bar 以收盤價出場（engine 以 TIME exit 處理）。side=None 表示多空皆適用。"""
+
+    when: Expr
+    side: Optional[Side] = None
+    priority: int = 5
+
+
+@dataclass(frozen=True, eq=False)
+class RuleSet:
+    entries: Tuple[EntryRule, ...] = ()
+    exits: Tuple[ExitRule, ...] = ()
+
+
+@dataclass
+class CompiledRules:
+    """
+    每條規則的 bool mask 與出場價陣列（長度 = df 的 bar 數），第一次取用該條規則時才求值：
+    從未被查詢的規則（例：整段都沒有持倉時的 exit 規則）不會求值；mask 全為 False 的 entry 規則不算出場價。
+    """
+
+    rules: RuleSet
+    evaluator: "ExprEvaluator"
+    _entries: Dict[int, Tuple[np.ndarray, Dict[str, np.ndarray]]] = field(default_factory=dict, repr=False)
+    _exits: Dict[int, np.ndarray] = field(default_factory=dict, repr=False)
+
+    def entry(self, j: int) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        """第 j 條 entry 規則的 (mask, {"sl" / "tp" / "be": 出場價})。"""
+        got = self._entries.get(j)
+        if got is None:
+            rule = self.rules.entries[j]
+            ev = self.evaluator
+            mask = ev.mask(rule.when)
+            levels: Dict[str, np.ndarray] = {}
+            if mask.any():
+                for name in ("sl", "tp", "be"):
+                    expr = getattr(rule, name)
+                    if expr is not None:
+                        levels[name] = ev.evaluate(expr).astype(float, copy=False)
+                        mask = mask & ~np.isnan(levels[name])
+            got = self._entries[j] = (mask, levels)
+        return got
+
+    def exit_mask(self, j: int) -> np.ndarray:
+        got = self._exits.get(j)
+        if got is None:
+            got = self._exits[j] = self.evaluator.mask(self.rules.exits[j].when)
+        return got
+
+    @property
+    def entries(self) -> List[Tuple[EntryRule, np.ndarray, Dict[str, np.ndarray]]]:
+        return [(rule,) + self.entry(j) for j, rule in enumerate(self.rules.entries)]
+
+    @property
+    def exits(self) -> List[Tuple[ExitRule, np.ndarray]]:
+        return [(rule, self.exit_mask(j)) for j, rule in enumerate(self.rules.exits)]
+
+    def entry_bars(self) -> np.ndarray:
+        """任一 entry 規則成立的 bar。"""
+        if not self.rules.entries:
+            return np.empty(0, dtype=np.int64)
+        return np.flatnonzero(np.logical_or.reduce([m for _, m, _ in self.entries]))
+
+
+# ctx.indicators 裡放編譯結果的保留 key
+RULES_KEY = "__rules__"
+
+
+def compile_rules(
+    rules: RuleSet,
+    df: pd.DataFrame,
+    indicators: Dict[str, Any],
+    specs: Optional[Dict[str, Any]] = None,
+    cache: Optional[Dict[tuple, Any]] = None,
+) -> CompiledRules:
+    """只建立求值器；各規則在 CompiledRules 第一次取用時才求值。"""
+    return CompiledRules(rules, ExprEvaluator(df, indicators, specs, cache))
+
+
+class RuleStrategy(Strategy):
+    """
+    以 RuleSet 宣告進出場條件的策略：engine 計算完指標後把規則編譯成整段陣列，
+    generate_intents 只查第 i 根的結果。下單量仍由 entry_qty 逐筆決定（可依當下 equity）。
+    """
+
+    @abstractmethod
+    def rules(self) -> RuleSet:
+        raise NotImplementedError
+
+    @abstractmethod
+    def entry_qty(self, ctx: StrategyContext, side: Side, entry_price: float, sl_price: Optional[float]) -> float:
+        raise NotImplementedError
+
+    def compile(self, df: pd.DataFrame, indicators: Dict[str, Any], cache: Optional[Dict[tuple, Any]] = None) -> CompiledRules:
+        return compile_rules(self.rules(), df, indicators, self.required_indicators(), cache)
+
+    def generate_intents(self, ctx: StrategyContext) -> List[OrderIntent]:
+        compiled = ctx.indicators.get(RULES_KEY)
+        if compiled is None:
+            # 直接呼叫（未經 engine）時才在這裡編譯一次
+            compiled = self.compile(ctx.df, ctx.indicators)
+            ctx.indicators[RULES_KEY] = compiled
+        i = ctx.i
+        pos = ctx.position
+        intents: List[OrderIntent] = []
+
+        if pos.side is not None and pos.qty > 0:
+            for j, rule in enumerate(compiled.rules.exits):
+                if compiled.exit_mask(j)[i] and (rule.side is None or rule.side == pos.side):
+                    intents.append(
+                        OrderIntent(
+                            action=ActionType.EXIT, side=pos.side, qty=pos.qty,
+                            exit_type=ExitType.TIME, priority=rule.priority,
+                        )
+                    )
+            return intents
+
+        close_p = None
+        for j, rule in enumerate(compiled.rules.entries):
+            mask, levels = compiled.entry(j)
+            if not mask[i]:
+                continue
+            if close_p is None:
+                close_p = float(ctx.df["close"].iat[i])
+            sl = float(levels["sl"][i]) if "sl" in levels else None
+            intents.append(
+                OrderIntent(
+                    action=ActionType.ENTRY,
+                    side=rule.side,
+                    qty=self.entry_qty(ctx, rule.side, close_p, sl),
+                    tp_price=float(levels["tp"][i]) if "tp" in levels else None,
+                    sl_price=sl,
+                    be_price=float(levels["be"][i]) if "be" in levels else None,
+                    priority=rule.priority,
+                )
+            )
+        return intents
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import datetime as dt
+from typing import Any, Iterable, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+
+TimeLike = Union[str, dt.time]
+
+
+def _minute_of_day(value: TimeLike) -> int:
+    t = pd.Timestamp(value).time() if isinstance(value, str) else value
+    return t.hour * 60 + t.minute
+
+
+def session_mask(
+    index: pd.DatetimeIndex,
+    weekdays: Optional[Iterable[int]] = None,
+    start: Optional[TimeLike] = None,
+    end: Optional[TimeLike] = None,
+    tz: Optional[str] = None,
+) -> np.ndarray:
+    """
+    依星期 / 時段產生可交易遮罩（bool 陣列，與 index 等長）。
+    weekdays：0=週一 ... 6=週日；start / end："HH:MM"（含 start、不含 end，start > end 表示跨午夜）。
+    tz：以該時區判斷星期與時段（例 "America/New_York"，index 無時區時視為 UTC）。
+    例：美股時段 session_mask(df.index, weekdays=range(5), start="09:30", end="16:00", tz="America/New_York")
+    """
+    idx = pd.DatetimeIndex(index)
+    if tz is not None:
+        idx = (idx.tz_localize("UTC") if idx.tz is None else idx).tz_convert(tz)
+    mask = np.ones(len(idx), dtype=bool)
+    if weekdays is not None:
+        mask &= np.isin(idx.dayofweek, list(weekdays))
+    if start is not None or end is not None:
+        minutes = idx.hour * 60 + idx.minute
+        lo = _minute_of_day(start) if start is not None else 0
+        hi = _minute_of_day(end) if end is not None else 24 * 60
+        inside = (minutes >= lo) & (minutes < hi) if lo <= hi else (minutes >= lo) | (minutes < hi)
+        mask &= np.asarray(inside)
+    return mask
+
+
+def tradable_mask(index: pd.DatetimeIndex, tradable: Any) -> np.ndarray:
+    """
+    把 tradable 轉成與 index 等長的 bool 陣列：
+    - bool 陣列 / list：長度需與 index 相同
+    - bool Series：依 index 對齊（缺的 bar 視為不可交易）
+    - 區間 list [(start, end), ...]：整數為位置（同 slice，不含 end），時間 / 字串為 label（同 .loc，含兩端）
+    """
+    n = len(index)
+    if isinstance(tradable, pd.Series):
+        return tradable.reindex(index).fillna(False).to_numpy(dtype=bool)
+    if isinstance(tradable, np.ndarray) and tradable.dtype == np.bool_:
+        values = tradable
+    else:
+        items = list(tradable)
+        if not items or not isinstance(items[0], (tuple, list)):
+            values = np.asarray(items, dtype=bool)
+        else:
+            mask = np.zeros(n, dtype=bool)
+            for start, end in items:
+                if isinstance(start, (int, np.integer)) and isinstance(end, (int, np.integer)):
+                    a, b = int(start), int(end)
+                else:
+                    a = int(index.searchsorted(pd.Timestamp(start), side="left"))
+                    b = int(index.searchsorted(pd.Timestamp(end), side="right"))
+                mask[a:b] = True
+            return mask
+    if len(values) != n:
+        raise ValueError(f"tradable mask length {len(values)} != number of bars {n}")
+    return values
+
+
+def session_ends(mask: np.ndarray) -> np.ndarray:
+    """可交易時段的最後一根（下一根不可交易）；資料最後一根不算（與一般回測相同，持倉留到資料結束）。"""
+    ends = np.zeros(len(mask), dtype=bool)
+    ends[:-1] = mask[:-1] & ~mask[1:]
+    return ends
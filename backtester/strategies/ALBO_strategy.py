@@ -1,11 +1,11 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 from typing import Dict, Any, List, Optional
 
-from ..models import OrderIntent, ActionType, Side, ExitType, Position, SizingEquityBase
-from ..strategy_base import Strategy, StrategyContext
-import pandas as pd
+from ..models import OrderIntent, Side, SizingEquityBase
+from ..rules import EntryRule, RuleSet, RuleStrategy, bar, ind
+from ..strategy_base import StrategyContext
 
 @dataclass(frozen=True)
 class ALBOParams:
@@ -23,7 +23,9 @@ class ALBOParams:
 
 
 
-class ALBOStrategy(Strategy):
+class ALBOStrategy(RuleStrategy):
+    exit_param_names = ("rr", "time_exit_bars")
+
     def __init__(self, params: ALBOParams) -> None:
         self.p = params
 
@@ -41,118 +43,62 @@ class ALBOStrategy(Strategy):
 
         }
 
-    def generate_intents(self, ctx: StrategyContext) -> List[OrderIntent]:
-        i = ctx.i
-        df = ctx.df
-        pos = ctx.position
-        init_equity = ctx.init_equity
-        now_equity = ctx.now_equity
-        if self.p.sizing_equity_base == SizingEquityBase.INITIAL:
-            base_equity = init_equity
-        elif self.p.sizing_equity_base == SizingEquityBase.CURRENT:
-            base_equity = now_equity
-        intents: List[OrderIntent] = []
-
-        open_series = df["open"]
-        close_p = float(df["close"].iat[i])
-
-        # 若有倉，只更新出場線（也可以不更新）
-        if pos.side is not None and pos.qty > 0:
-            return intents
-
-        # 無倉：
-        # 做突破進場（LONG）
-        strong_bar_series = ctx.indicators["strong_bar_series"]
-        bar_series = ctx.indicators["bar_series"]
-        rocp_1 = ctx.indicators["rocp_1"]
-        rocp_n = ctx.indicators[f"rocp_{self.p.break_out_series_n}"]
-        hh = ctx.indicators["hh"]
-        hh_prev = float(hh.iat[i - 1]) if i - 1 >= 0 else float("nan")
-
-
-        if i < self.p.break_out_series_n - 1:
-            # 檢查time_exit條件
-
-            return intents
-        atr_i = float(ctx.indicators["atr"].iat[i])
-        rocp1_i = float(rocp_1.iat[i])
+    def rules(self) -> RuleSet:
+        n = self.p.break_out_series_n
+        close = bar.close
+        atr = ind.atr
+        rocp_1 = ind.rocp_1
+        hh_prev = ind.hh.shift(1)
+        ll_prev = ind.ll.shift(1)
+        # nan檢查（指標尚未就緒的 bar 不進場）
+        ready = atr.notna() & rocp_1.notna() & hh_prev.notna()
+        # 停損第一根K線開盤（前 n-1 根資料不足時為 NaN -> 不進場）
+        sl = bar.open.shift(n - 1)
+        entries = []
 
-        # nan檢查
-        if pd.isna(atr_i) or pd.isna(rocp1_i) or pd.isna(hh_prev):
-            return intents
-        # 最近 N 根body越來越強
-        cond1 = strong_bar_series.iat[i]
-        # 最近 N 根都是 bull bar
-        cond2 = bar_series.iat[i] == self.p.break_out_series_n
-        # 最後一根漲幅>1倍 atr
-        cond3 = rocp_1.iat[i] > float(ctx.indicators["atr"].iat[i])*self.p.BO_n_times_atr/ close_p
-        # 突破前n根最高價
-        cond4 = close_p > hh_prev
-        ma = ctx.indicators["ma"].iat[i]
-        # 收盤價高於均線
-        cond5 = close_p > ma
         # 策略條件做多或雙向
-        cond6 = (self.p.allow_side is None) or (self.p.allow_side == Side.LONG)
-
-
-        # 突破：close > 前一根 rolling high
-        if cond1 and cond2 and cond3 and cond4 and cond5 and cond6:
-            # 停損第一根K線開盤
-            sl_price = open_series.iat[i - self.p.break_out_series_n + 1]
-            # TP = SL距離 * rr
-            tp_price = close_p + (close_p - sl_price) * self.p.rr
-            entry_price = close_p
-            max_notional_lose = base_equity * self.p.max_notional_pct / 100
-            qty = max_notional_lose / (abs(entry_price - sl_price)) if abs(entry_price - sl_price) > 0 else 0.0
-
-            intents.append(
-                OrderIntent(
-                    action=ActionType.ENTRY,
-                    side=Side.LONG,
-                    qty=max(self.p.min_qty, float(qty)),
-                    tp_price=tp_price,
-                    sl_price=sl_price,
-                    be_price=None,
-                    priority=10,
-                )
+        if self.p.allow_side is None or self.p.allow_side == Side.LONG:
+            long_when = (
+                ready
+                & ind.strong_bar_series                              # 最近 N 根body越來越強
+                & (ind.bar_series == n)                              # 最近 N 根都是 bull bar
+                & (rocp_1 > atr * self.p.BO_n_times_atr / close)     # 最後一根漲幅>1倍 atr
+                & (close > hh_prev)                                  # 突破前n根最高價
+                & (close > ind.ma)                                   # 收盤價高於均線
             )
-            
-        # 做突破進場（SHORT）
-        ll = ctx.indicators["ll"]
-        ll_prev = float(ll.iat[i - 1]) if i - 1 >= 0 else float("nan")
-        # 最近 N 根body越來越大
-        cond1_short = strong_bar_series.iat[i]
-        # 最近 N 根都是 bear bar
-        cond2_short = bar_series.iat[i] == -self.p.break_out_series_n
-        # 最後一根跌幅>1倍 atr
-        cond3_short = rocp_1.iat[i] < -float(ctx.indicators["atr"].iat[i])*self.p.BO_n_times_atr/ close_p
-        # 最後一根收盤突破前n根最低價
-        cond4_short = close_p < ll_prev
-        # 收盤價低於均線
-        cond5_short = close_p < ma
-        # 策略條件做空或雙向
-        cond6_short = (self.p.allow_side is None) or (self.p.allow_side == Side.SHORT)
-
-        if cond1_short and cond2_short and cond3_short and cond4_short and cond5_short and cond6_short:
-            # 停損第一根K線開盤
-            sl_price = open_series.iat[i - self.p.break_out_series_n + 1]
             # TP = SL距離 * rr
-            tp_price = close_p - (sl_price - close_p) * self.p.rr
-            entry_price = close_p
-            max_notional_lose = base_equity * self.p.max_notional_pct / 100
-            qty = max_notional_lose / (abs(entry_price - sl_price)) if abs(entry_price - sl_price) > 0 else 0.0
+            entries.append(EntryRule(Side.LONG, long_when, sl=sl, tp=close + (close - sl) * self.p.rr, priority=10))
 
-            intents.append(
-                OrderIntent(
-                    action=ActionType.ENTRY,
-                    side=Side.SHORT,
-                    qty=max(self.p.min_qty, float(qty)),
-                    tp_price=tp_price,
-                    sl_price=sl_price,
-                    be_price=None,
-                    priority=10,
-                )
+        # 策略條件做空或雙向
+        if self.p.allow_side is None or self.p.allow_side == Side.SHORT:
+            short_when = (
+                ready
+                & ind.strong_bar_series                              # 最近 N 根body越來越大
+                & (ind.bar_series == -n)                             # 最近 N 根都是 bear bar
+                & (rocp_1 < -atr * self.p.BO_n_times_atr / close)    # 最後一根跌幅>1倍 atr
+                & (close < ll_prev)                                  # 最後一根收盤突破前n根最低價
+                & (close < ind.ma)                                   # 收盤價低於均線
             )
+            entries.append(EntryRule(Side.SHORT, short_when, sl=sl, tp=close - (sl - close) * self.p.rr, priority=10))
 
+        return RuleSet(entries=tuple(entries))
 
-        return intents
+    def entry_qty(self, ctx: StrategyContext, side: Side, entry_price: float, sl_price: Optional[float]) -> float:
+        if self.p.sizing_equity_base == SizingEquityBase.INITIAL:
+            base_equity = ctx.init_equity
+        elif self.p.sizing_equity_base == SizingEquityBase.CURRENT:
+            base_equity = ctx.now_equity
+        else:
+            raise ValueError(f"Unsupported sizing_equity_base: {self.p.sizing_equity_base}")
+        max_notional_lose = base_equity * self.p.max_notional_pct / 100
+        qty = max_notional_lose / (abs(entry_price - sl_price)) if abs(entry_price - sl_price) > 0 else 0.0
+        return max(self.p.min_qty, float(qty))
+
+    def exit_levels(self, intent: OrderIntent, entry_price: float) -> OrderIntent:
+        # TP = SL距離 * rr（與 generate_intents 相同算式）
+        sl_price = intent.sl_price
+        if intent.side == Side.LONG:
+            tp_price = entry_price + (entry_price - sl_price) * self.p.rr
+        else:
+            tp_price = entry_price - (sl_price - entry_price) * self.p.rr
+        return replace(intent, tp_price=tp_price)
@@ -18,9 +18,17 @@ class StrategyContext:
     init_equity: float
     now_equity: float
     indicators: Dict[str, Any]  # 已算好的指標/特徵（Series可用 .iat[i] 取值）
+    book: Optional[Any] = None  # position_mode="book" 時的 PositionBook（全部未平倉 lot）
 
 
 class Strategy(ABC):
+    # 只影響出場（不影響進場訊號與下單量）的參數名稱；
+    # 宣告後 sweep 可對同一組進場參數重用進場訊號，只重算出場。
+    # 宣告此項的策略必須：有倉時不產生 intents、無倉時的 intents 與持倉歷史無關。
+    exit_param_names: tuple[str, ...] = ()
+    # "single"：一次一個倉位（ADD 不處理）；"book"：多筆 lot（加倉、部分平倉、多空並存），見 book.PositionBook
+    position_mode: str = "single"
+
     @abstractmethod
     def required_indicators(self) -> Dict[str, Any]:
         """回傳要計算的指標定義（MVP: 由 engine 負責放入 context.indicators）。"""
@@ -30,3 +38,15 @@ class Strategy(ABC):
     def generate_intents(self, ctx: StrategyContext) -> List[OrderIntent]:
         """bar close 產生下一步意圖（entry/add/exit）。"""
         raise NotImplementedError
+
+    def exit_levels(self, intent: OrderIntent, entry_price: float) -> OrderIntent:
+        """依目前參數重算 entry intent 的 tp/sl/be（預設不變）。exit_param_names 影響出場線時需覆寫。"""
+        return intent
+
+    def get_state(self) -> Dict[str, Any]:
+        """跨 bar 累積的內部狀態（需可 JSON 序列化），checkpoint 會保存；無狀態策略回傳空 dict。"""
+        return {}
+
+    def set_state(self, state: Dict[str, Any]) -> None:
+        """由 checkpoint 還原 get_state() 的內容。"""
+        return None
@@ -0,0 +1,258 @@
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Iterator, Optional, Union
+
+import pandas as pd
+
+from .models import BacktestResult
+from .strategy_base import Strategy
+from .tradelog import fills_from_frame, fills_to_frame, trades_from_frame, trades_to_frame
+
+if TYPE_CHECKING:
+    from .engine import BacktestEngine
+
+
+def iter_parquet_chunks(
+    path,
+    chunk_rows: Optional[int] = None,
+    time_column: Optional[str] = None,
+) -> Iterator[pd.DataFrame]:
+    """
+    以 memory map 逐段讀 Parquet：chunk_rows=None 時一次一個 row group，否則固定列數。
+    time_column 省略時沿用 pandas 寫入時記錄的 index。
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    pf = pq.ParquetFile(path, memory_map=True)
+    if chunk_rows is None:
+        batches: Iterable = (pf.read_row_group(r) for r in range(pf.num_row_groups))
+    else:
+        batches = (pa.Table.from_batches([b]) for b in pf.iter_batches(batch_size=chunk_rows))
+    for table in batches:
+        # iter_batches 的 batch 不帶 pandas metadata，補回才能還原 index
+        table = table.replace_schema_metadata(pf.schema_arrow.metadata)
+        frame = table.to_pandas()
+        if time_column is not None:
+            frame = frame.set_index(time_column)
+        yield frame
+
+
+def _time_type(tz: Optional[str], unit: str):
+    import pyarrow as pa
+
+    return pa.timestamp(unit, tz=tz)
+
+
+def trades_schema(tz: Optional[str] = None, unit: str = "ns"):
+    """trades.parquet 的固定 schema（欄位同 tradelog.trades_to_frame）。"""
+    import pyarrow as pa
+
+    return pa.schema(
+        [
+            ("side", pa.string()),
+            ("qty", pa.float64()),
+            ("entry_time", _time_type(tz, unit)),
+            ("entry_price", pa.float64()),
+            ("sl_price", pa.float64()),
+            ("tp_price", pa.float64()),
+            ("exit_time", _time_type(tz, unit)),
+            ("exit_price", pa.float64()),
+            ("exit_type", pa.string()),
+            ("pnl", pa.float64()),
+            ("bars_held", pa.int64()),
+        ]
+    )
+
+
+def fills_schema(tz: Optional[str] = None, unit: str = "ns"):
+    """fills.parquet 的固定 schema（欄位同 tradelog.fills_to_frame）。"""
+    import pyarrow as pa
+
+    return pa.schema(
+        [
+            ("time", _time_type(tz, unit)),
+            ("action", pa.string()),
+            ("side", pa.string()),
+            ("qty", pa.float64()),
+            ("price", pa.float64()),
+            ("fee", pa.float64()),
+            ("entry_bar_i", pa.int64()),
+            ("exit_type", pa.string()),
+            ("raw_price", pa.float64()),
+            ("bar_i", pa.int64()),
+        ]
+    )
+
+
+def equity_schema(tz: Optional[str] = None, unit: str = "ns"):
+    """equity.parquet 的固定 schema（index time + equity）。"""
+    import pyarrow as pa
+
+    return pa.schema([("equity", pa.float64()), ("time", _time_type(tz, unit))])
+
+
+class _SpillWriter:
+    """
+    把 DataFrame 分批 append 成單一 Parquet 檔（每批一個 row group；第一批非空時才建檔）。
+    schema 固定由呼叫端給定（例：第一批的 exit_type 全為 None 時也不會被推成 null 型別）。
+    """
+
+    def __init__(self, path: Path, schema, index: bool) -> None:
+        self.path = path
+        self.schema = schema
+        self.index = index
+        self._writer = None
+        self.rows = 0
+
+    def write(self, frame: pd.DataFrame) -> None:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if frame.empty:
+            return
+        table = pa.Table.from_pandas(frame, schema=self.schema, preserve_index=self.index)
+        if self._writer is None:
+            # table.schema = 固定 schema + pandas metadata（讀回時還原 index）
+            self._writer = pq.ParquetWriter(self.path, table.schema)
+        self._writer.write_table(table)
+        self.rows += len(frame)
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+@dataclass
+class StreamingResult:
+    """串流回測的輸出：trades / fills / equity 已寫在 out_dir，需要時再載入。"""
+
+    out_dir: Path
+    n_bars: int
+    n_trades: int
+    final_equity: Optional[float]
+    aborted: bool = False
+    abort_reason: Optional[str] = None
+    abort_bar_i: Optional[int] = None
+    stats: Optional[Dict[str, Any]] = None
+
+    def _read(self, name: str) -> Optional[pd.DataFrame]:
+        path = self.out_dir / name
+        return pd.read_parquet(path) if path.exists() else None
+
+    def equity_curve(self) -> pd.Series:
+        frame = self._read("equity.parquet")
+        if frame is None:
+            return pd.Series(dtype=float, name="equity", index=pd.DatetimeIndex([], name="time"))
+        return frame["equity"]
+
+    def load(self) -> BacktestResult:
+        """整份結果讀回記憶體（資料量大時請改用 equity_curve() 或直接讀 Parquet）。"""
+        trades = self._read("trades.parquet")
+        fills = self._read("fills.parquet")
+        return BacktestResult(
+            trades=trades_from_frame(trades) if trades is not None else [],
+            equity_curve=self.equity_curve(),
+            fills=fills_from_frame(fills) if fills is not None else [],
+            aborted=self.aborted,
+            abort_reason=self.abort_reason,
+            abort_bar_i=self.abort_bar_i,
+            stats=dict(self.stats or {}),
+        )
+
+
+def run_streaming(
+    engine: "BacktestEngine",
+    source: Union[str, Path, Iterable[pd.DataFrame]],
+    strategy: Strategy,
+    out_dir,
+    chunk_rows: Optional[int] = None,
+    warmup_bars: int = 2000,
+    time_column: Optional[str] = None,
+) -> StreamingResult:
+    """
+    不把整份資料讀進記憶體的回測：逐段（Parquet row group / 固定列數 / 任意 DataFrame iterator）處理，
+    每段前面接上前一段最後 warmup_bars 根 bar 計算指標，持倉與中止規則狀態延續到下一段，
+    每段結束就把新的 trades / fills / equity 寫到 out_dir 並從記憶體移除。
+    記憶體上限約為 (chunk + warmup) 根 bar，與資料總長度無關；結果與一次讀入的 run 相同
+    （遞迴型指標的條件同 BacktestEngine.resume）。
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    chunks = iter_parquet_chunks(source, chunk_rows, time_column) if isinstance(source, (str, Path)) else source
+
+    writers: Dict[str, _SpillWriter] = {}
+    reg = engine._registry()
+    state = None
+    tail: Optional[pd.DataFrame] = None
+    n_trades = 0
+    final_equity: Optional[float] = None
+
+    try:
+        for chunk in chunks:
+            if chunk.empty:
+                continue
+            engine._validate_df(chunk)
+            chunk = engine._prepare_frame(chunk)
+            if not writers:
+                # 時間欄位的時區 / 單位取自輸入資料（不由第一批輸出推斷）
+                tz = str(chunk.index.tz) if chunk.index.tz is not None else None
+                unit = chunk.index.unit
+                writers = {
+                    "trades": _SpillWriter(out_dir / "trades.parquet", trades_schema(tz, unit), index=False),
+                    "fills": _SpillWriter(out_dir / "fills.parquet", fills_schema(tz, unit), index=False),
+                    "equity": _SpillWriter(out_dir / "equity.parquet", equity_schema(tz, unit), index=True),
+                }
+            frame = pd.concat([tail, chunk]) if tail is not None and len(tail) else chunk
+            if state is None:
+                state = engine._new_state(frame, strategy)
+            start = len(frame) - len(chunk)
+            indicators = engine._compute_indicators(frame, strategy, reg, **engine._indicator_options())
+            engine._run_bars(frame, strategy, indicators, state, start=start, offset=state.n_bars - start)
+
+            # 溢寫本段的新結果，清空記憶體中的 list（中止規則改以 offset 計數）
+            portfolio = state.portfolio
+            writers["trades"].write(trades_to_frame(portfolio.trades))
+            writers["fills"].write(fills_to_frame(portfolio.fills))
+            if state.equity_points:
+                final_equity = state.equity_points[-1]
+                writers["equity"].write(
+                    pd.Series(state.equity_points, index=pd.Index(state.equity_index, name="time"), name="equity")
+                    .to_frame()
+                )
+            n_trades += len(portfolio.trades)
+            if state.abort is not None:
+                state.abort.trades_offset += len(portfolio.trades)
+            portfolio.trades = []
+            portfolio.fills = []
+            state.equity_points = []
+            state.equity_index = []
+
+            if state.aborted:
+                break
+            tail = frame.iloc[max(0, len(frame) - warmup_bars):] if warmup_bars > 0 else None
+    finally:
+        for w in writers.values():
+            w.close()
+
+    stats: Dict[str, Any] = {}
+    if state is not None and engine.intrabar_resolver is not None:
+        stats["intrabar_ambiguous_bars"] = state.exec_model.ambiguous_bars
+        stats["intrabar_resolved_bars"] = state.exec_model.resolved_bars
+    result = StreamingResult(
+        out_dir=out_dir,
+        n_bars=state.n_bars if state is not None else 0,
+        n_trades=n_trades,
+        final_equity=final_equity,
+        aborted=state.aborted if state is not None else False,
+        abort_reason=state.abort_reason if state is not None else None,
+        abort_bar_i=state.abort_bar_i if state is not None else None,
+        stats=stats,
+    )
+    summary = {k: v for k, v in result.__dict__.items() if k != "out_dir"}
+    (out_dir / "summary.json").write_text(json.dumps(summary, default=str), encoding="utf-8")
+    return result
@@ -0,0 +1,297 @@
+from __future__ import annotations
+
+import dataclasses
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from .engine import BacktestEngine
+from .costs import CostModel
+from .execution import EXIT_TYPE_BY_CODE, ExecutionModel, first_exit_hit
+from .indicators import IndicatorRegistry, LazyIndicators
+from .models import BacktestConfig, BacktestResult, ActionType, ExitType, OrderIntent, Position, Side
+from .portfolio import Portfolio
+from .abort import abort_enabled, find_abort
+from .repricing import equity_from_fills, sizing_depends_on_equity
+from .rules import RULES_KEY
+from .strategy_base import Strategy, StrategyContext
+from .analytics import summary_metrics
+
+if TYPE_CHECKING:
+    from .results import ResultsStore
+
+
+StrategyFactory = Callable[[Dict[str, Any]], Strategy]
+
+
+@dataclass(frozen=True)
+class ParamsFactory:
+    """
+    可 pickle 的 strategy factory：params dict -> strategy_cls(params_cls(**base, **params))。
+    （process pool 無法傳 lambda，平行 sweep/optimizer 請用這個）
+    """
+
+    strategy_cls: type
+    params_cls: type
+    base: Optional[Dict[str, Any]] = None
+
+    def __call__(self, params: Dict[str, Any]) -> Strategy:
+        return self.strategy_cls(self.params_cls(**{**(self.base or {}), **params}))
+
+
+@dataclass
+class SweepRun:
+    params: Dict[str, Any]
+    result: Optional[BacktestResult]  # summary_only 時為 None
+    metrics: Dict[str, float] = dataclasses.field(default_factory=dict)
+    run_id: Optional[int] = None  # 寫入 ResultsStore 時的 run_id
+
+    @property
+    def pruned(self) -> bool:
+        """觸發提前中止規則的組合視為已淘汰。"""
+        if self.result is not None:
+            return self.result.aborted
+        return bool(self.metrics.get("aborted", 0.0))
+
+
+@dataclass(frozen=True)
+class EntryCandidates:
+    """無倉時每根 bar 會被 engine 採用的 entry intent（依 priority 的第一筆）。"""
+
+    bars: np.ndarray
+    intents: List[OrderIntent]
+
+
+def _params_key(strategy: Strategy, exclude: Sequence[str]) -> tuple:
+    p = getattr(strategy, "p", None)
+    if p is None or not dataclasses.is_dataclass(p):
+        return (type(strategy), id(strategy))
+    items = dataclasses.asdict(p)
+    return (type(strategy),) + tuple(sorted((k, repr(v)) for k, v in items.items() if k not in exclude))
+
+
+def supports_exit_fast_path(strategy: Strategy) -> bool:
+    return bool(strategy.exit_param_names) and not sizing_depends_on_equity(strategy)
+
+
+def entry_candidates(
+    df: pd.DataFrame,
+    strategy: Strategy,
+    indicators: Dict[str, Any],
+    config: BacktestConfig,
+) -> EntryCandidates:
+    """以「永遠無倉」的狀態掃過每根 bar，收集 entry 候選（只需每組進場參數做一次）。"""
+    flat = Position()
+    bars: List[int] = []
+    intents: List[OrderIntent] = []
+    compiled = indicators.get(RULES_KEY)
+    # 規則式策略：只需看任一 entry 規則成立的 bar
+    scan = compiled.entry_bars() if compiled is not None else range(len(df))
+    for i in scan:
+        i = int(i)
+        ctx = StrategyContext(
+            df=df,
+            i=i,
+            time=df.index[i],
+            position=flat,
+            indicators=indicators,
+            init_equity=config.initial_cash,
+            now_equity=config.initial_cash,
+        )
+        for it in sorted(strategy.generate_intents(ctx), key=lambda x: x.priority):
+            if it.action == ActionType.ENTRY:
+                bars.append(i)
+                intents.append(it)
+                break
+    return EntryCandidates(bars=np.asarray(bars, dtype=np.int64), intents=intents)
+
+
+def _first_exit(
+    high: np.ndarray,
+    low: np.ndarray,
+    start: int,
+    stop: int,
+    side: Side,
+    tp: Optional[float],
+    sl: Optional[float],
+    be: Optional[float],
+    block: int = 256,
+) -> tuple[int, Optional[ExitType], Optional[float]]:
+    """
+    在 [start, stop) 找第一根觸發 TP/SL/BE 的 bar（向量化分段搜尋，段長倍增）。
+    同根多條件時與 ExecutionModel.conservative_exit_price 相同：SL > BE > TP。
+    """
+    sign = 1 if side == Side.LONG else -1
+    levels = {ExitType.SL: sl, ExitType.BE: be, ExitType.TP: tp}
+    pos = start
+    while pos < stop:
+        end = min(stop, pos + block)
+        j, code = first_exit_hit(sign, high[pos:end], low[pos:end], tp, sl, be)
+        if j >= 0:
+            exit_type = EXIT_TYPE_BY_CODE[code]
+            return pos + j, exit_type, levels[exit_type]
+        pos = end
+        block *= 2
+    return -1, None, None
+
+
+def simulate_exits(
+    df: pd.DataFrame,
+    strategy: Strategy,
+    candidates: EntryCandidates,
+    config: BacktestConfig,
+    cost_model: Optional[CostModel] = None,
+) -> BacktestResult:
+    """
+    給定 entry 候選，只模擬出場（一次只持有一個倉位）。
+    結果（trades / fills / equity）與 BacktestEngine.run（同一個 cost_model）相同。
+    """
+    n = len(df)
+    high = df["high"].to_numpy(dtype=float)
+    low = df["low"].to_numpy(dtype=float)
+    close = df["close"].to_numpy(dtype=float)
+    exec_model = ExecutionModel(config=config, costs=cost_model)
+    exec_model.prepare(df)
+    portfolio = Portfolio(initial_cash=config.initial_cash)
+
+    time_exit_bars = getattr(strategy.p, "time_exit_bars", None)
+    if not isinstance(time_exit_bars, int):
+        time_exit_bars = None
+
+    k = 0
+    n_cand = len(candidates.bars)
+    while k < n_cand:
+        e = int(candidates.bars[k])
+        c = close[e]
+        it = strategy.exit_levels(candidates.intents[k], c)
+        fill = exec_model.fill_entry(time=df.index[e], side=it.side, qty=it.qty, price=c, entry_bar_i=e)
+        portfolio.apply_entry_fill(fill)
+        portfolio.position.tp_price = it.tp_price
+        portfolio.position.sl_price = it.sl_price
+        portfolio.position.be_price = it.be_price
+
+        # engine 的 time-exit 在 bars_held >= N 的第一根 bar（最早為進場後下一根）用 close 出場
+        time_bar = e + max(time_exit_bars, 1) if time_exit_bars is not None else n
+        stop = min(time_bar + 1, n)
+        j, exit_type, price = _first_exit(high, low, e + 1, stop, it.side, it.tp_price, it.sl_price, it.be_price)
+        if exit_type is None:
+            if time_bar >= n:
+                break  # 持倉到資料結束
+            j, exit_type, price = time_bar, ExitType.TIME, close[time_bar]
+
+        fill = exec_model.fill_exit(
+            time=df.index[j], side=it.side, qty=portfolio.position.qty, price=price, exit_type=exit_type, bar_i=j
+        )
+        portfolio.apply_exit_fill(fill, bars_held=j - e)
+        # 出場當根仍可再進場（engine 先處理出場、收盤才產生 intents）
+        k = int(np.searchsorted(candidates.bars, j, side="left"))
+
+    equity_values = equity_from_fills(portfolio.fills, close, config, exec_model.costs)
+    fills, trades = portfolio.fills, portfolio.trades
+    abort_bar, abort_reason = None, None
+    if abort_enabled(config):
+        exit_bars = np.asarray([f.bar_i for f in fills if f.action == ActionType.EXIT], dtype=np.int64)
+        abort_bar, abort_reason = find_abort(equity_values, exit_bars, np.asarray([t.pnl for t in trades]), config)
+        if abort_bar is not None:
+            # 與 engine 相同：只保留中止那根 bar（含）之前發生的成交
+            fills = [f for f in fills if f.bar_i <= abort_bar]
+            trades = trades[: int((exit_bars <= abort_bar).sum())]
+            equity_values = equity_values[: abort_bar + 1]
+
+    equity = pd.Series(
+        equity_values,
+        index=pd.Index(df.index[: len(equity_values)], name="time"),
+        name="equity",
+    )
+    return BacktestResult(
+        trades=trades,
+        equity_curve=equity,
+        fills=fills,
+        aborted=abort_bar is not None,
+        abort_reason=abort_reason,
+        abort_bar_i=abort_bar,
+    )
+
+
+def run_sweep(
+    df: pd.DataFrame,
+    strategy_factory: StrategyFactory,
+    combos: Sequence[Dict[str, Any]],
+    config: BacktestConfig,
+    fast_exits: bool = True,
+    summary_only: bool = False,
+    store: Optional["ResultsStore"] = None,
+    save_artifacts: bool = False,
+    window=None,
+    symbol: Optional[str] = None,
+    flush_every: int = 256,
+    indicator_cache: Optional[Dict[tuple, Any]] = None,
+    cost_model: Optional[CostModel] = None,
+) -> List[SweepRun]:
+    """
+    逐組參數回測。fast_exits=True 時，對宣告了 exit_param_names 的策略：
+    同一組進場參數只算一次指標與 entry 候選，各出場參數組合只做向量化出場搜尋。
+    其他策略（或 sizing 依賴當下 equity 者）退回 BacktestEngine.run。
+
+    summary_only=True 時每組只保留 metrics（analytics.summary_metrics），不保留 BacktestResult。
+    有給 store 時每 flush_every 組批次寫入 ResultsStore（標上 window / symbol），
+    save_artifacts=True 另把完整 trades / fills / equity 存到 store 的 artifacts。
+    indicator_cache：跨呼叫共用的指標快取（spec -> 值，只能用於同一份 df；例：workers.WarmPool 的 worker）。
+    cost_model：成交成本模型（見 costs.py），engine 與快速出場模擬共用。
+    """
+    engine = BacktestEngine(config, cost_model=cost_model)
+    reg = IndicatorRegistry()
+    if indicator_cache is None:
+        indicator_cache = {}
+    candidate_cache: Dict[tuple, EntryCandidates] = {}
+    runs: List[SweepRun] = []
+    pending: List[tuple] = []  # (SweepRun, strategy 名稱, result)
+
+    def flush() -> None:
+        if store is not None and pending:
+            ids = store.add_many(
+                [
+                    {
+                        "strategy": name,
+                        "params": run.params,
+                        "metrics": run.metrics,
+                        "window": window,
+                        "symbol": symbol,
+                        "result": result,
+                    }
+                    for run, name, result in pending
+                ]
+            )
+            for (run, _, _), run_id in zip(pending, ids):
+                run.run_id = run_id
+        pending.clear()
+
+    for params in combos:
+        strategy = strategy_factory(params)
+        if not (fast_exits and supports_exit_fast_path(strategy)):
+            indicators = LazyIndicators(df, strategy.required_indicators(), reg, cache=indicator_cache)
+            result = engine.run(df, strategy, indicators=indicators)
+        else:
+            key = _params_key(strategy, strategy.exit_param_names)
+            cands = candidate_cache.get(key)
+            if cands is None:
+                engine._validate_df(df)
+                indicators = engine._compute_indicators(df, strategy, reg, cache=indicator_cache)
+                cands = entry_candidates(df, strategy, indicators, config)
+                candidate_cache[key] = cands
+            result = simulate_exits(df, strategy, cands, config, cost_model)
+
+        if not (summary_only or store is not None):
+            runs.append(SweepRun(params=dict(params), result=result))
+            continue
+        run = SweepRun(params=dict(params), result=None if summary_only else result, metrics=summary_metrics(result, df))
+        runs.append(run)
+        if store is not None:
+            pending.append((run, type(strategy).__name__, result if save_artifacts else None))
+            if len(pending) >= flush_every:
+                flush()
+    flush()
+
+    return runs
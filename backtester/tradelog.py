@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+from dataclasses import fields
+from typing import List
+
+import pandas as pd
+
+from .models import Trade, Fill, Side, ExitType, ActionType
+
+
+TRADE_COLUMNS = [f.name for f in fields(Trade)]
+FILL_COLUMNS = [f.name for f in fields(Fill)]
+
+# 數值欄位固定 dtype（全為 None 的欄位也不會變成 object），分批寫檔時 schema 才會一致
+_TRADE_NUMERIC = {
+    "qty": "float64",
+    "entry_price": "float64",
+    "sl_price": "float64",
+    "tp_price": "float64",
+    "exit_price": "float64",
+    "pnl": "float64",
+    "bars_held": "int64",
+}
+_FILL_NUMERIC = {"qty": "float64", "price": "float64", "fee": "float64", "raw_price": "float64"}
+
+
+def trades_to_frame(trades: List[Trade]) -> pd.DataFrame:
+    """
+    Trade list -> 欄位式 DataFrame（enum 存成字串，方便寫成 Parquet/Arrow）。
+    """
+    rows = []
+    for t in trades:
+        row = {name: getattr(t, name) for name in TRADE_COLUMNS}
+        row["side"] = t.side.value
+        row["exit_type"] = t.exit_type.value
+        rows.append(row)
+    frame = pd.DataFrame(rows, columns=TRADE_COLUMNS).astype(_TRADE_NUMERIC)
+    # 空 trade log 也要有穩定的 dtype，否則寫檔/讀檔後欄位型別會飄
+    if frame.empty:
+        frame = frame.astype(
+            {
+                "side": "object",
+                "entry_time": "datetime64[ns]",
+                "exit_time": "datetime64[ns]",
+                "exit_type": "object",
+            }
+        )
+    return frame
+
+
+def _opt_float(v) -> float | None:
+    return None if pd.isna(v) else float(v)
+
+
+def trades_from_frame(frame: pd.DataFrame) -> List[Trade]:
+    """trades_to_frame 的反向操作。"""
+    trades: List[Trade] = []
+    for row in frame.itertuples(index=False):
+        trades.append(
+            Trade(
+                side=Side(row.side),
+                qty=float(row.qty),
+                entry_time=pd.Timestamp(row.entry_time),
+                entry_price=float(row.entry_price),
+                sl_price=_opt_float(row.sl_price),
+                tp_price=_opt_float(row.tp_price),
+                exit_time=pd.Timestamp(row.exit_time),
+                exit_price=float(row.exit_price),
+                exit_type=ExitType(row.exit_type),
+                pnl=float(row.pnl),
+                bars_held=int(row.bars_held),
+            )
+        )
+    return trades
+
+
+def _opt_int(v) -> int | None:
+    return None if pd.isna(v) else int(v)
+
+
+def fills_to_frame(fills: List[Fill]) -> pd.DataFrame:
+    """Fill list -> DataFrame（enum 存字串；None 轉成 NaN/缺值）。"""
+    rows = []
+    for f in fills:
+        row = {name: getattr(f, name) for name in FILL_COLUMNS}
+        row["action"] = f.action.value
+        row["side"] = f.side.value
+        row["exit_type"] = f.exit_type.value if f.exit_type is not None else None
+        rows.append(row)
+    frame = pd.DataFrame(rows, columns=FILL_COLUMNS).astype(_FILL_NUMERIC)
+    # bar index 用可為空的整數型別，避免 None 把整欄變成 float
+    for col in ("entry_bar_i", "bar_i"):
+        frame[col] = frame[col].astype("Int64")
+    if frame.empty:
+        frame = frame.astype(
+            {
+                "time": "datetime64[ns]",
+                "action": "object",
+                "side": "object",
+                "exit_type": "object",
+            }
+        )
+    return frame
+
+
+def fills_from_frame(frame: pd.DataFrame) -> List[Fill]:
+    """fills_to_frame 的反向操作。"""
+    fills: List[Fill] = []
+    for row in frame.itertuples(index=False):
+        fills.append(
+            Fill(
+                time=pd.Timestamp(row.time),
+                action=ActionType(row.action),
+                side=Side(row.side),
+                qty=float(row.qty),
+                price=float(row.price),
+                fee=float(row.fee),
+                entry_bar_i=_opt_int(row.entry_bar_i),
+                exit_type=ExitType(row.exit_type) if isinstance(row.exit_type, str) else None,
+                raw_price=_opt_float(row.raw_price),
+                bar_i=_opt_int(row.bar_i),
+            )
+        )
+    return fills
@@ -0,0 +1,355 @@
+from __future__ import annotations
+
+import importlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Mapping, MutableMapping, Optional, Sequence, Union
+
+import pandas as pd
+
+from .models import BacktestConfig, BacktestResult
+from .strategy_base import Strategy
+
+
+# worker 啟動時預先 import 的模組（之後的 job 不再付 import 成本）
+DEFAULT_PRELOAD = (
+    "numpy",
+    "pandas",
+    "talib",
+    "backtester.engine",
+    "backtester.sweep",
+    "backtester.analytics",
+    "backtester.strategies.ALBO_strategy",
+)
+
+
+# worker 指標快取的預設上限（每份資料 / 精度各自計算）
+DEFAULT_INDICATOR_CACHE_BYTES = 1024**3
+
+
+def _nbytes(value: Any) -> int:
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=False, deep=False).sum())
+    # Series 只算值（index 與 df 共用）；純量 / 其他物件不計
+    return int(getattr(value, "nbytes", 0))
+
+
+class IndicatorCache(MutableMapping):
+    """
+    有大小上限的指標快取（spec 或規則子運算式 key -> 值）：總大小超過 max_bytes 時
+    淘汰最久沒被取用的項目。可直接當 LazyIndicators / run_sweep 的 cache 使用。
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_INDICATOR_CACHE_BYTES) -> None:
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.evictions = 0
+        self._data: "OrderedDict[Any, Any]" = OrderedDict()
+        self._sizes: Dict[Any, int] = {}
+
+    def __getitem__(self, key: Any) -> Any:
+        value = self._data[key]
+        self._data.move_to_end(key)
+        return value
+
+    def __setitem__(self, key: Any, value: Any) -> None:
+        if key in self._data:
+            del self[key]
+        size = _nbytes(value)
+        self._data[key] = value
+        self._sizes[key] = size
+        self.nbytes += size
+        while self.nbytes > self.max_bytes and self._data:
+            old, _ = self._data.popitem(last=False)
+            self.nbytes -= self._sizes.pop(old)
+            self.evictions += 1
+
+    def __delitem__(self, key: Any) -> None:
+        del self._data[key]
+        self.nbytes -= self._sizes.pop(key)
+
+    def __contains__(self, key: object) -> bool:
+        # 不更新使用順序
+        return key in self._data
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(list(self._data))
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+# ---- worker 端：每個 worker 只載入一次的資料與快取 ----
+_WORKER_DATA: Dict[str, pd.DataFrame] = {}
+_WORKER_FRAMES: Dict[tuple, pd.DataFrame] = {}  # (dataset, precision) -> 轉好精度的資料
+_WORKER_INDICATORS: Dict[tuple, IndicatorCache] = {}  # (dataset, precision) -> spec -> 指標值
+_WORKER_CACHE_BYTES = DEFAULT_INDICATOR_CACHE_BYTES
+
+
+def _load_dataset(source: Union[pd.DataFrame, str, Path]) -> pd.DataFrame:
+    if isinstance(source, pd.DataFrame):
+        return source
+    df = pd.read_parquet(source)
+    # 資料庫格式（時間在 dt_utc 欄），見 data.write_bars
+    return df.set_index("dt_utc") if "dt_utc" in df.columns else df
+
+
+def _init_worker(
+    datasets: Mapping[str, Any], preload: Sequence[str], cache_bytes: int = DEFAULT_INDICATOR_CACHE_BYTES
+) -> None:
+    global _WORKER_CACHE_BYTES
+    for name in preload:
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            pass
+    _WORKER_DATA.clear()
+    _WORKER_FRAMES.clear()
+    _WORKER_INDICATORS.clear()
+    _WORKER_CACHE_BYTES = cache_bytes
+    for name, source in datasets.items():
+        _WORKER_DATA[name] = _load_dataset(source)
+
+
+def worker_dataset(name: str) -> pd.DataFrame:
+    """在 worker 內取用預先載入的資料（給 WarmPool.submit 的自訂函式用）。"""
+    try:
+        return _WORKER_DATA[name]
+    except KeyError:
+        raise KeyError(f"Unknown dataset: {name} (loaded: {sorted(_WORKER_DATA)})") from None
+
+
+def worker_frame(name: str, precision: str = "float64") -> pd.DataFrame:
+    """worker 內預先載入的資料，轉成 engine 的計算精度（float32 時只轉一次）。"""
+    key = (name, precision)
+    frame = _WORKER_FRAMES.get(key)
+    if frame is None:
+        from .compact import compact_frame
+
+        df = worker_dataset(name)
+        frame = _WORKER_FRAMES[key] = compact_frame(df) if precision == "float32" else df
+    return frame
+
+
+def worker_indicator_cache(name: str, precision: str = "float64") -> IndicatorCache:
+    """worker 內該資料、該精度的指標快取（跨 job 保留，超過上限時淘汰最久沒用的指標）。"""
+    cache = _WORKER_INDICATORS.get((name, precision))
+    if cache is None:
+        cache = _WORKER_INDICATORS[(name, precision)] = IndicatorCache(_WORKER_CACHE_BYTES)
+    return cache
+
+
+def _ping(delay: float) -> int:
+    time.sleep(delay)
+    return os.getpid()
+
+
+def _run_backtest_job(
+    dataset: str,
+    strategy: Strategy,
+    config: BacktestConfig,
+    engine_kwargs: Dict[str, Any],
+    run_kwargs: Dict[str, Any],
+) -> BacktestResult:
+    from .compact import CompactRegistry
+    from .engine import BacktestEngine
+    from .indicators import IndicatorRegistry, LazyIndicators
+
+    engine = BacktestEngine(config, **engine_kwargs)
+    # 快取以實際計算精度區分（float32 的指標由 CompactRegistry 以 float32 資料算出）
+    df = worker_frame(dataset, engine.precision)
+    reg = CompactRegistry() if engine.precision == "float32" else IndicatorRegistry()
+    indicators = LazyIndicators(
+        df, strategy.required_indicators(), reg, cache=worker_indicator_cache(dataset, engine.precision)
+    )
+    if engine.eager_indicators or engine.indicator_workers is not None:
+        indicators.compute_all(workers=engine.indicator_workers, chunk_rows=engine.indicator_chunk_rows)
+    return engine.run(df, strategy, indicators=indicators, **run_kwargs)
+
+
+def _run_sweep_job(dataset: str, factory, combos, config: BacktestConfig, kwargs: Dict[str, Any]):
+    from .sweep import run_sweep
+
+    df = worker_dataset(dataset)
+    # run_sweep 一律以 float64 計算
+    return run_sweep(df, factory, combos, config, indicator_cache=worker_indicator_cache(dataset, "float64"), **kwargs)
+
+
+def _rss_bytes(pid: int) -> Optional[int]:
+    try:
+        import psutil
+
+        return int(psutil.Process(pid).memory_info().rss)
+    except ImportError:
+        pass
+    except Exception:
+        return None
+    try:
+        with open(f"/proc/{pid}/statm") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+@dataclass
+class PoolStats:
+    n_workers: int
+    pending: int          # 已送出尚未完成的 job
+    running: int          # 已交給 worker 的 job（含 worker 端 call queue 內的少量 job）
+    submitted: int
+    completed: int
+    worker_rss: Dict[int, Optional[int]]  # pid -> RSS bytes（無法取得為 None）
+
+    @property
+    def queue_depth(self) -> int:
+        return self.pending - self.running
+
+    @property
+    def total_rss(self) -> int:
+        return sum(v for v in self.worker_rss.values() if v is not None)
+
+
+class WarmPool:
+    """
+    常駐的本機 process pool（notebook 跨 cell 保留同一個物件）：
+    worker 啟動時預先 import backtester / pandas / talib 並載入 datasets（DataFrame 或 Parquet 路徑），
+    每個 worker 的指標快取跨 job 保留（每份資料 / 精度最多 indicator_cache_bytes，LRU 淘汰），
+    之後的 job 只付回測本身的成本。
+
+        pool = WarmPool({"BTC_5m": df}, n_workers=8)
+        fut = pool.submit_backtest("BTC_5m", ALBOStrategy(params), config)
+        futs = pool.submit_sweep("BTC_5m", ParamsFactory(...), combos, config, chunk_size=16)
+        pool.stats()  # worker 記憶體 / queue 深度
+        pool.close()
+
+    strategy / factory 需可 pickle（見 sweep.ParamsFactory）。
+    """
+
+    def __init__(
+        self,
+        datasets: Optional[Mapping[str, Any]] = None,
+        n_workers: Optional[int] = None,
+        preload: Sequence[str] = DEFAULT_PRELOAD,
+        warm: bool = True,
+        indicator_cache_bytes: int = DEFAULT_INDICATOR_CACHE_BYTES,
+    ) -> None:
+        self.datasets = dict(datasets or {})
+        self.n_workers = n_workers or os.cpu_count() or 1
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.n_workers,
+            initializer=_init_worker,
+            initargs=(self.datasets, tuple(preload), indicator_cache_bytes),
+        )
+        self._lock = threading.Lock()
+        self._pending: set = set()
+        self.submitted = 0
+        self.completed = 0
+        if warm:
+            self.warm()
+
+    # ---- 提交 ----
+    def submit(self, fn: Callable[..., Any], *args, **kwargs) -> Future:
+        """在 worker 執行 fn(*args, **kwargs)（fn 需為可 pickle 的模組層級函式，可用 worker_dataset 取資料）。"""
+        fut = self._executor.submit(fn, *args, **kwargs)
+        with self._lock:
+            self._pending.add(fut)
+            self.submitted += 1
+        fut.add_done_callback(self._done)
+        return fut
+
+    def _done(self, fut: Future) -> None:
+        with self._lock:
+            self._pending.discard(fut)
+            self.completed += 1
+
+    def submit_backtest(
+        self,
+        dataset: str,
+        strategy: Strategy,
+        config: BacktestConfig,
+        tradable=None,
+        flatten_at_session_end: bool = False,
+        **engine_kwargs,
+    ) -> "Future[BacktestResult]":
+        """
+        tradable / flatten_at_session_end 同 BacktestEngine.run。
+        engine_kwargs 傳給 BacktestEngine（例 precision="float32"）；event_sink 等不可 pickle 的物件不支援。
+        """
+        self._check_dataset(dataset)
+        run_kwargs = {"tradable": tradable, "flatten_at_session_end": flatten_at_session_end}
+        return self.submit(_run_backtest_job, dataset, strategy, config, engine_kwargs, run_kwargs)
+
+    def submit_sweep(
+        self,
+        dataset: str,
+        strategy_factory,
+        combos: Sequence[Dict[str, Any]],
+        config: BacktestConfig,
+        chunk_size: Optional[int] = None,
+        **sweep_kwargs,
+    ) -> List[Future]:
+        """
+        把 combos 切成 chunk_size 組一個 job（預設平均分給全部 worker），回傳各 chunk 的 future
+        （結果為 List[SweepRun]，依序串接即為完整 sweep）。sweep_kwargs 傳給 run_sweep（store 不支援）。
+        """
+        self._check_dataset(dataset)
+        combos = [dict(c) for c in combos]
+        if chunk_size is None:
+            chunk_size = max(1, -(-len(combos) // self.n_workers))
+        return [
+            self.submit(_run_sweep_job, dataset, strategy_factory, combos[a : a + chunk_size], config, sweep_kwargs)
+            for a in range(0, len(combos), chunk_size)
+        ]
+
+    @staticmethod
+    def gather(futures: Sequence[Future]) -> List[Any]:
+        """依序取回結果；submit_sweep 的 future 會展開成單一 list。"""
+        out: List[Any] = []
+        for fut in futures:
+            res = fut.result()
+            if isinstance(res, list):
+                out.extend(res)
+            else:
+                out.append(res)
+        return out
+
+    def _check_dataset(self, dataset: str) -> None:
+        if dataset not in self.datasets:
+            raise KeyError(f"Unknown dataset: {dataset} (loaded: {sorted(self.datasets)})")
+
+    # ---- 狀態 ----
+    def warm(self, timeout: Optional[float] = None) -> List[int]:
+        """讓每個 worker 都啟動並完成初始化（import + 載入資料），回傳 worker pid。"""
+        futs = [self._executor.submit(_ping, 0.05) for _ in range(self.n_workers)]
+        return sorted({f.result(timeout=timeout) for f in futs})
+
+    def pids(self) -> List[int]:
+        # ProcessPoolExecutor 沒有公開 worker 清單
+        return sorted(getattr(self._executor, "_processes", None) or {})
+
+    def stats(self) -> PoolStats:
+        with self._lock:
+            pending = list(self._pending)
+            submitted, completed = self.submitted, self.completed
+        return PoolStats(
+            n_workers=self.n_workers,
+            pending=len(pending),
+            running=sum(1 for f in pending if f.running()),
+            submitted=submitted,
+            completed=completed,
+            worker_rss={pid: _rss_bytes(pid) for pid in self.pids()},
+        )
+
+    def close(self, wait: bool = True, cancel_pending: bool = False) -> None:
+        self._executor.shutdown(wait=wait, cancel_futures=cancel_pending)
+
+    def __enter__(self) -> "WarmPool":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,27 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+
+def _random_walk_bars(
+    n_rows: int,
+    seed: int,
+    freq: str = "5min",
+    start: str = "2026-01-01",
+    step: float = 0.5,
+    wick: float = 0.3,
+    index_name=None,
+) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    idx = pd.date_range(start, periods=n_rows, freq=freq, name=index_name)
+    close = 100 + np.cumsum(rng.normal(0, step, n_rows))
+    open_ = np.r_[close[0], close[:-1]]
+    high = np.maximum(open_, close) + rng.uniform(0, wick, n_rows)
+    low = np.minimum(open_, close) - rng.uniform(0, wick, n_rows)
+    return pd.DataFrame({"open": open_, "high": high, "low": low, "close": close}, index=idx)
+
+
+@pytest.fixture
+def bars():
+    """隨機漫步 OHLC 產生器：bars(n_rows, seed, freq=..., start=..., ...)，同參數回傳同一份資料。"""
+    return _random_walk_bars
@@ -0,0 +1,51 @@
+from itertools import product
+
+import numpy as np
+
+from backtester.engine import BacktestEngine
+from backtester.models import BacktestConfig
+from backtester.strategies.ALBO_strategy import ALBOStrategy, ALBOParams
+from backtester.sweep import run_sweep
+
+
+def _factory(params):
+    return ALBOStrategy(ALBOParams(break_out_series_n=2, BO_n_times_atr=0.0, max_notional_pct=5.0, **params))
+
+
+def test_engine_aborts_on_consecutive_losses(bars):
+    df = bars(1500, 4)
+    cfg = BacktestConfig(initial_cash=10000, fee_rate=0.001, abort_max_consecutive_losses=2)
+    res = BacktestEngine(cfg).run(df, _factory({"break_out_n_bars": 5}))
+
+    assert res.aborted
+    assert res.abort_reason == "max_consecutive_losses"
+    assert len(res.equity_curve) == res.abort_bar_i + 1
+    assert res.trades[-1].pnl <= 0 and res.trades[-2].pnl <= 0
+    assert res.trades[-1].exit_time == res.equity_curve.index[-1]
+
+
+def test_engine_aborts_on_min_trades_by_bar(bars):
+    df = bars(1500, 4)
+    cfg = BacktestConfig(initial_cash=10000, abort_min_trades=10_000, abort_min_trades_by_bar=300)
+    res = BacktestEngine(cfg).run(df, _factory({"break_out_n_bars": 5}))
+
+    assert res.aborted and res.abort_reason == "min_trades" and res.abort_bar_i == 300
+
+
+def test_fast_sweep_abort_matches_engine(bars):
+    df = bars(1500, 4)
+    cfg = BacktestConfig(initial_cash=10000, fee_rate=0.001, abort_max_drawdown=0.05, abort_max_consecutive_losses=4)
+    combos = [{"rr": rr, "time_exit_bars": t, "break_out_n_bars": 5} for rr, t in product([0.5, 2.0, 4.0], [5, 100])]
+
+    runs = run_sweep(df, _factory, combos, cfg)
+
+    engine = BacktestEngine(cfg)
+    assert any(r.pruned for r in runs)
+    for run in runs:
+        expected = engine.run(df, _factory(run.params))
+        assert (run.result.aborted, run.result.abort_reason, run.result.abort_bar_i) == (
+            expected.aborted, expected.abort_reason, expected.abort_bar_i
+        )
+        assert run.result.trades == expected.trades
+        assert run.result.fills == expected.fills
+        assert np.array_equal(run.result.equity_curve.to_numpy(), expected.equity_curve.to_numpy())
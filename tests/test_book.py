@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+
+from backtester.book import PositionBook
+from backtester.engine import BacktestEngine
+from backtester.models import ActionType, BacktestConfig, ExitType, OrderIntent, Side
+from backtester.strategies.ALBO_strategy import ALBOStrategy, ALBOParams
+from backtester.strategy_base import Strategy
+
+
+class _BookALBO(ALBOStrategy):
+    position_mode = "book"
+
+
+class _Pyramid(Strategy):
+    """每 5 根加一個 lot（多空交替），每 40 根把多單平掉一半。"""
+
+    position_mode = "book"
+
+    def __init__(self):
+        self.p = None
+
+    def required_indicators(self):
+        return {}
+
+    def generate_intents(self, ctx):
+        c = float(ctx.df["close"].iat[ctx.i])
+        intents = []
+        if ctx.i % 5 == 0:
+            side = Side.LONG if ctx.i % 10 == 0 else Side.SHORT
+            sign = 1 if side == Side.LONG else -1
+            intents.append(
+                OrderIntent(ActionType.ADD, side, qty=1.0, tp_price=c + sign * 3.0, sl_price=c - sign * 2.0, priority=10)
+            )
+        if ctx.i % 40 == 39 and ctx.book is not None and len(ctx.book):
+            long_qty = float(ctx.book.qty[: ctx.book.n][ctx.book.side[: ctx.book.n] > 0].sum())
+            if long_qty > 0:
+                intents.append(OrderIntent(ActionType.EXIT, Side.LONG, qty=long_qty / 2, exit_type=ExitType.MANUAL, priority=5))
+        return intents
+
+
+def test_single_lot_book_matches_single_position_engine(bars):
+    df = bars(2000, 23)
+    engine = BacktestEngine(BacktestConfig(initial_cash=10000, fee_rate=0.0004, slippage_bps=1.0))
+    params = ALBOParams(break_out_series_n=2, break_out_n_bars=5, BO_n_times_atr=0.5, time_exit_bars=30)
+
+    single = engine.run(df, ALBOStrategy(params))
+    book = engine.run(df, _BookALBO(params))
+
+    assert book.trades == single.trades
+    assert book.fills == single.fills
+    np.testing.assert_array_equal(book.equity_curve.to_numpy(), single.equity_curve.to_numpy())
+
+
+def test_pyramiding_with_partial_exits_keeps_books_consistent(bars):
+    df = bars(2000, 23)
+    cfg = BacktestConfig(initial_cash=10000, fee_rate=0.0004)
+    result = BacktestEngine(cfg).run(df, _Pyramid())
+
+    entries = [f for f in result.fills if f.action == ActionType.ENTRY]
+    exits = [f for f in result.fills if f.action == ActionType.EXIT]
+    assert len(entries) == len(range(0, len(df), 5))
+    assert any(t.exit_type == ExitType.MANUAL for t in result.trades)
+    assert any(t.qty < 1.0 for t in result.trades)  # 部分平倉
+    assert len(exits) == len(result.trades)
+
+    # 最後一根：equity = 初始資金 + 已實現 - 進場手續費 + 未平倉 lot 的未實現
+    realized = sum(t.pnl for t in result.trades) - sum(f.fee for f in entries)
+    c = float(df["close"].iat[-1])
+    open_qty = {f.bar_i: f.qty for f in entries}
+    for t in result.trades:
+        open_qty[df.index.get_loc(t.entry_time)] -= t.qty
+    unreal = sum(
+        (1 if f.side == Side.LONG else -1) * (c - f.price) * open_qty[f.bar_i] for f in entries if open_qty[f.bar_i] > 1e-9
+    )
+    assert np.isclose(result.equity_curve.iat[-1], cfg.initial_cash + realized + unreal)
+
+
+def test_exit_hits_matches_scalar_rule_for_many_lots():
+    rng = np.random.default_rng(0)
+    book = PositionBook(capacity=4)
+    t = pd.Timestamp("2026-01-01")
+    for k in range(3000):
+        side = Side.LONG if k % 2 else Side.SHORT
+        sign = 1 if side == Side.LONG else -1
+        px = 100 + rng.normal()
+        book.add(side, 1.0, px, k, t, tp=px + sign * rng.uniform(0, 2), sl=px - sign * rng.uniform(0, 2),
+                 be=px if k % 3 == 0 else None)
+    assert book.capacity >= 3000
+
+    slots, codes, prices, _ = book.exit_hits(101.0, 99.0)
+    expected = []
+    for k in range(book.n):
+        long = book.side[k] > 0
+        tp, sl, be = book.levels(k)
+        hits = []
+        if sl is not None and (99.0 <= sl if long else 101.0 >= sl):
+            hits.append((0, sl))
+        if be is not None and (99.0 <= be if long else 101.0 >= be):
+            hits.append((1, be))
+        if tp is not None and (101.0 >= tp if long else 99.0 <= tp):
+            hits.append((2, tp))
+        if hits:
+            expected.append((k,) + hits[0])
+    assert [(int(s), int(c), float(p)) for s, c, p in zip(slots, codes, prices)] == expected
@@ -0,0 +1,78 @@
+import shutil
+import sys
+
+import pandas as pd
+
+import backtester.cache as cache_mod
+from backtester.cache import ResultCache
+from backtester.engine import BacktestEngine
+from backtester.models import BacktestConfig
+from backtester.strategies.ALBO_strategy import ALBOStrategy, ALBOParams
+
+
+def test_cache_hit_returns_same_result(bars, tmp_path):
+    df = bars(600, 0)
+    cfg = BacktestConfig(initial_cash=10000, fee_rate=0.0004)
+    engine = BacktestEngine(cfg)
+    strat = ALBOStrategy(ALBOParams(break_out_series_n=2, break_out_n_bars=5, BO_n_times_atr=0.0))
+    cache = ResultCache(tmp_path)
+
+    first = cache.run(engine, df, strat)
+    second = cache.run(engine, df, strat)
+
+    assert cache.stats.misses == 1
+    assert cache.stats.hits == 1
+    assert len(first.trades) > 0
+    assert second.trades == first.trades
+    assert second.fills == first.fills
+    pd.testing.assert_series_equal(second.equity_curve, first.equity_curve, check_freq=False)
+
+
+def test_cache_key_changes_with_params_and_config(bars, tmp_path):
+    df = bars(600, 0)
+    cache = ResultCache(tmp_path)
+    s1 = ALBOStrategy(ALBOParams(rr=1.5))
+    s2 = ALBOStrategy(ALBOParams(rr=2.0))
+    cfg = BacktestConfig()
+
+    assert cache.key(df, s1, cfg) == cache.key(df, ALBOStrategy(ALBOParams(rr=1.5)), cfg)
+    assert cache.key(df, s1, cfg) != cache.key(df, s2, cfg)
+    assert cache.key(df, s1, cfg) != cache.key(df, s1, BacktestConfig(fee_rate=0.001))
+    assert cache.key(df, s1, cfg) != cache.key(df.iloc[:-1], s1, cfg)
+
+
+def test_cache_evicts_when_over_size(bars, tmp_path):
+    df = bars(600, 0)
+    engine = BacktestEngine(BacktestConfig(initial_cash=10000))
+    cache = ResultCache(tmp_path, max_bytes=1)
+
+    cache.run(engine, df, ALBOStrategy(ALBOParams(rr=1.5)))
+    cache.run(engine, df, ALBOStrategy(ALBOParams(rr=2.0)))
+
+    assert cache.stats.evictions >= 1
+    assert cache.size_bytes() == 0
+
+
+def test_cache_key_tracks_every_package_module(bars, tmp_path, monkeypatch):
+    df = bars(600, 0)
+    cfg = BacktestConfig()
+    strat = ALBOStrategy(ALBOParams())
+    cache = ResultCache(tmp_path / "cache")
+    base = cache.key(df, strat, cfg)
+
+    # 與 import 狀態無關：模組未載入時 key 不變
+    monkeypatch.delitem(sys.modules, "backtester.costs")
+    monkeypatch.delitem(sys.modules, "backtester.sessions", raising=False)
+    assert cache.key(df, strat, cfg) == base
+
+    # 改任何一個模組（含 costs / strategies）的原始碼 -> key 改變
+    pkg = tmp_path / "backtester"
+    shutil.copytree(cache_mod._PACKAGE_DIR, pkg, ignore=shutil.ignore_patterns("__pycache__"))
+    monkeypatch.setattr(cache_mod, "_PACKAGE_DIR", pkg)
+    assert cache.key(df, strat, cfg) == base
+    keys = {base}
+    for rel in ("costs.py", "book.py", "strategies/xyz_strategy.py"):
+        with open(pkg / rel, "a", encoding="utf-8") as fh:
+            fh.write("\n# edited\n")
+        keys.add(cache.key(df, strat, cfg))
+    assert len(keys) == 4
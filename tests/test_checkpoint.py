@@ -0,0 +1,69 @@
+import zipfile
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtester.checkpoint import Checkpoint
+from backtester.costs import CostModel, FixedBpsSlippage, MakerTakerFee
+from backtester.engine import BacktestEngine
+from backtester.models import BacktestConfig
+from backtester.strategies.ALBO_strategy import ALBOStrategy, ALBOParams
+
+
+def _strategy():
+    return ALBOStrategy(ALBOParams(break_out_series_n=2, break_out_n_bars=5, BO_n_times_atr=0.5, time_exit_bars=30))
+
+
+def test_resume_from_saved_checkpoint_matches_full_run(bars, tmp_path):
+    df = bars(3000, 9)
+    cfg = BacktestConfig(initial_cash=10000, fee_rate=0.0004, abort_max_drawdown=0.99, abort_max_consecutive_losses=50)
+    engine = BacktestEngine(cfg)
+
+    full = engine.run(df, _strategy())
+    _, ckpt = engine.run_checkpointed(df.iloc[:1800], _strategy(), warmup_bars=1000)
+    path = ckpt.save(tmp_path / "albo.ckpt")
+    loaded = Checkpoint.load(path)
+
+    # 第二天：傳入完整資料，只會跑新增的部分；再接一段
+    mid, ckpt2 = engine.resume(loaded, df.iloc[:2400], _strategy())
+    resumed, ckpt3 = engine.resume(ckpt2, df, _strategy())
+
+    assert len(mid.equity_curve) == 600
+    assert len(resumed.equity_curve) == 600
+    assert ckpt3.n_trades == len(full.trades)
+    history = ckpt3.history()
+    assert history.trades == full.trades
+    assert history.fills == full.fills
+    assert resumed.trades == [t for t in full.trades if t.exit_time > df.index[2399]]
+    pd.testing.assert_index_equal(history.equity_curve.index, full.equity_curve.index, check_exact=True)
+    np.testing.assert_allclose(history.equity_curve.to_numpy(), full.equity_curve.to_numpy(), rtol=1e-12)
+
+    # checkpoint 本身只有 meta + warmup 尾段，歷史 append 到 history 資料夾
+    ckpt3.save(path)
+    with zipfile.ZipFile(path) as zf:
+        assert sorted(zf.namelist()) == ["meta.json", "tail.parquet"]
+    reloaded = Checkpoint.load(path)
+    assert reloaded.history().trades == full.trades
+    assert len(list((tmp_path / "albo.ckpt.history").glob("equity-*.parquet"))) == 2
+
+
+def test_resume_rejects_different_params(bars):
+    df = bars(600, 9)
+    engine = BacktestEngine(BacktestConfig(initial_cash=10000))
+    _, ckpt = engine.run_checkpointed(df.iloc[:300], _strategy())
+
+    with pytest.raises(ValueError):
+        engine.resume(ckpt, df, ALBOStrategy(ALBOParams(rr=9.0)))
+
+
+def test_resume_rejects_different_engine_settings(bars):
+    df = bars(600, 9)
+    cfg = BacktestConfig(initial_cash=10000)
+    _, ckpt = BacktestEngine(cfg).run_checkpointed(df.iloc[:300], _strategy())
+
+    with pytest.raises(ValueError, match="engine settings"):
+        BacktestEngine(cfg, precision="float32").resume(ckpt, df, _strategy())
+    costs = CostModel(MakerTakerFee(0.0001, 0.0004), FixedBpsSlippage(1.0))
+    with pytest.raises(ValueError, match="engine settings"):
+        BacktestEngine(cfg, cost_model=costs).resume(ckpt, df, _strategy())
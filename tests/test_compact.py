@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from backtester.compact import CompactRegistry, compact_frame, frame_nbytes, validate_precision
+from backtester.engine import BacktestEngine
+from backtester.indicators import LazyIndicators
+from backtester.models import BacktestConfig
+from backtester.strategies.ALBO_strategy import ALBOStrategy, ALBOParams
+
+
+def _strategy():
+    return ALBOStrategy(ALBOParams(break_out_series_n=2, break_out_n_bars=5, BO_n_times_atr=0.3))
+
+
+def test_compact_dtypes_and_memory(bars):
+    df = bars(3000, 41)
+    small = compact_frame(df)
+    assert all(small[c].dtype == np.float32 for c in ("open", "high", "low", "close"))
+    specs = _strategy().required_indicators()
+    full = LazyIndicators(df, specs, eager=True)
+    compact = LazyIndicators(small, specs, CompactRegistry(), eager=True)
+    assert compact["bar_series"].dtype == np.float32
+    assert compact["strong_bar_series"].dtype == np.bool_
+    assert CompactRegistry().bar_side(small).dtype == np.int8
+    assert frame_nbytes(small, compact) < 0.6 * frame_nbytes(df, full)
+
+
+def test_float32_run_and_precision_report(bars):
+    df = bars(3000, 41)
+    cfg = BacktestConfig(initial_cash=10000, fee_rate=0.0004)
+    r32 = BacktestEngine(cfg, precision="float32").run(df, _strategy())
+    # 損益 / equity 仍以 float64 累計
+    assert r32.equity_curve.dtype == np.float64
+    assert all(isinstance(t.pnl, float) for t in r32.trades)
+
+    report = validate_precision(df, _strategy, cfg)
+    assert report.n_trades_32 == len(r32.trades)
+    assert report.matched_trades > 0
+    assert report.max_price_diff < 1e-4
+    assert set(report.to_frame().index) >= {"perf_per_day", "final_equity", "n_trades"}
+    with pytest.raises(ValueError):
+        BacktestEngine(cfg, precision="float16")
@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtester.costs import ATRSlippage, CostModel, FlatFee, FixedBpsSlippage, MakerTakerFee, RangeSlippage, VolumeTieredFee
+from backtester.engine import BacktestEngine
+from backtester.execution import EXIT_NONE, EXIT_TYPE_BY_CODE, ExecutionModel, exit_hits
+from backtester.indicators import atr
+from backtester.models import BacktestConfig, ExitType, Side
+from backtester.optimizer import build_param_combinations
+from backtester.strategies.ALBO_strategy import ALBOStrategy, ALBOParams
+from backtester.sweep import ParamsFactory, run_sweep
+
+
+def test_batch_exit_hits_match_conservative_rule():
+    rng = np.random.default_rng(0)
+    n = 2000
+    sign = rng.choice([-1, 1], n)
+    low = 100 - rng.uniform(0, 3, n)
+    high = 100 + rng.uniform(0, 3, n)
+    levels = {k: np.where(rng.random(n) < 0.2, np.nan, 100 + rng.normal(0, 2, n)) for k in ("tp", "sl", "be")}
+    code, price, n_hits = exit_hits(sign, high, low, levels["tp"], levels["sl"], levels["be"])
+
+    ex = ExecutionModel(BacktestConfig())
+    opt = lambda v: None if np.isnan(v) else float(v)
+    for i in range(n):
+        exit_type, exit_price = ex.conservative_exit_price(
+            side=Side.LONG if sign[i] > 0 else Side.SHORT, bar_open=100, bar_high=high[i], bar_low=low[i], bar_close=100,
+            tp=opt(levels["tp"][i]), sl=opt(levels["sl"][i]), be=opt(levels["be"][i]), time_exit=False,
+        )
+        if exit_type is None:
+            assert code[i] == EXIT_NONE
+        else:
+            assert EXIT_TYPE_BY_CODE[int(code[i])] == exit_type and price[i] == exit_price
+        assert n_hits[i] == len(ex._exit_hits(
+            Side.LONG if sign[i] > 0 else Side.SHORT, high[i], low[i], opt(levels["tp"][i]), opt(levels["sl"][i]), opt(levels["be"][i])
+        ))
+
+
+def test_batch_costs_match_single_fills():
+    cfg = BacktestConfig(fee_rate=0.0005, slippage_bps=3)
+    default = ExecutionModel(cfg)
+    general = ExecutionModel(cfg, costs=CostModel(FlatFee(0.0005), FixedBpsSlippage(3), maker_exit_types=()))
+    assert default.costs.is_flat(cfg)
+    raw = np.array([100.0, 101.5, 99.25])
+    is_buy = np.array([True, False, True])
+    qty = np.array([1.0, 2.5, 0.3])
+    px, fee = general.fill_costs(raw, is_buy, qty, [None, ExitType.SL, ExitType.TP])
+    for k in range(3):
+        f = default.fill_entry(time=pd.Timestamp("2026-01-01"), side=Side.LONG if is_buy[k] else Side.SHORT, qty=qty[k], price=raw[k], entry_bar_i=0)
+        assert f.price == px[k] and f.fee == fee[k]
+    assert general.traded_notional == default.traded_notional
+
+
+def test_maker_taker_and_tiers():
+    ex = ExecutionModel(BacktestConfig(), costs=CostModel(MakerTakerFee(0.0001, 0.0005), FixedBpsSlippage(0)))
+    _, fee = ex.fill_costs(np.array([100.0, 100.0]), np.array([False, False]), np.array([1.0, 1.0]), [ExitType.TP, ExitType.SL])
+    np.testing.assert_allclose(fee, [0.01, 0.05])
+
+    tiers = VolumeTieredFee(((0, 0.0002, 0.0005), (150, 0.0001, 0.0003)))
+    ex = ExecutionModel(BacktestConfig(), costs=CostModel(tiers, FixedBpsSlippage(0)))
+    _, fee = ex.fill_costs(np.full(3, 100.0), np.ones(3, dtype=bool), np.ones(3), [None, None, None])
+    # 第三筆之前累積 200 -> 第二級
+    np.testing.assert_allclose(fee, [0.05, 0.05, 0.03])
+    assert ex.traded_notional == 300.0
+    with pytest.raises(ValueError):
+        VolumeTieredFee(((10, 0.1, 0.1),))
+
+
+def test_custom_costs_in_engine_and_fast_sweep(bars):
+    df = bars(3000, 53)
+    cfg = BacktestConfig(initial_cash=10000, fee_rate=0.0004)
+    costs = CostModel(
+        VolumeTieredFee(((0, 0.0002, 0.0005), (2e5, 0.0001, 0.0004))),
+        ATRSlippage(0.05),
+    )
+    factory = ParamsFactory(ALBOStrategy, ALBOParams, base={"break_out_series_n": 2, "break_out_n_bars": 5})
+    combos = build_param_combinations({"BO_n_times_atr": [0.3], "rr": [1.0, 2.0]})
+    fast = run_sweep(df, factory, combos, cfg, cost_model=costs)
+    for run in fast:
+        ref = BacktestEngine(cfg, cost_model=costs).run(df, factory(run.params))
+        assert run.result.trades == ref.trades
+        np.testing.assert_array_equal(run.result.equity_curve.to_numpy(), ref.equity_curve.to_numpy())
+
+    # 滑價 = 0.05 * ATR（成交那根）
+    res = BacktestEngine(cfg, cost_model=costs).run(df, factory(combos[0]))
+    a = atr(df, 14).to_numpy()
+    entry = res.fills[0]
+    assert entry.price == pytest.approx(entry.raw_price + (1 if entry.side == Side.LONG else -1) * 0.05 * a[entry.bar_i])
+    # 成本較高 -> 與固定費率結果不同
+    plain = BacktestEngine(cfg).run(df, factory(combos[0]))
+    assert res.equity_curve.iat[-1] != plain.equity_curve.iat[-1]
+
+    rs = CostModel(FlatFee(0.0), RangeSlippage(0.5))
+    ex = ExecutionModel(cfg, costs=rs)
+    ex.prepare(df)
+    px = ex.fill_prices(np.array([100.0]), np.array([True]), np.array([7]))
+    assert px[0] == pytest.approx(100.0 + 0.5 * (df["high"].iat[7] - df["low"].iat[7]))
@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtester.data import BarBuilder, bar_file_name, build_bars, iter_bars, load_bars, write_bars
+from backtester.engine import BacktestEngine
+from backtester.models import BacktestConfig
+from backtester.strategies.xyz_strategy import XYZStrategy, XYZParams
+
+
+def _make_ticks(n: int = 20000, seed: int = 43) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    # 毫秒時間戳（含同一毫秒多筆成交）
+    ts = 1767225600000 + np.cumsum(rng.integers(0, 400, n))
+    price = 100 + np.cumsum(rng.normal(0, 0.02, n))
+    size = rng.exponential(0.5, n)
+    return pd.DataFrame({"timestamp": ts, "price": price, "size": size})
+
+
+def test_time_bars_match_resample_and_ignore_chunking():
+    ticks = _make_ticks()
+    bars = build_bars(ticks, "time", freq="15s", chunk_rows=1234)
+    whole = build_bars(ticks, "time", freq="15s", chunk_rows=len(ticks))
+    pd.testing.assert_frame_equal(bars, whole, check_exact=True)
+
+    s = ticks.set_index(pd.to_datetime(ticks["timestamp"], unit="ms", utc=True))
+    ref = s["price"].resample("15s").ohlc().dropna()
+    np.testing.assert_array_equal(bars.index.as_unit("ns").asi8, ref.index.as_unit("ns").asi8)
+    np.testing.assert_array_equal(bars[["open", "high", "low", "close"]].to_numpy(), ref.to_numpy())
+    assert bars["n_ticks"].sum() == len(ticks)
+    np.testing.assert_allclose(bars["volume"].sum(), ticks["size"].sum())
+
+    BacktestEngine._validate_df(bars)
+    BacktestEngine(BacktestConfig(initial_cash=10000)).run(bars, XYZStrategy(XYZParams(breakout_lookback=10)))
+
+
+@pytest.mark.parametrize("kind", ["volume", "dollar"])
+def test_threshold_bars_ignore_chunking(kind):
+    ticks = _make_ticks()
+    threshold = 50.0 if kind == "volume" else 5000.0
+    parts = [b for b in iter_bars(ticks, kind, threshold=threshold, chunk_rows=777)]
+    assert len(parts) > 1
+    bars = pd.concat(parts)
+    whole = build_bars(ticks, kind, threshold=threshold, chunk_rows=len(ticks))
+    pd.testing.assert_frame_equal(bars, whole, check_exact=True)
+
+    assert bars["n_ticks"].sum() == len(ticks)
+    measure = bars["volume"] if kind == "volume" else bars["dollar_volume"]
+    # 除了最後一根，每根都至少跨越一個切點；平均剛好 threshold
+    amount = ticks["size"] if kind == "volume" else ticks["price"] * ticks["size"]
+    assert (measure.iloc[:-1] > 0).all()
+    assert abs(measure.iloc[:-1].mean() - threshold) < 0.05 * threshold
+    assert len(bars) <= amount.sum() / threshold + 1
+    assert (bars["close_time"] >= bars.index).all()
+
+
+def test_write_and_load_roundtrip(tmp_path):
+    ticks = _make_ticks()
+    src = tmp_path / "ticks.parquet"
+    ticks.to_parquet(src, index=False)
+    path = tmp_path / bar_file_name("BTC", "15s", 1)
+    n = write_bars(src, path, "time", freq="15s", chunk_rows=3000)
+    loaded = load_bars(path)
+    assert n == len(loaded) and path.name == "BTC_15s_1M_UTC.parquet"
+    pd.testing.assert_frame_equal(loaded, build_bars(ticks, "time", freq="15s"), check_exact=True, check_freq=False)
+
+
+def test_unsorted_ticks_rejected():
+    builder = BarBuilder("time", freq="1min")
+    builder.update(np.array([10, 20], dtype=np.int64), np.array([1.0, 2.0]), np.array([1.0, 1.0]))
+    with pytest.raises(ValueError):
+        builder.update(np.array([5], dtype=np.int64), np.array([1.0]), np.array([1.0]))
+    with pytest.raises(ValueError):
+        BarBuilder("volume")
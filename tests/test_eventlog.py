@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from backtester.engine import BacktestEngine
+from backtester.eventlog import EventLogReader, EventLogWriter
+from backtester.models import BacktestConfig
+from backtester.strategies.ALBO_strategy import ALBOStrategy, ALBOParams
+
+
+def _strategy():
+    return ALBOStrategy(ALBOParams(break_out_series_n=2, break_out_n_bars=5, BO_n_times_atr=0.5, time_exit_bars=30))
+
+
+@pytest.mark.parametrize("name", ["events.arrow", "events.parquet"])
+def test_event_log_records_fills_and_trades(bars, tmp_path, name):
+    df = bars(2000, 13)
+    path = tmp_path / name
+    with EventLogWriter(path, batch_rows=16, max_pending_batches=2) as sink:
+        result = BacktestEngine(BacktestConfig(initial_cash=10000, fee_rate=0.0004), event_sink=sink).run(df, _strategy())
+
+    reader = EventLogReader(path)
+    fills = reader.read(events=["fill"])
+    trades = reader.read(events=["trade"])
+    assert len(fills) == len(result.fills) > 0
+    assert len(trades) == len(result.trades)
+    np.testing.assert_allclose(fills["price"].to_numpy(), [f.price for f in result.fills])
+    np.testing.assert_allclose(trades["pnl"].to_numpy(), [t.pnl for t in result.trades])
+    assert list(trades["exit_type"]) == [t.exit_type.value for t in result.trades]
+    assert set(reader.read(events=["exit"])["reason"]) <= {"intrabar", "time_bars", "strategy"}
+
+
+def test_event_log_reader_filters_by_time(bars, tmp_path):
+    df = bars(2000, 13)
+    path = tmp_path / "events.arrow"
+    with EventLogWriter(path, batch_rows=8) as sink:
+        BacktestEngine(BacktestConfig(initial_cash=10000), event_sink=sink).run(df, _strategy())
+
+    start, end = df.index[500], df.index[1000]
+    everything = EventLogReader(path).read()
+    window = EventLogReader(path).read(start=start, end=end, columns=["event", "time", "price"])
+
+    expected = everything[(everything["time"] >= start) & (everything["time"] < end)]
+    assert list(window.columns) == ["event", "time", "price"]
+    assert len(window) == len(expected) > 0
+    assert (window["time"] >= start).all() and (window["time"] < end).all()
+
+
+def test_empty_event_log_is_readable(tmp_path):
+    path = tmp_path / "empty.arrow"
+    EventLogWriter(path).close()
+    assert EventLogReader(path).read(events=["fill"]).empty
@@ -0,0 +1,104 @@
+import numpy as np
+import pandas as pd
+
+from backtester.engine import BacktestEngine
+from backtester.execution import ExecutionModel
+from backtester.intrabar import LowerTimeframeResolver
+from backtester.models import BacktestConfig, ExitType, Side
+from backtester.strategies.ALBO_strategy import ALBOStrategy, ALBOParams
+
+
+def _to_5m(df_1m: pd.DataFrame) -> pd.DataFrame:
+    return df_1m.resample("5min").agg({"open": "first", "high": "max", "low": "min", "close": "last"})
+
+
+def test_resolver_picks_level_touched_first():
+    idx = pd.date_range("2026-01-01", periods=5, freq="1min")
+    # 第 2 根 1m 先碰到 TP=110，第 4 根才碰到 SL=90
+    lower = pd.DataFrame(
+        {
+            "open": [100, 101, 109, 100, 95],
+            "high": [101, 111, 109, 100, 96],
+            "low": [99, 100, 100, 89, 94],
+            "close": [101, 109, 100, 95, 95],
+        },
+        index=idx,
+        dtype=float,
+    )
+    resolver = LowerTimeframeResolver.from_frame(lower, bar_duration=pd.Timedelta("5min"))
+    ex = ExecutionModel(BacktestConfig(), resolver=resolver)
+
+    args = dict(side=Side.LONG, bar_open=100, bar_high=111, bar_low=89, bar_close=95, tp=110, sl=90, be=None)
+    assert ex.conservative_exit_price(time_exit=False, **args) == (ExitType.SL, 90)
+    assert ex.intrabar_exit(time=idx[0], **args) == (ExitType.TP, 110)
+    assert ex.ambiguous_bars == 1 and ex.resolved_bars == 1
+
+
+def test_engine_reports_resolved_bars_and_parquet_matches_frame(bars, tmp_path):
+    lower = bars(5000, 5, freq="1min", step=0.3, wick=0.2)
+    df = _to_5m(lower)
+    strat = ALBOStrategy(ALBOParams(break_out_series_n=2, break_out_n_bars=5, BO_n_times_atr=0.0, rr=0.3))
+    cfg = BacktestConfig(initial_cash=10000)
+
+    path = tmp_path / "lower.parquet"
+    lower.to_parquet(path, row_group_size=700)
+    from_frame = BacktestEngine(cfg, intrabar_resolver=LowerTimeframeResolver.from_frame(lower)).run(df, strat)
+    parquet_resolver = LowerTimeframeResolver.from_parquet(path, max_cached_blocks=2)
+    from_parquet = BacktestEngine(cfg, intrabar_resolver=parquet_resolver).run(df, strat)
+    baseline = BacktestEngine(cfg).run(df, strat)
+
+    assert from_frame.stats["intrabar_ambiguous_bars"] > 0
+    assert from_frame.stats["intrabar_resolved_bars"] > 0
+    assert from_parquet.trades == from_frame.trades
+    assert parquet_resolver.stats["blocks_loaded"] >= 1
+    assert "intrabar_ambiguous_bars" not in baseline.stats
+    assert [t.exit_type for t in from_frame.trades] != [t.exit_type for t in baseline.trades]
+
+
+def _first_touch_reference(o, h, l, sign, levels):
+    """逐列掃描的參考實作：第一根碰到線的小週期 K 線，同方向取離開盤價最近者，方向相反 -> None。"""
+    for j in range(len(o)):
+        touched = []
+        for k, lv in enumerate(levels):
+            if np.isnan(lv):
+                continue
+            down = (k != 2) if sign > 0 else (k == 2)
+            if (l[j] <= lv) if down else (h[j] >= lv):
+                touched.append((abs(lv - o[j]), k, down))
+        if touched:
+            if len({d for _, _, d in touched}) > 1:
+                return None
+            return min(touched)[1]
+    return None
+
+
+def test_resolve_many_matches_row_by_row_reference(bars):
+    lower = bars(3000, 9, freq="1min", step=0.3, wick=0.2)
+    df = _to_5m(lower)
+    # block 小於一根 5m bar 的跨度時，查詢會跨 block；LRU 只留 2 個 block
+    resolver = LowerTimeframeResolver.from_frame(lower, block_rows=7)
+    resolver.max_cached_blocks = 2
+    resolver.prepare(df.index, offset=100)
+
+    rng = np.random.default_rng(3)
+    n = 400
+    bars = rng.integers(0, len(df), n)
+    sign = rng.choice([-1.0, 1.0], n)
+    mid = df["open"].to_numpy()[bars]
+    levels = mid[:, None] + rng.normal(0, 0.6, (n, 3))
+    levels[rng.random((n, 3)) < 0.3] = np.nan
+
+    code, price = resolver.resolve_many(df.index[bars], sign, levels, bar_i=bars + 100)
+    by_time, _ = resolver.resolve_many(df.index[bars], sign, levels)
+    assert np.array_equal(code, by_time)
+    assert len(resolver._blocks) <= 2
+    assert resolver.stats["batches"] == 2
+
+    o, h, l = (lower[c].to_numpy() for c in ("open", "high", "low"))
+    t = lower.index
+    for q in range(n):
+        m = (t >= df.index[bars[q]]) & (t < df.index[bars[q]] + pd.Timedelta("5min"))
+        k = _first_touch_reference(o[m], h[m], l[m], sign[q], levels[q])
+        assert code[q] == (-1 if k is None else k)
+        if k is not None:
+            assert price[q] == levels[q, k]
@@ -0,0 +1,67 @@
+import pytest
+
+from backtester.engine import BacktestEngine
+from backtester.indicators import IndicatorRegistry, LazyIndicators
+from backtester.models import BacktestConfig, Side
+from backtester.strategies.ALBO_strategy import ALBOStrategy, ALBOParams
+from backtester.strategies.xyz_strategy import XYZStrategy, XYZParams
+
+
+class _CountingRegistry(IndicatorRegistry):
+    def __init__(self):
+        self.calls = []
+
+    def rolling_high(self, df, length, column="high"):
+        self.calls.append(("rolling_high", length))
+        return super().rolling_high(df, length, column)
+
+
+def test_computes_on_first_access_and_memoizes(bars):
+    df = bars(200, 31)
+    reg = _CountingRegistry()
+    cache = {}
+    lazy = LazyIndicators(df, {"hh": ("rolling_high", 10, "high"), "atr": ("atr", 14)}, reg, cache=cache)
+    assert lazy.computed() == [] and "hh" in lazy and len(lazy) == 2
+
+    hh = lazy["hh"]
+    assert lazy["hh"] is hh
+    assert reg.calls == [("rolling_high", 10)]
+    assert lazy.untouched() == ["atr"]
+    # 共用 cache：另一個容器取同一個 spec 不重算
+    other = LazyIndicators(df, {"x": ("rolling_high", 10, "high")}, reg, cache=cache)
+    assert other["x"] is hh and len(reg.calls) == 1
+
+    eager = LazyIndicators(df, {"hh": ("rolling_high", 10, "high"), "atr": ("atr", 14)}, IndicatorRegistry(), eager=True)
+    assert eager.computed() == ["hh", "atr"] and eager.untouched() == ["hh", "atr"]
+    with pytest.raises(ValueError):
+        LazyIndicators(df, {"bad": ("no_such_indicator", 3)})
+
+
+def test_lazy_run_matches_eager_and_reports_untouched(bars):
+    df = bars(1500, 31)
+    cfg = BacktestConfig(initial_cash=10000, fee_rate=0.0004)
+    for strategy in (
+        ALBOStrategy(ALBOParams(break_out_series_n=2, break_out_n_bars=5, BO_n_times_atr=0.3, allow_side=Side.LONG)),
+        XYZStrategy(XYZParams(breakout_lookback=10)),
+    ):
+        lazy = BacktestEngine(cfg).run(df, strategy)
+        eager = BacktestEngine(cfg, eager_indicators=True).run(df, strategy)
+        assert lazy.trades == eager.trades
+        assert lazy.equity_curve.equals(eager.equity_curve)
+        assert lazy.stats["untouched_indicators"] == eager.stats["untouched_indicators"]
+
+    # 只做多的 ALBO 不會用到 ll 與 rocp_n
+    albo = BacktestEngine(cfg).run(df, ALBOStrategy(ALBOParams(break_out_series_n=2, allow_side=Side.LONG)))
+    assert set(albo.stats["untouched_indicators"]) == {"ll", "rocp_2"}
+
+
+def test_rule_terms_after_an_all_false_prefix_are_skipped(bars):
+    df = bars(1500, 31)
+    cfg = BacktestConfig(initial_cash=10000)
+    # 6 根連續同向且實體遞增從未出現：後面的 rocp / ll / ma 條件不求值，指標也不計算
+    strategy = ALBOStrategy(ALBOParams(break_out_series_n=6))
+    lazy = BacktestEngine(cfg).run(df, strategy)
+    eager = BacktestEngine(cfg, eager_indicators=True).run(df, strategy)
+    assert lazy.trades == eager.trades == []
+    assert set(lazy.stats["untouched_indicators"]) == {"rocp_6", "ll", "ma"}
+    assert set(lazy.stats["indicator_seconds"]) == {"atr", "rocp_1", "hh", "strong_bar_series", "bar_series"}
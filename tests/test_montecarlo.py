@@ -0,0 +1,87 @@
+import numpy as np
+from pytest import approx
+
+from backtester.engine import BacktestEngine
+from backtester.models import ActionType, BacktestConfig, OrderIntent, Side
+from backtester.montecarlo import monte_carlo, trade_net_pnls
+from backtester.strategies.ALBO_strategy import ALBOStrategy, ALBOParams
+from backtester.strategy_base import Strategy
+
+
+def _result(bars):
+    cfg = BacktestConfig(initial_cash=10000, fee_rate=0.0004)
+    strat = ALBOStrategy(ALBOParams(break_out_series_n=2, break_out_n_bars=5, BO_n_times_atr=0.0, time_exit_bars=20))
+    return BacktestEngine(cfg).run(bars(1500, 6), strat)
+
+
+def test_net_pnls_include_entry_fees(bars):
+    res = _result(bars)
+    pnls = trade_net_pnls(res)
+    entries = [f for f in res.fills if f.action.value == "entry"]
+    assert len(pnls) == len(res.trades)
+    assert pnls[0] == approx(res.trades[0].pnl - entries[0].fee)
+    assert pnls.sum() < sum(t.pnl for t in res.trades)
+
+
+def test_monte_carlo_seeded_and_chunking_independent(bars):
+    res = _result(bars)
+    a = monte_carlo(res, initial_cash=10000, n_paths=3000, seed=7, chunk_size=1000)
+    b = monte_carlo(res, initial_cash=10000, n_paths=3000, seed=7, chunk_size=1000, n_jobs=2)
+    c = monte_carlo(res, initial_cash=10000, n_paths=3000, seed=8, chunk_size=1000)
+
+    assert np.array_equal(a.final_equity, b.final_equity)
+    assert not np.array_equal(a.final_equity, c.final_equity)
+    assert a.n_paths == 3000
+    assert (a.max_drawdown <= 0).all()
+    assert 0.0 <= a.risk_of_ruin <= 1.0
+    assert list(a.summary().columns) == ["final_equity", "max_drawdown"]
+
+
+def test_shuffle_keeps_final_equity(bars):
+    res = _result(bars)
+    mc = monte_carlo(res, initial_cash=10000, n_paths=200, method="shuffle", seed=1)
+    assert np.allclose(mc.final_equity, 10000 + trade_net_pnls(res).sum())
+
+
+class _Adder(Strategy):
+    """每 10 根加一個多單 lot（book 模式）。"""
+
+    position_mode = "book"
+    p = None
+
+    def required_indicators(self):
+        return {}
+
+    def generate_intents(self, ctx):
+        if ctx.i % 10:
+            return []
+        c = float(ctx.df["close"].iat[ctx.i])
+        return [OrderIntent(ActionType.ADD, Side.LONG, qty=1.0, tp_price=c + 2.0, sl_price=c - 2.0)]
+
+
+class _Scaler(_Adder):
+    """每 10 根加一口 2 單位，第 5 根先進先出平 1 單位（部分平倉），最後一根全平。"""
+
+    def __init__(self, n):
+        self.n = n
+
+    def generate_intents(self, ctx):
+        if ctx.i == self.n - 1:
+            return [OrderIntent(ActionType.EXIT, Side.LONG, qty=0.0)]
+        if ctx.i % 10 == 5:
+            return [OrderIntent(ActionType.EXIT, Side.LONG, qty=1.0)]
+        if ctx.i % 10 == 0:
+            return [OrderIntent(ActionType.ADD, Side.LONG, qty=2.0)]
+        return []
+
+
+def test_monte_carlo_on_book_results(bars):
+    df = bars(1500, 6)
+    res = BacktestEngine(BacktestConfig(initial_cash=10000, fee_rate=0.0004)).run(df, _Scaler(len(df)))
+    assert any(t.qty < 2.0 for t in res.trades)
+    net = trade_net_pnls(res)
+    assert len(net) == len(res.trades)
+    # 全部平倉後，淨損益加總 = 期末現金變動（進場手續費按平倉數量分攤無遺漏）
+    assert np.isclose(net.sum(), float(res.equity_curve.iloc[-1]) - 10000)
+    mc = monte_carlo(res, initial_cash=10000, n_paths=50, method="shuffle", seed=3)
+    assert np.allclose(mc.final_equity, float(res.equity_curve.iloc[-1]))
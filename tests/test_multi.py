@@ -0,0 +1,60 @@
+import pytest
+
+from backtester.engine import BacktestEngine
+from backtester.models import BacktestConfig, Side
+from backtester.strategies.ALBO_strategy import ALBOStrategy, ALBOParams
+from backtester.strategies.xyz_strategy import XYZStrategy, XYZParams
+
+
+class _BookALBO(ALBOStrategy):
+    position_mode = "book"
+
+
+def _strategies():
+    base = dict(break_out_series_n=2, break_out_n_bars=5, BO_n_times_atr=0.3)
+    return {
+        "long": ALBOStrategy(ALBOParams(**base, allow_side=Side.LONG)),
+        "short": ALBOStrategy(ALBOParams(**base, allow_side=Side.SHORT)),
+        "book": _BookALBO(ALBOParams(**base, rr=3.0)),
+        "xyz": XYZStrategy(XYZParams()),
+    }
+
+
+def test_single_pass_matches_separate_runs(bars):
+    df = bars(3000, 61)
+    configs = {
+        "long": BacktestConfig(initial_cash=10000),
+        "short": BacktestConfig(initial_cash=5000, fee_rate=0.001),
+        # 很快觸發中止，其餘策略繼續跑完
+        "book": BacktestConfig(initial_cash=10000, abort_max_consecutive_losses=2),
+        "xyz": BacktestConfig(initial_cash=20000, slippage_bps=2),
+    }
+    results = BacktestEngine(BacktestConfig()).run_multi(df, _strategies(), configs)
+    assert list(results) == list(configs)
+    assert results["book"].aborted and len(results["long"].equity_curve) == len(df)
+    for name, strategy in _strategies().items():
+        ref = BacktestEngine(configs[name]).run(df, strategy)
+        assert results[name].trades == ref.trades
+        assert results[name].fills == ref.fills
+        assert results[name].equity_curve.equals(ref.equity_curve)
+        assert results[name].aborted == ref.aborted
+
+
+def test_union_of_indicators_computed_once(bars):
+    df = bars(3000, 61)
+    engine = BacktestEngine(BacktestConfig(initial_cash=10000), eager_indicators=True)
+    strategies = list(_strategies().values())
+    results = engine.run_multi(df, strategies)
+    assert isinstance(results, list) and len(results) == len(strategies)
+
+    computed = [spec for r, s in zip(results, strategies) for spec in (s.required_indicators()[k] for k in r.stats["indicator_seconds"])]
+    union = {spec for s in strategies for spec in s.required_indicators().values()}
+    assert sorted(computed, key=repr) == sorted(union, key=repr)
+
+
+def test_run_multi_rejects_bad_arguments(bars):
+    df = bars(200, 61)
+    with pytest.raises(ValueError):
+        BacktestEngine(BacktestConfig()).run_multi(df, list(_strategies().values()), [BacktestConfig()])
+    with pytest.raises(ValueError):
+        BacktestEngine(BacktestConfig(), event_sink=object()).run_multi(df, list(_strategies().values()))
@@ -0,0 +1,41 @@
+import pandas as pd
+
+from backtester.models import BacktestConfig
+from backtester.optimizer import build_param_combinations, successive_halving
+from backtester.strategies.ALBO_strategy import ALBOStrategy, ALBOParams
+from backtester.sweep import ParamsFactory
+
+
+def test_successive_halving_ranks_and_saves_bar_evals(bars):
+    df = bars(2000, 3)
+    train_df, test_df = df.iloc[:1500], df.iloc[1500:]
+    grid = {"rr": [0.5, 1.5, 3.0], "break_out_n_bars": [5, 10, 20], "time_exit_bars": [10, 50]}
+    candidates = build_param_combinations(grid)
+    factory = ParamsFactory(ALBOStrategy, ALBOParams, base={"break_out_series_n": 2, "BO_n_times_atr": 0.0})
+    cfg = BacktestConfig(initial_cash=10000)
+
+    res = successive_halving(
+        train_df, factory, candidates, cfg, eta=3, n_rungs=3, min_bars=100,
+        best_n_params=2, test_df=test_df, max_workers=1,
+    )
+
+    assert len(res.rungs) == 3
+    assert len(res.rungs[0]) == len(candidates)
+    assert len(res.rungs[-1]) < len(candidates)
+    assert list(res.table.columns) == ["params", "train_perf_per_day", "n_trades", "test_perf_per_day", "perf_diff"]
+    assert len(res.table) == 2
+    assert res.table["train_perf_per_day"].is_monotonic_decreasing
+    assert 0 < res.bar_evals < res.full_grid_bar_evals
+    assert res.saved_bar_evals == res.full_grid_bar_evals - res.bar_evals
+
+
+def test_successive_halving_process_pool_matches_serial(bars):
+    df = bars(1200, 3)
+    candidates = build_param_combinations({"rr": [1.0, 2.0], "break_out_n_bars": [5, 10]})
+    factory = ParamsFactory(ALBOStrategy, ALBOParams, base={"break_out_series_n": 2, "BO_n_times_atr": 0.0})
+    cfg = BacktestConfig(initial_cash=10000)
+
+    serial = successive_halving(df, factory, candidates, cfg, n_rungs=2, eta=2, min_bars=100, max_workers=1)
+    pooled = successive_halving(df, factory, candidates, cfg, n_rungs=2, eta=2, min_bars=100, max_workers=2)
+
+    pd.testing.assert_frame_equal(serial.rungs[-1], pooled.rungs[-1])
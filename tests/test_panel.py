@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtester.engine import BacktestEngine
+from backtester.indicators import IndicatorRegistry
+from backtester.models import BacktestConfig
+from backtester.panel import SymbolPanel, compute_panel_indicators, run_panel
+from backtester.strategies.ALBO_strategy import ALBOStrategy, ALBOParams
+
+
+def _frames(bars):
+    # 不同上市時間與下市時間
+    return {
+        "AAA": bars(1500, 1),
+        "BBB": bars(1000, 2, start="2026-01-02"),
+        "CCC": bars(600, 3).iloc[:400],
+    }
+
+
+def _strategy(_sym=None):
+    return ALBOStrategy(ALBOParams(break_out_series_n=2, break_out_n_bars=5, BO_n_times_atr=0.5, time_exit_bars=30))
+
+
+def test_panel_indicators_match_per_symbol_computation(bars):
+    frames = _frames(bars)
+    panel = SymbolPanel.from_frames(frames)
+    specs = _strategy().required_indicators()
+    batch = compute_panel_indicators(panel, list(specs.values()))
+
+    for sym, df in frames.items():
+        view = panel.frame(sym)
+        pd.testing.assert_frame_equal(view, df[["open", "high", "low", "close"]], check_freq=False)
+        assert np.shares_memory(view.to_numpy(), panel.data)
+
+        got = batch.for_symbol(sym, specs)
+        assert np.shares_memory(got["hh"].to_numpy(), batch.values[specs["hh"]])
+        expected = BacktestEngine._compute_indicators(df, _strategy(), IndicatorRegistry())
+        for name in specs:
+            np.testing.assert_array_equal(got[name].to_numpy(dtype=float), expected[name].to_numpy(dtype=float))
+
+
+def test_run_panel_matches_individual_runs(bars):
+    frames = _frames(bars)
+    engine = BacktestEngine(BacktestConfig(initial_cash=10000, fee_rate=0.0004))
+    results = run_panel(engine, SymbolPanel.from_frames(frames), _strategy)
+
+    for sym, df in frames.items():
+        single = engine.run(df, _strategy())
+        assert results[sym].trades == single.trades
+        np.testing.assert_array_equal(results[sym].equity_curve.to_numpy(), single.equity_curve.to_numpy())
+
+
+def test_internal_gaps_are_rejected_or_filled(bars):
+    df = bars(50, 4)
+    frames = {"AAA": df, "GAP": df.drop(df.index[10:12])}
+    with pytest.raises(ValueError):
+        SymbolPanel.from_frames(frames)
+
+    panel = SymbolPanel.from_frames(frames, gaps="ffill")
+    filled = panel.frame("GAP")
+    assert len(filled) == 50
+    assert (filled.iloc[10:12].to_numpy() == df["close"].iat[9]).all()
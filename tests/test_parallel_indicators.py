@@ -0,0 +1,46 @@
+import pandas as pd
+
+from backtester.engine import BacktestEngine
+from backtester.indicators import IndicatorRegistry
+from backtester.models import BacktestConfig
+from backtester.parallel_indicators import CHUNKABLE, compute_indicators_parallel, indicator_warmup
+from backtester.strategies.ALBO_strategy import ALBOStrategy, ALBOParams
+
+
+SPECS = [
+    ("rolling_high", 20, "high"),
+    ("rolling_low", 20, "low"),
+    ("bar_side",),
+    ("bar_side_sum", 3),
+    ("body_strictly_increasing", 3),
+    ("rocp", 1),
+    ("rocp", 5),
+    ("bar_range_pct",),
+    ("atr", 14),
+    ("ma", 20, "close", "EMA"),
+    ("ma", 20, "close", "SMA"),
+]
+
+
+def test_parallel_chunked_equals_serial(bars):
+    df = bars(5000, 37)
+    reg = IndicatorRegistry()
+    values, timings = compute_indicators_parallel(df, SPECS + [("rocp", 1)], reg, workers=4, chunk_rows=777)
+    assert set(values) == set(SPECS) == set(timings)
+    for spec in SPECS:
+        expected = getattr(reg, spec[0])(df, *spec[1:])
+        pd.testing.assert_series_equal(values[spec], expected, check_exact=True)
+    assert indicator_warmup(("rocp", 5)) == 5
+    assert indicator_warmup(("atr", 14)) is None
+    assert "ma" not in CHUNKABLE
+
+
+def test_engine_parallel_indicator_stage_matches_serial(bars):
+    df = bars(3000, 37)
+    cfg = BacktestConfig(initial_cash=10000, fee_rate=0.0004)
+    strategy = ALBOStrategy(ALBOParams(break_out_series_n=2, break_out_n_bars=5, BO_n_times_atr=0.3))
+    serial = BacktestEngine(cfg).run(df, strategy)
+    parallel = BacktestEngine(cfg, indicator_workers=4, indicator_chunk_rows=500).run(df, strategy)
+    assert parallel.trades == serial.trades
+    assert parallel.equity_curve.equals(serial.equity_curve)
+    assert set(parallel.stats["indicator_seconds"]) == set(strategy.required_indicators())
@@ -0,0 +1,45 @@
+import numpy as np
+
+from backtester.analytics import trade_excursions
+from backtester.engine import BacktestEngine
+from backtester.models import BacktestConfig, Side
+from backtester.rangeindex import PriceRangeIndex, SparseTable
+from backtester.strategies.ALBO_strategy import ALBOStrategy, ALBOParams
+
+
+def test_sparse_table_matches_brute_force():
+    rng = np.random.default_rng(0)
+    values = rng.integers(0, 20, 257).astype(float)  # 有大量同值，檢查取最早位置
+    lo = rng.integers(0, 257, 500)
+    hi = np.maximum(lo, rng.integers(0, 257, 500))
+
+    tmax, tmin = SparseTable(values, "max"), SparseTable(values, "min")
+    for a, b, pmax, pmin in zip(lo, hi, tmax.argquery(lo, hi), tmin.argquery(lo, hi)):
+        assert pmax == a + np.argmax(values[a:b + 1])
+        assert pmin == a + np.argmin(values[a:b + 1])
+
+
+def test_trade_excursions_match_pandas_slices(bars, tmp_path):
+    df = bars(3000, 17)
+    strategy = ALBOStrategy(ALBOParams(break_out_series_n=2, break_out_n_bars=5, BO_n_times_atr=0.5, time_exit_bars=30))
+    result = BacktestEngine(BacktestConfig(initial_cash=10000)).run(df, strategy)
+    assert result.trades
+
+    index = PriceRangeIndex.load_or_build(df, tmp_path)
+    assert PriceRangeIndex.load_or_build(df, tmp_path).fingerprint == index.fingerprint
+    ex = trade_excursions(result, index=index)
+
+    for t, row in zip(result.trades, ex.itertuples()):
+        window = df.loc[t.entry_time:t.exit_time].iloc[1:]
+        if t.side == Side.LONG:
+            mfe, mae = window["high"].max() - t.entry_price, t.entry_price - window["low"].min()
+            after = window.iloc[int(np.argmax(window["high"].to_numpy())):]
+            giveback = window["high"].max() - after["low"].min()
+        else:
+            mfe, mae = t.entry_price - window["low"].min(), window["high"].max() - t.entry_price
+            after = window.iloc[int(np.argmin(window["low"].to_numpy())):]
+            giveback = after["high"].max() - window["low"].min()
+        assert np.isclose(row.mfe, max(mfe, 0.0))
+        assert np.isclose(row.mae, max(mae, 0.0))
+        assert np.isclose(row.drawdown_from_mfe, giveback)
+        assert row.exit_bar - row.entry_bar == t.bars_held
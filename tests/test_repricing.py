@@ -0,0 +1,100 @@
+import dataclasses
+
+import numpy as np
+import pytest
+from pytest import approx
+
+from backtester.analytics import basic_metrics
+from backtester.costs import CostModel, FixedBpsSlippage, MakerTakerFee
+from backtester.engine import BacktestEngine
+from backtester.models import BacktestConfig, SizingEquityBase
+from backtester.repricing import fill_arrays, reprice_costs
+from backtester.strategies.ALBO_strategy import ALBOStrategy, ALBOParams
+
+
+def test_reprice_matches_full_rerun(bars):
+    df = bars(800, 1)
+    cfg = BacktestConfig(initial_cash=10000, fee_rate=0.0, slippage_bps=0.0)
+    strat = ALBOStrategy(ALBOParams(break_out_series_n=2, break_out_n_bars=5, BO_n_times_atr=0.0, time_exit_bars=20))
+    base = BacktestEngine(cfg).run(df, strat)
+    assert len(base.trades) > 0
+
+    fee_rates = [0.0, 0.0004, 0.001]
+    slippage = [0.0, 5.0]
+    repriced = reprice_costs(base, df, cfg, fee_rates, slippage, strategy=strat)
+
+    assert not repriced.rerun
+    assert len(repriced.metrics) == 6
+    for k, row in repriced.metrics.iterrows():
+        cfg_k = dataclasses.replace(cfg, fee_rate=row["fee_rate"], slippage_bps=row["slippage_bps"])
+        full = BacktestEngine(cfg_k).run(df, strat)
+        np.testing.assert_allclose(repriced.equity[k], full.equity_curve.to_numpy(), rtol=0, atol=1e-9)
+        assert [t.pnl for t in repriced.result(k).trades] == approx([t.pnl for t in full.trades])
+        expected = basic_metrics(full)
+        for key, value in expected.items():
+            assert row[key] == approx(value)
+
+
+def test_reprice_falls_back_to_rerun_for_equity_sizing(bars):
+    df = bars(800, 1)
+    cfg = BacktestConfig(initial_cash=10000)
+    strat = ALBOStrategy(
+        ALBOParams(break_out_series_n=2, break_out_n_bars=5, BO_n_times_atr=0.0,
+                   sizing_equity_base=SizingEquityBase.CURRENT)
+    )
+    base = BacktestEngine(cfg).run(df, strat)
+    repriced = reprice_costs(base, df, cfg, [0.0, 0.001], strategy=strat)
+
+    assert repriced.rerun
+    full = BacktestEngine(dataclasses.replace(cfg, fee_rate=0.001)).run(df, strat)
+    assert repriced.metrics["final_equity"].iat[1] == approx(float(full.equity_curve.iloc[-1]))
+
+
+class _BookALBO(ALBOStrategy):
+    position_mode = "book"
+
+
+def test_reprice_requires_single_position_strategy(bars):
+    df = bars(800, 1)
+    cfg = BacktestConfig(initial_cash=10000)
+    strat = ALBOStrategy(ALBOParams(break_out_series_n=2, break_out_n_bars=5, BO_n_times_atr=0.0))
+    base = BacktestEngine(cfg).run(df, strat)
+    with pytest.raises(TypeError):
+        reprice_costs(base, df, cfg, [0.0])
+    with pytest.raises(ValueError):
+        reprice_costs(base, df, cfg, [0.0], strategy=None)
+
+    book = _BookALBO(strat.p)
+    with pytest.raises(ValueError, match="book"):
+        reprice_costs(BacktestEngine(cfg).run(df, book), df, cfg, [0.0], strategy=book)
+    # 兩筆 ENTRY 連續（ADD lot）或部分平倉：直接指出是 book 模式的成交
+    fills = base.fills
+    with pytest.raises(ValueError, match="book"):
+        fill_arrays([fills[0], fills[0]] + fills[1:], len(df))
+    with pytest.raises(ValueError, match="book"):
+        fill_arrays([fills[0], dataclasses.replace(fills[1], qty=fills[1].qty / 2)], len(df))
+
+
+def test_reprice_keeps_engine_settings(bars):
+    df = bars(800, 1)
+    cfg = BacktestConfig(initial_cash=10000, fee_rate=0.0004)
+    engine = BacktestEngine(cfg, precision="float32")
+    strat = ALBOStrategy(
+        ALBOParams(break_out_series_n=2, break_out_n_bars=5, BO_n_times_atr=0.0,
+                   sizing_equity_base=SizingEquityBase.CURRENT)
+    )
+    base = engine.run(df, strat)
+    repriced = reprice_costs(base, df, cfg, [0.001], strategy=strat, engine=engine)
+    assert repriced.rerun
+    full = BacktestEngine(dataclasses.replace(cfg, fee_rate=0.001), precision="float32").run(df, strat)
+    assert repriced.result(0).trades == full.trades
+
+    fixed = ALBOStrategy(dataclasses.replace(strat.p, sizing_equity_base=SizingEquityBase.INITIAL))
+    base = engine.run(df, fixed)
+    repriced = reprice_costs(base, df, cfg, [0.001], strategy=fixed, engine=engine)
+    full = BacktestEngine(dataclasses.replace(cfg, fee_rate=0.001), precision="float32").run(df, fixed)
+    np.testing.assert_allclose(repriced.equity[0], full.equity_curve.to_numpy(), rtol=0, atol=1e-9)
+
+    custom = BacktestEngine(cfg, cost_model=CostModel(fees=MakerTakerFee(maker_rate=0.0, taker_rate=0.0005), slippage=FixedBpsSlippage(0.0)))
+    with pytest.raises(ValueError, match="cost_model"):
+        reprice_costs(custom.run(df, fixed), df, cfg, [0.001], strategy=fixed, engine=custom)
@@ -0,0 +1,63 @@
+import pytest
+
+from backtester.models import BacktestConfig
+from backtester.optimizer import build_param_combinations
+from backtester.results import ResultsStore
+from backtester.strategies.ALBO_strategy import ALBOStrategy, ALBOParams
+from backtester.sweep import ParamsFactory, run_sweep
+
+
+def _factory():
+    return ParamsFactory(ALBOStrategy, ALBOParams, base={"break_out_series_n": 2, "break_out_n_bars": 5})
+
+
+def test_summary_only_sweep_into_store_and_query(bars, tmp_path):
+    df = bars(1500, 29)
+    cfg = BacktestConfig(initial_cash=10000, fee_rate=0.0004)
+    combos = build_param_combinations({"BO_n_times_atr": [0.3, 0.5], "rr": [1.0, 2.0, 3.0]})
+    store = ResultsStore(tmp_path / "store")
+
+    full = run_sweep(df, _factory(), combos, cfg)
+    for w, part in enumerate([df.iloc[:750], df.iloc[750:]]):
+        runs = run_sweep(part, _factory(), combos, cfg, summary_only=True, store=store, window=w, symbol="BTC", flush_every=4)
+        assert all(r.result is None and r.run_id is not None for r in runs)
+    runs = run_sweep(df, _factory(), combos, cfg, summary_only=True, store=store, window="all", save_artifacts=True)
+
+    assert len(store) == 3 * len(combos)
+    top = store.query(window="all", filters={"n_trades": (">", 0)}, order_by="perf_per_day", limit=3)
+    assert len(top) == 3
+    assert top["perf_per_day"].is_monotonic_decreasing
+    assert {"param_rr", "param_BO_n_times_atr"} <= set(top.columns)
+
+    # 摘要與完整結果一致；完整結果只在要求時才從 artifacts 讀回
+    best = top.iloc[0]
+    ref = next(r for r in full if r.params == best["params"])
+    assert best["n_trades"] == len(ref.result.trades)
+    assert store.load_result(int(best["run_id"])).trades == ref.result.trades
+    with_results = store.query(window="all", params=best["params"], with_results=True)
+    assert with_results["result"].iat[0].trades == ref.result.trades
+
+
+def test_query_rejects_unknown_columns(tmp_path):
+    store = ResultsStore(tmp_path)
+    store.add("S", {"a": 1}, {"perf_per_day": 1.0})
+    with pytest.raises(KeyError):
+        store.query(order_by="perf_per_day; DROP TABLE runs")
+    with pytest.raises(KeyError):
+        store.load_result(1)
+
+
+def test_add_many_rollback_removes_artifacts(bars, tmp_path):
+    store = ResultsStore(tmp_path)
+    result = run_sweep(bars(300, 29), _factory(), [{"BO_n_times_atr": 0.3, "rr": 2.0}], BacktestConfig(initial_cash=10000))[0].result
+    rows = [
+        {"strategy": "S", "params": {"a": 1}, "metrics": {"perf_per_day": 1.0}, "result": result},
+        {"strategy": "S", "params": {"a": 2}, "metrics": {"perf_per_day": "bad"}, "result": result},
+    ]
+    with pytest.raises(ValueError):
+        store.add_many(rows)
+    assert len(store) == 0
+    assert not any((tmp_path / "artifacts").glob("*"))
+    # 同一個 run_id 重新寫入時不會混到舊檔
+    run_id = store.add("S", {"a": 1}, {"perf_per_day": 1.0}, result=result)
+    assert store.load_result(run_id).trades == result.trades
@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from backtester.engine import BacktestEngine
+from backtester.indicators import IndicatorRegistry
+from backtester.models import BacktestConfig
+from backtester.rules import RULES_KEY, ExprEvaluator, bar, ind
+from backtester.strategies.ALBO_strategy import ALBOStrategy, ALBOParams
+
+
+def test_expression_matches_pandas(bars):
+    df = bars(500, 19)
+    hh = df["high"].rolling(10, min_periods=10).max()
+    ev = ExprEvaluator(df, {"hh": hh})
+
+    mask = ev.mask((bar.close > ind.hh.shift(1)) & ~(bar.close < bar.open))
+    expected = (df["close"] > hh.shift(1)) & ~(df["close"] < df["open"])
+    np.testing.assert_array_equal(mask, expected.to_numpy())
+
+    tp = ev.evaluate(bar.close + (bar.close - bar.open.shift(2)) * 1.5)
+    np.testing.assert_array_equal(tp, (df["close"] + (df["close"] - df["open"].shift(2)) * 1.5).to_numpy())
+
+
+def test_common_subexpressions_are_shared_across_params(bars):
+    df = bars(500, 19)
+    cache = {}
+    engine = BacktestEngine(BacktestConfig(initial_cash=10000))
+    reg = IndicatorRegistry()
+
+    def compile_all(params):
+        indicators = engine._compute_indicators(df, ALBOStrategy(params), reg, cache)
+        indicators[RULES_KEY].entry_bars()
+
+    compile_all(ALBOParams(break_out_series_n=2, BO_n_times_atr=0.5))
+    n_expr = sum(1 for k in cache if k[0] == "__expr__")
+    # 只改 BO_n_times_atr：只有 cond3 與其上層的 and 需要重算
+    compile_all(ALBOParams(break_out_series_n=2, BO_n_times_atr=1.0))
+    added = sum(1 for k in cache if k[0] == "__expr__") - n_expr
+    assert 0 < added < n_expr / 2
+
+
+def test_expressions_have_no_truth_value():
+    with pytest.raises(TypeError):
+        bool(bar.close > 1)
@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtester.engine import BacktestEngine
+from backtester.models import ActionType, BacktestConfig, ExitType
+from backtester.sessions import session_ends, session_mask, tradable_mask
+from backtester.strategies.ALBO_strategy import ALBOStrategy, ALBOParams
+
+
+def _strategy():
+    return ALBOStrategy(ALBOParams(break_out_series_n=2, break_out_n_bars=5, BO_n_times_atr=0.3, rr=2.0))
+
+
+def test_masks_and_ranges():
+    idx = pd.date_range("2026-01-02 22:00", periods=12, freq="1h")  # 週五 22:00 起
+    m = session_mask(idx, weekdays=range(5))
+    assert m.tolist() == [True, True] + [False] * 10
+    night = session_mask(idx, start="23:00", end="02:00")
+    assert idx[night].hour.tolist() == [23, 0, 1]
+    ny = session_mask(idx, start="18:00", end="20:00", tz="America/New_York")  # UTC 23:00 / 00:00
+    assert idx[ny].hour.tolist() == [23, 0]
+
+    assert tradable_mask(idx, [(0, 2), (10, 12)]).nonzero()[0].tolist() == [0, 1, 10, 11]
+    by_label = tradable_mask(idx, [("2026-01-03 01:00", "2026-01-03 02:00")])
+    assert idx[by_label].hour.tolist() == [1, 2]
+    s = pd.Series(True, index=idx[3:5])
+    assert tradable_mask(idx, s).nonzero()[0].tolist() == [3, 4]
+    with pytest.raises(ValueError):
+        tradable_mask(idx, np.ones(3, dtype=bool))
+    assert session_ends(np.array([True, True, False, True, True])).tolist() == [False, True, False, False, False]
+
+
+def test_full_mask_matches_plain_run(bars):
+    df = bars(4000, 59)
+    engine = BacktestEngine(BacktestConfig(initial_cash=10000))
+    plain = engine.run(df, _strategy())
+    masked = engine.run(df, _strategy(), tradable=np.ones(len(df), dtype=bool), flatten_at_session_end=True)
+    assert masked.trades == plain.trades
+    assert masked.equity_curve.equals(plain.equity_curve)
+    # 沒有遮罩就沒有時段結束可平倉
+    with pytest.raises(ValueError, match="tradable"):
+        engine.run(df, _strategy(), flatten_at_session_end=True)
+
+
+def test_entries_only_on_tradable_bars_and_flatten(bars):
+    df = bars(4000, 59)
+    engine = BacktestEngine(BacktestConfig(initial_cash=10000))
+    mask = session_mask(df.index, start="08:00", end="16:00")
+    res = engine.run(df, _strategy(), tradable=mask)
+    entry_bars = [f.bar_i for f in res.fills if f.action == ActionType.ENTRY]
+    assert entry_bars and mask[entry_bars].all()
+    assert res.trades != engine.run(df, _strategy()).trades
+
+    flat = engine.run(df, _strategy(), tradable=mask, flatten_at_session_end=True)
+    ends = session_ends(mask)
+    session_exits = [f.bar_i for f in flat.fills if f.exit_type == ExitType.SESSION]
+    assert session_exits and ends[session_exits].all()
+    # 每筆交易都在同一段時段內結束
+    session_id = np.cumsum(~mask)
+    fills = flat.fills
+    for entry, exit_ in zip(fills[::2], fills[1::2]):
+        assert entry.action == ActionType.ENTRY and exit_.action == ActionType.EXIT
+        assert mask[entry.bar_i] and not ends[entry.bar_i]
+        assert session_id[entry.bar_i] == session_id[exit_.bar_i]
+
+
+def test_run_masks_reuses_indicators(bars, monkeypatch):
+    df = bars(4000, 59)
+    engine = BacktestEngine(BacktestConfig(initial_cash=10000))
+    masks = {
+        "weekdays": session_mask(df.index, weekdays=range(5)),
+        "day": session_mask(df.index, start="08:00", end="16:00"),
+        "ranges": [(0, 1000), (df.index[2500], df.index[3200])],
+        "all": None,
+    }
+    expected = {
+        name: engine.run(df, _strategy(), tradable=m, flatten_at_session_end=m is not None) for name, m in masks.items()
+    }
+
+    calls = []
+    original = BacktestEngine._compute_indicators
+    monkeypatch.setattr(BacktestEngine, "_compute_indicators", staticmethod(lambda *a, **k: calls.append(1) or original(*a, **k)))
+    results = engine.run_masks(df, _strategy(), masks, flatten_at_session_end=True)
+    assert len(calls) == 1
+    for name, res in results.items():
+        assert res.trades == expected[name].trades
+        assert res.equity_curve.equals(expected[name].equity_curve)
@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+
+from backtester.engine import BacktestEngine
+from backtester.models import BacktestConfig
+from backtester.strategies.ALBO_strategy import ALBOStrategy, ALBOParams
+
+
+def _strategy():
+    return ALBOStrategy(ALBOParams(break_out_series_n=2, break_out_n_bars=5, BO_n_times_atr=0.5, time_exit_bars=30))
+
+
+def test_streaming_over_row_groups_matches_in_memory_run(bars, tmp_path):
+    df = bars(3000, 11, index_name="time")
+    src = tmp_path / "bars.parquet"
+    df.to_parquet(src, row_group_size=400)
+    engine = BacktestEngine(BacktestConfig(initial_cash=10000, fee_rate=0.0004))
+
+    full = engine.run(df, _strategy())
+    out = engine.run_streaming(src, _strategy(), tmp_path / "out", warmup_bars=1000)
+    loaded = out.load()
+
+    assert out.n_bars == len(df)
+    assert out.n_trades == len(full.trades) > 0
+    assert loaded.trades == full.trades
+    assert loaded.fills == full.fills
+    pd.testing.assert_index_equal(loaded.equity_curve.index, full.equity_curve.index, check_names=False)
+    np.testing.assert_allclose(loaded.equity_curve.to_numpy(), full.equity_curve.to_numpy(), rtol=1e-12)
+
+
+def test_streaming_abort_stops_reading(bars, tmp_path):
+    df = bars(3000, 11, index_name="time")
+    cfg = BacktestConfig(initial_cash=10000, fee_rate=0.0004, abort_max_consecutive_losses=2)
+    engine = BacktestEngine(cfg)
+
+    full = engine.run(df, _strategy())
+    chunks = (df.iloc[s:s + 250] for s in range(0, len(df), 250))
+    out = engine.run_streaming(chunks, _strategy(), tmp_path / "out", warmup_bars=1000)
+
+    assert full.aborted and out.aborted
+    assert out.abort_reason == full.abort_reason
+    assert out.abort_bar_i == full.abort_bar_i
+    assert out.load().trades == full.trades
+
+
+def test_streaming_first_chunk_with_only_an_entry(bars, tmp_path):
+    df = bars(3000, 11, index_name="time")
+    engine = BacktestEngine(BacktestConfig(initial_cash=10000, fee_rate=0.0004))
+    full = engine.run(df, _strategy())
+    first_entry = full.fills[0].bar_i
+    assert full.fills[1].bar_i > first_entry
+
+    # 第一段只有一筆進場（exit_type 全為 None、沒有 trade），之後的段才有出場
+    cut = first_entry + 1
+    chunks = iter([df.iloc[:cut], df.iloc[cut:2000], df.iloc[2000:]])
+    out = engine.run_streaming(chunks, _strategy(), tmp_path / "out", warmup_bars=3000)
+    loaded = out.load()
+    assert loaded.trades == full.trades
+    assert loaded.fills == full.fills
@@ -0,0 +1,30 @@
+from itertools import product
+
+import numpy as np
+
+from backtester.engine import BacktestEngine
+from backtester.models import BacktestConfig
+from backtester.strategies.ALBO_strategy import ALBOStrategy, ALBOParams
+from backtester.sweep import run_sweep
+
+
+def _factory(params):
+    return ALBOStrategy(ALBOParams(break_out_series_n=2, BO_n_times_atr=0.0, **params))
+
+
+def test_exit_sweep_matches_individual_runs(bars):
+    df = bars(1500, 2)
+    cfg = BacktestConfig(initial_cash=10000, fee_rate=0.0004, slippage_bps=2.0)
+    grid = {"break_out_n_bars": [5, 10], "rr": [0.5, 1.5, 3.0], "time_exit_bars": [1, 10, 10_000]}
+    combos = [dict(zip(grid, vals)) for vals in product(*grid.values())]
+
+    runs = run_sweep(df, _factory, combos, cfg)
+
+    engine = BacktestEngine(cfg)
+    assert len(runs) == len(combos)
+    for run in runs:
+        expected = engine.run(df, _factory(run.params))
+        assert run.result.trades == expected.trades
+        assert run.result.fills == expected.fills
+        assert np.array_equal(run.result.equity_curve.to_numpy(), expected.equity_curve.to_numpy())
+    assert any(len(r.result.trades) > 0 for r in runs)
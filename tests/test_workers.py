@@ -0,0 +1,98 @@
+import numpy as np
+
+from backtester.engine import BacktestEngine
+from backtester.models import BacktestConfig
+from backtester.optimizer import build_param_combinations
+from backtester.strategies.ALBO_strategy import ALBOStrategy, ALBOParams
+from backtester.sweep import ParamsFactory, run_sweep
+from backtester.workers import IndicatorCache, WarmPool, worker_dataset, worker_indicator_cache
+
+
+def _dataset_len(name):
+    return len(worker_dataset(name))
+
+
+def _cache_size(name):
+    # 只數指標 spec（不含規則子運算式）
+    return sum(1 for k in worker_indicator_cache(name) if k[0] != "__expr__")
+
+
+def test_warm_pool_runs_backtests_and_sweeps(bars, tmp_path):
+    df = bars(1500, 47)
+    path = tmp_path / "bars.parquet"
+    df.rename_axis("dt_utc").reset_index().to_parquet(path, index=False)
+    cfg = BacktestConfig(initial_cash=10000, fee_rate=0.0004)
+    params = ALBOParams(break_out_series_n=2, break_out_n_bars=5, BO_n_times_atr=0.3)
+    factory = ParamsFactory(ALBOStrategy, ALBOParams, base={"break_out_series_n": 2, "break_out_n_bars": 5})
+    combos = build_param_combinations({"BO_n_times_atr": [0.3, 0.5], "rr": [1.0, 2.0, 3.0]})
+
+    with WarmPool({"mem": df, "disk": path}, n_workers=2) as pool:
+        assert len(pool.pids()) == 2
+        assert pool.submit(_dataset_len, "disk").result() == len(df)
+
+        expected = BacktestEngine(cfg).run(df, ALBOStrategy(params))
+        for name in ("mem", "disk"):
+            got = pool.submit_backtest(name, ALBOStrategy(params), cfg).result()
+            assert got.trades == expected.trades
+
+        futs = pool.submit_sweep("mem", factory, combos, cfg, chunk_size=2)
+        assert len(futs) == 3
+        runs = pool.gather(futs)
+        ref = run_sweep(df, factory, combos, cfg)
+        assert [r.params for r in runs] == [r.params for r in ref]
+        assert [r.result.trades for r in runs] == [r.result.trades for r in ref]
+
+        stats = pool.stats()
+        assert stats.n_workers == 2 and stats.pending == 0 and stats.queue_depth == 0
+        assert stats.completed == stats.submitted >= 6
+        assert set(stats.worker_rss) == set(pool.pids())
+        assert all(v is None or v > 0 for v in stats.worker_rss.values())
+
+
+def test_indicator_cache_survives_across_jobs(bars):
+    df = bars(800, 47)
+    cfg = BacktestConfig(initial_cash=10000)
+    with WarmPool({"mem": df}, n_workers=1) as pool:
+        assert pool.submit(_cache_size, "mem").result() == 0
+        pool.submit_backtest("mem", ALBOStrategy(ALBOParams(break_out_series_n=2)), cfg).result()
+        n = pool.submit(_cache_size, "mem").result()
+        assert n > 0
+        pool.submit_backtest("mem", ALBOStrategy(ALBOParams(break_out_series_n=2, rr=3.0)), cfg).result()
+        assert pool.submit(_cache_size, "mem").result() == n
+
+
+def test_indicator_cache_evicts_least_recently_used():
+    cache = IndicatorCache(max_bytes=3 * 800)
+    for k in "abc":
+        cache[k] = np.zeros(100)
+    assert cache["a"] is not None  # a 變成最近使用
+    cache["d"] = np.zeros(100)
+    assert list(cache) == ["c", "a", "d"] and cache.nbytes == 2400 and cache.evictions == 1
+    cache["big"] = np.zeros(1000)
+    assert len(cache) == 0 and cache.nbytes == 0
+
+
+def _cache_keys(name, precision):
+    return sum(1 for k in worker_indicator_cache(name, precision) if k[0] != "__expr__")
+
+
+def test_backtest_job_uses_engine_run_options_and_precision_cache(bars):
+    df = bars(800, 47)
+    cfg = BacktestConfig(initial_cash=10000)
+    strat = ALBOStrategy(ALBOParams(break_out_series_n=2, break_out_n_bars=5, BO_n_times_atr=0.0))
+    tradable = df.index.hour < 12
+    with WarmPool({"mem": df}, n_workers=1) as pool:
+        got = pool.submit_backtest("mem", strat, cfg, tradable=tradable, flatten_at_session_end=True).result()
+        expected = BacktestEngine(cfg).run(df, strat, tradable=tradable, flatten_at_session_end=True)
+        assert got.trades == expected.trades
+
+        got32 = pool.submit_backtest("mem", strat, cfg, precision="float32").result()
+        assert got32.trades == BacktestEngine(cfg, precision="float32").run(df, strat).trades
+        assert pool.submit(_cache_keys, "mem", "float32").result() > 0
+
+        pool.submit_sweep("mem", ParamsFactory(ALBOStrategy, ALBOParams), [{"break_out_series_n": 3}], cfg)[0].result()
+        assert pool.submit(_cache_keys, "mem", "float64").result() > 0
+
+    with WarmPool({"mem": df}, n_workers=1, indicator_cache_bytes=0) as pool:
+        pool.submit_backtest("mem", strat, cfg).result()
+        assert pool.submit(_cache_keys, "mem", "float64").result() == 0